@@ -1,3 +1,4 @@
+import asyncio
 from datetime import timedelta
 
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -15,13 +16,17 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
 
 @router.post("/token")
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    logger.debug(f"Auth attempt: {form_data.username}")
+    logger.debug("Auth attempt: %s", form_data.username)
 
     try:
-        logger.info(f"Auth for user: {form_data.username}")
-        user = authenticate_user(form_data.username, form_data.password)
+        logger.info("Auth for user: %s", form_data.username)
+        # Проверка пароля (bcrypt) выполняется в потоке, чтобы не
+        # блокировать цикл событий
+        user = await asyncio.get_running_loop().run_in_executor(
+            None, authenticate_user, form_data.username, form_data.password
+        )
         if not user:
-            logger.warning(f"Failed auth for user: {form_data.username}")
+            logger.warning("Failed auth for user: %s", form_data.username)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect username or password",
@@ -29,7 +34,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
             )
 
         # Генерация токена при успешной аутентификации
-        logger.info(f"Success auth for user: {form_data.username}")
+        logger.info("Success auth for user: %s", form_data.username)
         access_token_expires = timedelta(minutes=30)
         access_token = create_access_token(
             data={"sub": user["username"]}, expires_delta=access_token_expires
@@ -37,5 +42,5 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
         return {"access_token": access_token, "token_type": "bearer"}
 
     except Exception as e:
-        logger.error(f"Auth error for user: {form_data.username}, Error: {str(e)}")
+        logger.error("Auth error for user: %s, Error: %s", form_data.username, e)
         raise e
@@ -1,6 +1,9 @@
 from fastapi import APIRouter, Depends
+from fastapi.responses import Response
 
 from app.core.auth import AuthDependency
+from app.core.metrics import CONTENT_TYPE, metrics
+from app.core.startup import startup_report
 
 router = APIRouter()
 
@@ -11,4 +14,39 @@ auth_dependency = AuthDependency()
 # Эндпоинт для проверки статуса
 @router.get("/status")
 async def get_status(token: str = Depends(auth_dependency)):
-    return {"status": "Приложение работает", "detail": "Все системы в норме"}
+    """
+    Статус приложения. Поле ready становится true, когда ресурсы поиска
+    загружены и приложение готово принимать запросы; в startup - время
+    загрузки каждого компонента.
+    """
+    if startup_report.ready:
+        detail = "Все системы в норме"
+    elif startup_report.error:
+        detail = f"Ошибка запуска: {startup_report.error}"
+    else:
+        detail = "Идет загрузка ресурсов"
+    return {
+        "status": "Приложение работает",
+        "detail": detail,
+        "ready": startup_report.ready,
+        "startup": startup_report.summary(),
+    }
+
+
+# Эндпоинт метрик в текстовом формате Prometheus
+@router.get("/metrics")
+def get_metrics(token: str = Depends(auth_dependency)) -> Response:
+    """
+    Метрики поиска школ в текстовом формате Prometheus: количество
+    вызовов и названий, попадания в кэш, гистограммы времени вызова и
+    этапов (предобработка по шагам, векторизация, поиск), размеры
+    множеств кандидатов, переходы к поиску по всем школам при пустом
+    регионе и запросы на ручную обработку.
+
+    Example response:
+    # HELP school_matcher_stage_seconds Время этапа поиска школ за вызов в секундах
+    # TYPE school_matcher_stage_seconds histogram
+    school_matcher_stage_seconds_bucket{method="find_school_match",stage="search",le="0.001"} 12
+    ...
+    """
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
@@ -1,5 +1,6 @@
 import os
-from typing import List, Optional
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Literal, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
@@ -7,14 +8,30 @@ from pydantic import BaseModel
 from app.core.auth import AuthDependency  # Импортируем зависимость
 from app.core.database import DatabaseConnection
 from app.core.logger import setup_logger
-from app.services.school_matcher.school_matcher import SchoolMatcher
+from app.core.startup import StartupReport, startup_report
+from app.services.school_matcher.rebuild_jobs import RebuildJobs
+from app.services.school_matcher.worker_pool import (
+    MATCHER_WORKERS,
+    MatcherOverloadedError,
+    MatcherPool,
+)
 
 # Инициализируем логгер для school_matching
 logger = setup_logger("school_matching", "app/logs/school_matcher/logs.log")
 
 
+# Способы поиска совпадают с SEARCH_MODES и VARIANTS_MODE модуля
+# school_matcher (проверяется тестом); модуль импортируется при запуске
+# приложения (см. warm_up), поэтому константы здесь не импортируются
+SearchMode = Literal["exact", "inverted", "taat", "lsh"]
+# Для поиска совпадений дополнительно доступен режим сопоставления
+# всех вариантов расшифровки сокращений
+MatchMode = Literal[SearchMode, "variants"]
+
+
 class SchoolRequest(BaseModel):
     school_name: str
+    search_mode: Optional[MatchMode] = None
 
 
 class MatchResponse(BaseModel):
@@ -22,6 +39,22 @@ class MatchResponse(BaseModel):
     score: float
 
 
+class SchoolBatchRequest(BaseModel):
+    school_names: List[str]
+    search_mode: Optional[MatchMode] = None
+
+
+class SearchRecallRequest(BaseModel):
+    school_names: List[str]
+    search_mode: SearchMode = "lsh"
+
+
+class BatchMatchResponse(BaseModel):
+    school_name: str
+    matches: List[MatchResponse]
+    error: Optional[str] = None
+
+
 router = APIRouter()
 
 # Настраиваем OAuth2PasswordBearer, чтобы получить токен
@@ -29,13 +62,114 @@ router = APIRouter()
 auth_dependency = AuthDependency()  # Инициализируем зависимость
 
 DATABASE_URL = os.getenv("DATABASE_URL")
-db = DatabaseConnection(DATABASE_URL)
-engine = db.get_engine()
-school_marcher = SchoolMatcher(engine)
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", 10000))
+
+# SchoolMatcher, пул обработчиков и задачи обновления ресурсов создаются
+# при запуске приложения (см. warm_up)
+school_marcher = None
+matcher_pool: Optional[MatcherPool] = None
+rebuild_jobs: Optional[RebuildJobs] = None
+
+
+def warm_up(report: StartupReport = startup_report) -> None:
+    """
+    Загружает ресурсы поиска школ и запускает обработчики. Вызывается
+    при запуске приложения; до завершения эндпоинты поиска отвечают 503.
+
+    Parameters
+    ----------
+    report : StartupReport, optional
+        Отчет о запуске, в который записывается время каждого этапа
+        (default is startup_report).
+    """
+    global school_marcher, matcher_pool, rebuild_jobs
+
+    try:
+        with report.stage("import school matcher"):
+            from app.services.school_matcher.school_matcher import SchoolMatcher
+            from app.services.school_matcher.utils.preprocess_functions import (
+                ensure_nltk_data,
+                get_morph,
+                lemmatizer,
+            )
+        with report.stage("nltk data"):
+            # Без данных punkt токенизатор nltk не работает: приложение не
+            # сообщает о готовности, чтобы не отвечать ошибкой на каждый запрос
+            if lemmatizer.tokenizer == "nltk" and not ensure_nltk_data():
+                raise RuntimeError(
+                    "Tokenizer nltk is selected, but punkt data is missing; "
+                    "set SCHOOL_MATCHER_TOKENIZER=regex or provide the data"
+                )
+        with report.stage("morph analyzer"):
+            get_morph()
+        with report.stage("database engine"):
+            engine = DatabaseConnection(DATABASE_URL).get_engine()
+        with report.stage("school matcher"):
+            # В режиме процессов запросы обслуживают процессы-обработчики,
+            # кэш основного процесса не используется
+            matcher = SchoolMatcher(engine, persist_cache=MATCHER_WORKERS <= 0)
+        for name, seconds in matcher.load_timings.items():
+            report.details[f"school matcher: {name}"] = seconds
+        with report.stage("worker pool"):
+            pool = MatcherPool(matcher, factory_args=(DATABASE_URL,))
+            pool.start()
+        jobs = RebuildJobs(matcher, DATABASE_URL, on_published=pool.restart)
+        jobs.start_schedule()
+    except Exception as e:
+        report.error = str(e)
+        logger.exception("Startup failed: %s", e)
+        raise
+
+    school_marcher, matcher_pool, rebuild_jobs = matcher, pool, jobs
+    report.ready = True
+    logger.info("Startup report: %s", report.summary())
+
+
+def shut_down() -> None:
+    """Останавливает обработчики и сохраняет востребованные запросы кэша."""
+    startup_report.ready = False
+    if rebuild_jobs is not None:
+        rebuild_jobs.stop_schedule()
+    if matcher_pool is not None:
+        matcher_pool.shutdown()
+    if school_marcher is not None:
+        school_marcher.save_result_cache()
+
+
+def get_school_matcher():
+    """
+    Возвращает SchoolMatcher, если ресурсы загружены.
+
+    Raises
+    ------
+    HTTPException
+        503, если приложение еще не готово принимать запросы.
+    """
+    if not startup_report.ready or school_marcher is None:
+        raise HTTPException(status_code=503, detail="Service is warming up")
+    return school_marcher
+
+
+async def call_matcher(method: str, *args):
+    """
+    Выполняет метод SchoolMatcher в пуле обработчиков и преобразует
+    перегрузку очереди и превышение времени ожидания в HTTP-ошибки.
+    """
+    get_school_matcher()
+    try:
+        return await matcher_pool.call(method, *args)
+    except MatcherOverloadedError as e:
+        logger.warning("Matcher is overloaded: %s", e)
+        raise HTTPException(status_code=503, detail="Matcher is overloaded")
+    except TimeoutError:
+        logger.warning("Matcher timeout: %s", method)
+        raise HTTPException(status_code=504, detail="Matcher timeout")
+    except BrokenProcessPool:
+        raise HTTPException(status_code=503, detail="Matcher worker failed")
 
 
 @router.post("/get_school_matches/", response_model=List[MatchResponse])
-def get_school_matches(
+async def get_school_matches(
     request: SchoolRequest,
     token: str = Depends(auth_dependency),
 ) -> List[MatchResponse]:
@@ -45,6 +179,8 @@ def get_school_matches(
     к меньшему
 
     - **school_name**: str, название школы и регион, разделенные запятой
+    - **search_mode**: str, необязательный способ поиска: "exact", "inverted",
+      "taat" или "lsh" (приближенный)
 
     Example response:
     [
@@ -70,25 +206,201 @@ def get_school_matches(
         },
     ]
     """
-    logger.info(f"Received request for school matches: {request.school_name}")
-    logger.debug(f"Token: {token}")
+    # Сообщения на пути запроса форматируются, только если уровень
+    # логгера их пропускает
+    logger.info("Received request for school matches: %s", request.school_name)
 
-    matches = school_marcher.find_school_match(request.school_name)
+    matches = await call_matcher(
+        "find_school_match", request.school_name, request.search_mode
+    )
     if matches:
-        logger.info(f"Matches found for school {request.school_name}: {matches}")
+        logger.debug("Matches found for school %s: %s", request.school_name, matches)
         return matches
     else:
-        logger.warning(f"No matches found for school {request.school_name}")
+        logger.warning("No matches found for school %s", request.school_name)
         raise HTTPException(status_code=404, detail="Matches not found")
 
 
-@router.post("/reload_resources/")
-def reload_resources(token: str = Depends(auth_dependency)):
+@router.post(
+    "/get_school_matches_batch/", response_model=List[BatchMatchResponse]
+)
+async def get_school_matches_batch(
+    request: SchoolBatchRequest,
+    token: str = Depends(auth_dependency),
+) -> List[BatchMatchResponse]:
     """
-    Эндпоинт для обновления ресурсов SchoolMatcher.
+    Функция для пакетного нахождения соответствий названий школ записям
+    в базе данных. Все названия векторизуются и сравниваются с
+    референсами за один проход. Результаты возвращаются в порядке
+    входных названий, ошибка обработки отдельного названия
+    указывается в поле error и не прерывает обработку остальных.
+
+    - **school_names**: List[str], названия школ и регионы, разделенные запятой
+    - **search_mode**: str, необязательный способ поиска
+
+    Example response:
+    [
+        {
+            "school_name": "Звездный лед",
+            "matches": [
+                {
+                    "id":62,
+                    "score":1.0,
+                },
+                ...
+            ],
+            "error": null,
+        },
+    ]
+    """
+    logger.info(
+        "Received batch request for school matches: %d names",
+        len(request.school_names),
+    )
+
+    if len(request.school_names) > MAX_BATCH_SIZE:
+        logger.warning(
+            "Batch size %d exceeds limit %d",
+            len(request.school_names),
+            MAX_BATCH_SIZE,
+        )
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch size exceeds limit of {MAX_BATCH_SIZE} names",
+        )
+
+    results = await call_matcher(
+        "find_school_matches", request.school_names, request.search_mode
+    )
+    n_errors = sum(result["error"] is not None for result in results)
+    logger.info("Batch processed: %d names, %d errors", len(results), n_errors)
+    return results
+
+
+@router.post("/search_recall/")
+async def search_recall(
+    request: SearchRecallRequest,
+    token: str = Depends(auth_dependency),
+) -> dict:
+    """
+    Эндпоинт для оценки полноты приближенного поиска относительно
+    точного на заданных названиях школ.
+
+    - **school_names**: List[str], названия школ для оценки
+    - **search_mode**: str, оцениваемый способ поиска (по умолчанию "lsh")
+
+    Оценка выполняется в пуле обработчиков с теми же ограничениями
+    очереди и времени ожидания, что и поиск. Названия, которые не
+    удалось предобработать, не оцениваются ("n_errors").
+
+    Example response:
+    {
+        "recall": 0.96,
+        "top1_agreement": 0.99,
+        "n_evaluated": 1000,
+        "search_mode": "lsh",
+        "n_queries": 1000,
+        "n_errors": 0,
+        "exact_seconds": 1.2,
+        "approximate_seconds": 0.3,
+    }
+    """
+    logger.info(
+        "Received search recall request: %d names, mode %s",
+        len(request.school_names),
+        request.search_mode,
+    )
+    if len(request.school_names) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch size exceeds limit of {MAX_BATCH_SIZE} names",
+        )
+    return await call_matcher(
+        "evaluate_search_recall", request.school_names, request.search_mode
+    )
+
+
+@router.get("/cache_stats/")
+def cache_stats(token: str = Depends(auth_dependency)) -> dict:
+    """
+    Эндпоинт для получения статистики кэша результатов поиска школ.
+
+    Example response:
+    {
+        "raw": {
+            "size": 120,
+            "max_size": 10000,
+            "hits": 950,
+            "misses": 130,
+            "hit_rate": 0.88,
+            "evictions": 0,
+            "expirations": 10,
+            "version": 1,
+        },
+        "normalized": {...},
+    }
+    """
+    return get_school_matcher().cache_stats()
+
+
+@router.post("/reload_resources/", status_code=202)
+def reload_resources(
+    incremental: bool = False, token: str = Depends(auth_dependency)
+) -> dict:
+    """
+    Эндпоинт для запуска фонового обновления ресурсов SchoolMatcher.
+    Запросы поиска во время обновления обслуживаются на прежних
+    ресурсах; новые ресурсы публикуются целиком после загрузки. Если
+    обновление уже выполняется, возвращается его задача.
+
+    - **incremental**: bool, учесть только школы, добавленные или
+      измененные после прошлого обновления, без переобучения
+      векторизатора (по умолчанию false)
+
+    Example response:
+    {
+        "job_id": "4f1c...",
+        "incremental": false,
+        "status": "pending",
+        "message": "Обновление ресурсов запущено",
+    }
+    """
+    get_school_matcher()
+    job = rebuild_jobs.submit(incremental)
+    logger.info("Resource reload job: %s, status %s", job.job_id, job.status)
+    return {
+        "job_id": job.job_id,
+        "incremental": job.incremental,
+        "status": job.status,
+        "message": "Обновление ресурсов запущено",
+    }
+
+
+@router.get("/reload_resources/{job_id}")
+def reload_resources_status(
+    job_id: str, token: str = Depends(auth_dependency)
+) -> dict:
+    """
+    Эндпоинт для получения состояния задачи обновления ресурсов.
+
+    Example response:
+    {
+        "job_id": "4f1c...",
+        "incremental": false,
+        "status": "running",
+        "stage": "preprocess train",
+        "stages": {"read data": 0.8, "load dictionaries": 0.6, ...},
+        "error": null,
+        "created_at": 1760000000.0,
+        "started_at": 1760000000.1,
+        "finished_at": null,
+        "elapsed_seconds": 12.5,
+        "version": null,
+        "result": null,
+    }
     """
-    logger.info("Starting resource reload")
-    school_marcher.create_resources()
-    school_marcher.load_resources()
-    logger.info("Resources reloaded successfully")
-    return {"message": "Ресурсы успешно обновлены"}
+    get_school_matcher()
+    job = rebuild_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
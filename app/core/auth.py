@@ -1,5 +1,9 @@
+import functools
 import os
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
 
 from fastapi import Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -14,6 +18,10 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 USER_LOGIN = os.getenv("USER_LOGIN")
 USER_PASSWORD = os.getenv("USER_PASSWORD")
+# Готовый bcrypt-хэш пароля; если не задан, хэшируется USER_PASSWORD
+USER_PASSWORD_HASH = os.getenv("USER_PASSWORD_HASH")
+# Количество проверенных токенов, для которых не повторяется jwt.decode
+TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 1024))
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -31,21 +39,41 @@ def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 
-# Функция для аутентификации пользователя
+@functools.lru_cache(maxsize=None)
+def get_user_password_hash() -> Optional[str]:
+    """
+    Возвращает хэш пароля пользователя. Пароль из переменной окружения
+    хэшируется один раз (bcrypt намеренно медленный); вызывается при
+    запуске приложения, чтобы первый вход не ждал хэширования.
+
+    Returns
+    -------
+    Optional[str]
+        Хэш пароля (None, если пароль не задан).
+    """
+    if USER_PASSWORD_HASH:
+        return USER_PASSWORD_HASH
+    if USER_PASSWORD is None:
+        return None
+    return get_hashed_password(USER_PASSWORD)
+
+
+# Функция для аутентификации пользователя. Проверка пароля занимает
+# сотни миллисекунд, поэтому вызывается вне цикла событий
 def authenticate_user(username: str, password: str):
     # Проверяем, соответствует ли введенный логин переменной окружения
     if username != USER_LOGIN:
-        logger.warning(f"Auth failed: Invalid username: {username}")
+        logger.warning("Auth failed: Invalid username: %s", username)
         return False
 
-    # Хэшируем пароль из переменной окружения и проверяем его
-    hashed_password = get_hashed_password(USER_PASSWORD)
-    if not verify_password(password, hashed_password):
-        logger.warning(f"Auth failed: Invalid password for user {username}")
+    # Проверяем пароль по хэшу, вычисленному один раз
+    hashed_password = get_user_password_hash()
+    if hashed_password is None or not verify_password(password, hashed_password):
+        logger.warning("Auth failed: Invalid password for user %s", username)
         return False
 
     # Если логин и пароль верны, возвращаем пользователя
-    logger.info(f"Auth success for user {username}")
+    logger.info("Auth success for user %s", username)
     return {"username": USER_LOGIN}
 
 
@@ -61,28 +89,66 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
         )
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    logger.info(f"JWT token created for user: {data.get('sub')}")
+    logger.info("JWT token created for user: %s", data.get("sub"))
     return encoded_jwt
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
 
+class TokenCache:
+    """
+    Кэш проверенных токенов: токен -> (пользователь, время истечения).
+    Токен из кэша принимается без повторного jwt.decode до истечения
+    срока действия (exp). При заполнении вытесняется давно не
+    использованный токен.
+
+    Parameters
+    ----------
+    max_size : int, optional
+        Наибольшее количество токенов (default is TOKEN_CACHE_SIZE).
+    """
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self.tokens: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+    def get(self, token: str) -> Optional[str]:
+        """Возвращает пользователя действующего токена из кэша."""
+        entry = self.tokens.get(token)
+        if entry is None:
+            return None
+        username, expires_at = entry
+        if time.time() >= expires_at:
+            del self.tokens[token]
+            return None
+        self.tokens.move_to_end(token)
+        return username
+
+    def put(self, token: str, username: str, expires_at: Optional[float]) -> None:
+        """Добавляет проверенный токен. Токен без exp не кэшируется."""
+        if self.max_size <= 0 or expires_at is None:
+            return
+        self.tokens[token] = (username, float(expires_at))
+        self.tokens.move_to_end(token)
+        while len(self.tokens) > self.max_size:
+            self.tokens.popitem(last=False)
+
+
 class AuthDependency:
+    def __init__(self, token_cache: Optional[TokenCache] = None):
+        # Зависимость вызывается в цикле событий, поэтому кэш не
+        # требует блокировок
+        self.token_cache = token_cache if token_cache is not None else TokenCache()
+
     async def __call__(self, authorization: str = Header(None)):
         # Глобальная переменная для отключения авторизации (например, через переменную окружения)
         disable_auth = os.getenv("DISABLE_AUTH", "false").lower() == "true"
-        logger.debug(f"disable_auth is set to {disable_auth}")
-
-        logger.debug("AuthDependency called")
 
         if disable_auth:
             # Если авторизация отключена, возвращаем None, чтобы пропустить проверку
-            logger.debug("Authorization is disabled, skipping auth check")
             return None
 
-        # logger.debug(f"Received token: {token}")
-
         if authorization is None:
             # Если токен отсутствует, возвращаем ошибку 401
             logger.error("Token is missing")
@@ -92,7 +158,11 @@ class AuthDependency:
             )
 
         token = authorization.replace("Bearer ", "")
-        logger.debug(f"Received token: {token}")
+
+        # Токен, уже проверенный и не истекший, принимается из кэша
+        username = self.token_cache.get(token)
+        if username is not None:
+            return username
 
         try:
             # Декодируем JWT-токен с использованием секретного ключа
@@ -103,7 +173,8 @@ class AuthDependency:
                 raise HTTPException(
                     status_code=401, detail="Unauthorized: Неверный токен"
                 )
-            logger.debug(f"Token is valid, user: {username}")
+            logger.debug("Token is valid, user: %s", username)
+            self.token_cache.put(token, username, payload.get("exp"))
             return username  # Возвращаем имя пользователя для дальнейшей обработки, если нужно
         except JWTError:
             # Если JWT некорректен, возвращаем ошибку 401
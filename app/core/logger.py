@@ -1,9 +1,182 @@
+import atexit
+import itertools
 import logging
 import os
+import queue
+import threading
+import time
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Hashable, Optional, Tuple
+
+from app.core.metrics import metrics
+
+# Способ записи логов: "queue" - запись в очередь, из которой файл
+# пишет отдельный поток (запрос не ждет записи на диск), "sync" -
+# запись в файл в потоке, выполняющем запрос
+LOG_MODE = os.getenv("LOG_MODE", "queue")
+# Размер очереди записей; при заполненной очереди записи отбрасываются
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+# Уровень логов по умолчанию и уровни отдельных логгеров,
+# например "school_matching=INFO,auth=WARNING"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG")
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# Доля записей DEBUG и INFO, сохраняемых для логгера,
+# например "school_matching=0.1" - сохраняется каждая десятая запись
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+_exception_formatter = logging.Formatter()
+
+DROPPED_RECORDS = metrics.counter(
+    "log_records_dropped_total",
+    "Записи логов, отброшенные из-за заполненной очереди",
+    ("file",),
+)
+
+# Файл логов -> (обработчик очереди, поток записи в файл)
+_queue_handlers: Dict[str, Tuple[QueueHandler, QueueListener]] = {}
+_queue_lock = threading.Lock()
+
+
+def parse_settings(value: str) -> Dict[str, str]:
+    """
+    Разбирает настройки логгеров вида "name=value,name=value".
+
+    Parameters
+    ----------
+    value : str
+        Строка настроек.
+
+    Returns
+    -------
+    Dict[str, str]
+        Имя логгера -> значение.
+    """
+    settings = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, setting = item.split("=", 1)
+            settings[name.strip()] = setting.strip()
+    return settings
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Фильтр, пропускающий каждую period-ю запись уровня не выше
+    max_level. Записи более высоких уровней пропускаются всегда.
+
+    Parameters
+    ----------
+    rate : float
+        Доля сохраняемых записей (от 0 до 1).
+    max_level : int, optional
+        Наибольший уровень прореживаемых записей (default is logging.INFO).
+    """
+
+    def __init__(self, rate: float, max_level: int = logging.INFO):
+        super().__init__()
+        self.period = max(1, round(1 / rate)) if rate > 0 else 0
+        self.max_level = max_level
+        self._counter = itertools.count()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level:
+            return True
+        if not self.period:
+            return False
+        return next(self._counter) % self.period == 0
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Обработчик очереди, отбрасывающий записи при заполненной очереди."""
+
+    def __init__(self, log_queue: queue.Queue, log_file: str):
+        super().__init__(log_queue)
+        self.log_file = log_file
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # В потоке запроса только подставляются аргументы сообщения и
+        # форматируется исключение; запись форматируется потоком записи
+        # в файл (QueueHandler.prepare форматирует и копирует запись)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED_RECORDS.inc(self.log_file)
+
+
+def _file_handler(log_file: str) -> logging.FileHandler:
+    handler = logging.FileHandler(log_file)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return handler
+
+
+def _queue_handler(log_file: str) -> QueueHandler:
+    # Все логгеры, пишущие в один файл, используют общую очередь и поток
+    with _queue_lock:
+        if log_file not in _queue_handlers:
+            log_queue = queue.Queue(LOG_QUEUE_SIZE)
+            listener = QueueListener(log_queue, _file_handler(log_file))
+            listener.start()
+            _queue_handlers[log_file] = (
+                DroppingQueueHandler(log_queue, log_file),
+                listener,
+            )
+        return _queue_handlers[log_file][0]
+
+
+def flush_logs() -> None:
+    """Ожидает записи в файлы всех записей из очередей логов."""
+    for handler, _ in list(_queue_handlers.values()):
+        handler.queue.join()
+
+
+@atexit.register
+def stop_logging() -> None:
+    """Записывает оставшиеся записи очередей и останавливает потоки записи."""
+    with _queue_lock:
+        for _, listener in _queue_handlers.values():
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+        _queue_handlers.clear()
 
 
 # Функция для настройки логирования
-def setup_logger(name: str, log_file: str, level=logging.DEBUG):
+def setup_logger(
+    name: str,
+    log_file: str,
+    level: Optional[int] = None,
+    mode: str = LOG_MODE,
+):
+    """
+    Настраивает логгер с записью в файл.
+
+    Parameters
+    ----------
+    name : str
+        Имя логгера.
+    log_file : str
+        Файл логов.
+    level : Optional[int], optional
+        Уровень логгера. Уровень из LOG_LEVELS имеет приоритет
+        (default is None - LOG_LEVEL).
+    mode : str, optional
+        Способ записи: "queue" или "sync" (default is LOG_MODE).
+
+    Returns
+    -------
+    logging.Logger
+        Логгер.
+    """
     # Создаем директорию для логов, если она не существует
     log_dir = os.path.dirname(log_file)
     if not os.path.exists(log_dir):
@@ -11,20 +184,84 @@ def setup_logger(name: str, log_file: str, level=logging.DEBUG):
 
     # Создаем логгер с именем
     logger = logging.getLogger(name)
-    logger.setLevel(level)
-
-    # Создаем обработчик для записи логов в файл
-    handler = logging.FileHandler(log_file)
-    handler.setLevel(level)
-
-    # Формат сообщений в логах
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
-    handler.setFormatter(formatter)
+    if level is None:
+        level = LOG_LEVEL
+    logger.setLevel(parse_settings(LOG_LEVELS).get(name, level))
 
     # Добавляем обработчик в логгер
     if not logger.handlers:
-        logger.addHandler(handler)
+        if mode == "queue":
+            logger.addHandler(_queue_handler(log_file))
+        else:
+            logger.addHandler(_file_handler(log_file))
+
+        rate = parse_settings(LOG_SAMPLING).get(name)
+        if rate is not None and float(rate) < 1:
+            logger.addFilter(SamplingFilter(float(rate)))
 
     return logger
+
+
+class LogCounter:
+    """
+    Счетчик повторяющихся событий, который вместо записи в лог каждого
+    события периодически записывает сводку: самые частые значения и
+    общее количество с прошлой записи.
+
+    Сводка записывается при добавлении события, если с прошлой записи
+    прошло не меньше interval секунд, и при завершении процесса.
+
+    Parameters
+    ----------
+    logger : logging.Logger
+        Логгер для сводок.
+    message : str
+        Заголовок сводки.
+    interval : float, optional
+        Интервал записи сводок в секундах (default is 60).
+    top : int, optional
+        Количество значений в сводке (default is 20).
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        message: str,
+        interval: float = 60,
+        top: int = 20,
+    ):
+        self.logger = logger
+        self.message = message
+        self.interval = interval
+        self.top = top
+        self.counts: Counter = Counter()
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def add(self, value: Hashable) -> None:
+        """Учитывает событие и при необходимости записывает сводку."""
+        with self.lock:
+            self.counts[value] += 1
+            due = time.monotonic() - self.last_flush >= self.interval
+        if due:
+            self.flush()
+
+    def flush(self) -> Dict[Hashable, int]:
+        """
+        Записывает сводку накопленных событий и сбрасывает счетчик.
+
+        Returns
+        -------
+        Dict[Hashable, int]
+            Значение -> количество событий с прошлой записи.
+        """
+        with self.lock:
+            counts, self.counts = self.counts, Counter()
+            self.last_flush = time.monotonic()
+        if counts:
+            self.logger.info(
+                f"{self.message}: {dict(counts.most_common(self.top))}, "
+                f"total {sum(counts.values())}, distinct {len(counts)}"
+            )
+        return dict(counts)
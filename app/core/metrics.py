@@ -0,0 +1,288 @@
+import bisect
+import math
+import threading
+from typing import Any, Dict, List, Sequence, Tuple
+
+# Границы корзин гистограмм времени в секундах
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Тип содержимого текстового формата Prometheus
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'),
+        )
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Counter:
+    """
+    Счетчик с метками.
+
+    Parameters
+    ----------
+    name : str
+        Имя метрики (для счетчиков оканчивается на _total).
+    documentation : str
+        Описание метрики.
+    labelnames : Sequence[str], optional
+        Имена меток (default is ()).
+    """
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        """
+        Увеличивает счетчик.
+
+        Parameters
+        ----------
+        *labels : str
+            Значения меток в порядке labelnames.
+        amount : float, optional
+            Приращение (default is 1.0).
+        """
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def drain(self) -> Dict[Tuple[str, ...], float]:
+        """Возвращает накопленные значения и обнуляет счетчик."""
+        with self.lock:
+            values, self.values = self.values, {}
+        return values
+
+    def merge(self, values: Dict[Tuple[str, ...], float]) -> None:
+        """Добавляет значения, полученные из drain другого счетчика."""
+        with self.lock:
+            for labels, value in values.items():
+                self.values[labels] = self.values.get(labels, 0.0) + value
+
+    def samples(self) -> List[str]:
+        """Возвращает строки значений в текстовом формате Prometheus."""
+        with self.lock:
+            values = dict(self.values)
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} "
+            f"{_format_value(value)}"
+            for labels, value in sorted(values.items())
+        ]
+
+
+class Histogram:
+    """
+    Гистограмма с метками: количество наблюдений по корзинам, их сумма
+    и количество. Корзина с границей le учитывает наблюдения не больше le.
+
+    Parameters
+    ----------
+    name : str
+        Имя метрики.
+    documentation : str
+        Описание метрики.
+    labelnames : Sequence[str], optional
+        Имена меток (default is ()).
+    buckets : Sequence[float], optional
+        Возрастающие границы корзин (default is DEFAULT_BUCKETS).
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(float(bound) for bound in buckets)
+        # Метки -> [количество по корзинам (последняя - +Inf), сумма]
+        self.values: Dict[Tuple[str, ...], List[Any]] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        """
+        Добавляет наблюдение.
+
+        Parameters
+        ----------
+        value : float
+            Наблюдаемое значение.
+        *labels : str
+            Значения меток в порядке labelnames.
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def drain(self) -> Dict[Tuple[str, ...], List[Any]]:
+        """Возвращает накопленные значения и обнуляет гистограмму."""
+        with self.lock:
+            values, self.values = self.values, {}
+        return values
+
+    def merge(self, values: Dict[Tuple[str, ...], List[Any]]) -> None:
+        """Добавляет значения, полученные из drain другой гистограммы."""
+        with self.lock:
+            for labels, (counts, total) in values.items():
+                state = self.values.get(labels)
+                if state is None:
+                    state = self.values[labels] = [[0] * len(counts), 0.0]
+                state[0] = [a + b for a, b in zip(state[0], counts)]
+                state[1] += total
+
+    def samples(self) -> List[str]:
+        """Возвращает строки значений в текстовом формате Prometheus."""
+        with self.lock:
+            values = {labels: (list(c), s) for labels, (c, s) in self.values.items()}
+        names = self.labelnames + ("le",)
+        lines = []
+        for labels, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = _format_value(bound)
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(names, labels + (le,))} "
+                    f"{cumulative}"
+                )
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Набор метрик приложения, выгружаемый в текстовом формате Prometheus.
+
+    Метрики обновляются из потоков обработчиков, поэтому каждая метрика
+    защищена собственной блокировкой. Процессы-обработчики накапливают
+    метрики в своем наборе и передают приращения в основной процесс
+    вместе с результатами (см. drain и merge).
+    """
+
+    def __init__(self):
+        self.metrics: Dict[str, Any] = {}
+
+    def _register(self, metric):
+        existing = self.metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        """Создает счетчик или возвращает уже зарегистрированный (см. Counter)."""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """
+        Создает гистограмму или возвращает уже зарегистрированную
+        (см. Histogram).
+        """
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def drain(self) -> Dict[str, Any]:
+        """
+        Возвращает значения всех метрик и обнуляет их.
+
+        Returns
+        -------
+        Dict[str, Any]
+            Имя метрики -> значения по меткам (только изменившиеся
+            метрики).
+        """
+        state = {}
+        for name, metric in self.metrics.items():
+            values = metric.drain()
+            if values:
+                state[name] = values
+        return state
+
+    def merge(self, state: Dict[str, Any]) -> None:
+        """
+        Добавляет значения, полученные из drain набора метрик другого
+        процесса. Метрики, которых нет в наборе, пропускаются.
+
+        Parameters
+        ----------
+        state : Dict[str, Any]
+            Результат drain.
+        """
+        for name, values in state.items():
+            metric = self.metrics.get(name)
+            if metric is not None:
+                metric.merge(values)
+
+    def render(self) -> str:
+        """
+        Возвращает все метрики в текстовом формате Prometheus.
+
+        Returns
+        -------
+        str
+            Описание, тип и значения каждой метрики.
+        """
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+# Метрики приложения
+metrics = MetricsRegistry()
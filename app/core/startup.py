@@ -0,0 +1,62 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Union
+
+
+@contextmanager
+def timed(timings: Dict[str, float], name: str) -> Iterator[None]:
+    """
+    Записывает время выполнения блока в секундах в timings[name].
+
+    Parameters
+    ----------
+    timings : Dict[str, float]
+        Словарь времени выполнения этапов.
+    name : str
+        Название этапа.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - start
+
+
+class StartupReport:
+    """
+    Отчет о запуске приложения: время загрузки каждого компонента и
+    признак готовности принимать запросы.
+    """
+
+    def __init__(self):
+        # Время этапов запуска и время загрузки компонентов внутри этапов
+        self.timings: Dict[str, float] = {}
+        self.details: Dict[str, float] = {}
+        self.ready = False
+        self.error: Optional[str] = None
+
+    def stage(self, name: str):
+        """Замеряет время этапа запуска (см. timed)."""
+        return timed(self.timings, name)
+
+    def summary(self) -> Dict[str, Union[bool, float, str, Dict[str, float], None]]:
+        """
+        Возвращает отчет о запуске.
+
+        Returns
+        -------
+        Dict[str, Union[bool, float, str, Dict[str, float], None]]
+            Признак готовности, ошибка запуска, общее время, время
+            каждого этапа и компонентов внутри этапов в секундах.
+        """
+        return {
+            "ready": self.ready,
+            "error": self.error,
+            "total_seconds": round(sum(self.timings.values()), 4),
+            "stages": {name: round(value, 4) for name, value in self.timings.items()},
+            "details": {name: round(value, 4) for name, value in self.details.items()},
+        }
+
+
+# Отчет о запуске приложения
+startup_report = StartupReport()
@@ -117,8 +117,8 @@ class StreamlitService:
                 f"{self.api_url}/data/reload_resources/",
                 headers=headers,
             )
-            if response.status_code == 200:
-                return True
+            if response.status_code == 202:
+                return response.json()["job_id"]
             else:
                 st.error("Не удалось обновить данные.")
         else:
@@ -146,8 +146,9 @@ class StreamlitService:
                         st.write("Пожалуйста, введите название школы")
 
                 if st.button("Обновить данные сервиса"):
-                    if self.reload_resources():
-                        st.success("Данные обновлены.")
+                    job_id = self.reload_resources()
+                    if job_id:
+                        st.success(f"Обновление данных запущено, задача {job_id}.")
 
             with tab2:
                 st.info("В разработке")
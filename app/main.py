@@ -1,8 +1,38 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
 from app.api import router
+from app.api.school_matching import endpoints as school_matching
+from app.core.auth import get_user_password_hash
+from app.core.logger import setup_logger
+
+logger = setup_logger("main", "app/logs/main/logs.log")
+
+# Загрузка ресурсов при запуске: "background" - в фоне, приложение сразу
+# принимает соединения и сообщает о готовности через /main/status;
+# "blocking" - запуск завершается после загрузки
+WARMUP_MODE = os.getenv("SCHOOL_MATCHER_WARMUP", "background")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop = asyncio.get_running_loop()
+    # Пароль пользователя хэшируется один раз при запуске
+    await loop.run_in_executor(None, get_user_password_hash)
+    warm_up = loop.run_in_executor(None, school_matching.warm_up)
+    if WARMUP_MODE == "blocking":
+        await warm_up
+    yield
+    if not warm_up.done():
+        logger.info("Shutdown during warm up, waiting for it to finish")
+    await asyncio.gather(warm_up, return_exceptions=True)
+    school_matching.shut_down()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Подключение API роутеров
 app.include_router(router)
@@ -0,0 +1,314 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import create_engine
+
+from app.core.logger import setup_logger
+from app.core.startup import timed
+
+# Инициализируем логгер для school_matcher
+logger = setup_logger("school_matcher", "app/logs/school_matcher/logs.log")
+
+# Где создаются ресурсы: "process" - в отдельном процессе, чтобы не
+# занимать GIL процесса, обслуживающего запросы; "thread" - в потоке
+# основного процесса (например, для базы данных в памяти)
+REBUILD_MODE = os.getenv("SCHOOL_MATCHER_REBUILD_MODE", "process")
+# Количество хранимых завершенных задач
+REBUILD_HISTORY = int(os.getenv("SCHOOL_MATCHER_REBUILD_HISTORY", 20))
+# Интервал инкрементального обновления по расписанию в секундах
+# (0 - без расписания)
+UPDATE_INTERVAL = float(os.getenv("SCHOOL_MATCHER_UPDATE_INTERVAL", 0))
+
+PENDING, RUNNING, SUCCEEDED, FAILED = "pending", "running", "succeeded", "failed"
+
+
+def _build(matcher: Any, incremental: bool, timings, progress) -> Dict[str, Any]:
+    if incremental:
+        return matcher.update_resources(timings, progress)
+    matcher.create_resources(timings, progress)
+    return {"mode": "full", "reason": "requested"}
+
+
+def _build_in_process(
+    database_url: str, resources_dir: str, incremental: bool, messages
+) -> None:
+    """
+    Создает ресурсы в отдельном процессе и передает ход выполнения
+    через очередь сообщений.
+    """
+    from app.services.school_matcher.school_matcher import SchoolMatcher
+
+    timings: Dict[str, float] = {}
+    try:
+        matcher = SchoolMatcher(
+            create_engine(database_url), load=False, resources_dir=resources_dir
+        )
+        result = _build(
+            matcher,
+            incremental,
+            timings,
+            lambda stage: messages.put(("stage", stage, dict(timings))),
+        )
+    except Exception as e:
+        messages.put(("failed", str(e), timings))
+    else:
+        messages.put(("done", result, timings))
+
+
+class RebuildJob:
+    """
+    Задача обновления ресурсов.
+
+    Parameters
+    ----------
+    job_id : str
+        Идентификатор задачи.
+    incremental : bool, optional
+        Инкрементальное обновление вместо полного (default is False).
+    """
+
+    def __init__(self, job_id: str, incremental: bool = False):
+        self.job_id = job_id
+        self.incremental = incremental
+        self.status = PENDING
+        self.stage: Optional[str] = None
+        self.stages: Dict[str, float] = {}
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.version: Optional[int] = None
+        self.result: Optional[Dict[str, Any]] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in (PENDING, RUNNING)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Возвращает состояние задачи.
+
+        Returns
+        -------
+        Dict[str, Any]
+            Вид обновления, статус, текущий этап, время завершенных этапов
+            в секундах, ошибка, моменты создания, начала и завершения,
+            версия опубликованных ресурсов и итог обновления.
+        """
+        finished_at = self.finished_at or time.time()
+        return {
+            "job_id": self.job_id,
+            "incremental": self.incremental,
+            "status": self.status,
+            "stage": self.stage,
+            "stages": {name: round(value, 4) for name, value in self.stages.items()},
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": (
+                round(finished_at - self.started_at, 4) if self.started_at else 0.0
+            ),
+            "version": self.version,
+            "result": self.result,
+        }
+
+
+class RebuildJobs:
+    """
+    Фоновое обновление ресурсов SchoolMatcher.
+
+    Задача создает ресурсы по данным из базы данных (полностью или
+    инкрементально, см. SchoolMatcher.update_resources), загружает их в
+    новый набор ресурсов и атомарно публикует его (см.
+    SchoolMatcher.publish_snapshot). Запросы во время обновления
+    обслуживаются на прежнем наборе. Одновременно выполняется не больше
+    одной задачи: повторный запуск возвращает уже выполняющуюся задачу.
+
+    Parameters
+    ----------
+    matcher : Any
+        Объект поиска, в котором публикуются новые ресурсы.
+    database_url : Optional[str], optional
+        Строка подключения к базе данных для режима "process"
+        (default is None).
+    mode : str, optional
+        Где создаются ресурсы: "process" или "thread"
+        (default is REBUILD_MODE).
+    on_published : Optional[Callable[[], None]], optional
+        Вызывается после публикации ресурсов, например, для
+        перезапуска процессов-обработчиков (default is None).
+    history : int, optional
+        Количество хранимых задач (default is REBUILD_HISTORY).
+    """
+
+    def __init__(
+        self,
+        matcher: Any,
+        database_url: Optional[str] = None,
+        mode: str = REBUILD_MODE,
+        on_published: Optional[Callable[[], None]] = None,
+        history: int = REBUILD_HISTORY,
+    ):
+        if mode not in ("process", "thread"):
+            raise ValueError(f"Unknown rebuild mode: {mode}")
+        if mode == "process" and not database_url:
+            raise ValueError("database_url is required for rebuild mode process")
+        self.matcher = matcher
+        self.database_url = database_url
+        self.mode = mode
+        self.on_published = on_published
+        self.history = history
+        self.jobs: "OrderedDict[str, RebuildJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._schedule_stop: Optional[threading.Event] = None
+
+    def submit(self, incremental: bool = False) -> RebuildJob:
+        """
+        Запускает обновление ресурсов в фоне.
+
+        Parameters
+        ----------
+        incremental : bool, optional
+            Инкрементальное обновление вместо полного (default is False).
+
+        Returns
+        -------
+        RebuildJob
+            Новая задача или уже выполняющаяся задача.
+        """
+        with self._lock:
+            for job in self.jobs.values():
+                if job.active:
+                    return job
+            job = RebuildJob(uuid.uuid4().hex, incremental)
+            self.jobs[job.job_id] = job
+            while len(self.jobs) > self.history:
+                self.jobs.popitem(last=False)
+
+        logger.info(f"Rebuild job {job.job_id} is submitted")
+        threading.Thread(
+            target=self._run, args=(job,), name=f"rebuild-{job.job_id}", daemon=True
+        ).start()
+        return job
+
+    def get(self, job_id: str) -> Optional[RebuildJob]:
+        """Возвращает задачу по идентификатору или None."""
+        return self.jobs.get(job_id)
+
+    def _set_stage(self, job: RebuildJob, stage: str) -> None:
+        job.stage = stage
+        logger.info(f"Rebuild job {job.job_id}: {stage}")
+
+    def start_schedule(self, interval: float = UPDATE_INTERVAL) -> None:
+        """
+        Запускает инкрементальное обновление ресурсов каждые interval
+        секунд. Полное переобучение при необходимости выполняется
+        внутри обновления (см. SchoolMatcher.update_resources).
+
+        Parameters
+        ----------
+        interval : float, optional
+            Интервал в секундах, 0 - без расписания
+            (default is UPDATE_INTERVAL).
+        """
+        if interval <= 0 or self._schedule_stop is not None:
+            return
+        stop = self._schedule_stop = threading.Event()
+
+        def run_schedule():
+            while not stop.wait(interval):
+                self.submit(incremental=True)
+
+        logger.info(f"Incremental resource update every {interval} seconds")
+        threading.Thread(
+            target=run_schedule, name="rebuild-schedule", daemon=True
+        ).start()
+
+    def stop_schedule(self) -> None:
+        """Останавливает обновление по расписанию."""
+        if self._schedule_stop is not None:
+            self._schedule_stop.set()
+            self._schedule_stop = None
+
+    def _build(self, job: RebuildJob) -> Dict[str, Any]:
+        if self.mode == "thread":
+            return _build(
+                self.matcher,
+                job.incremental,
+                job.stages,
+                lambda stage: self._set_stage(job, stage),
+            )
+
+        context = multiprocessing.get_context("spawn")
+        messages = context.Queue()
+        process = context.Process(
+            target=_build_in_process,
+            args=(
+                self.database_url,
+                self.matcher.resources_dir,
+                job.incremental,
+                messages,
+            ),
+            name=f"rebuild-{job.job_id}",
+            # Файлы ресурсов заменяются атомарно, поэтому при остановке
+            # приложения процесс можно прервать
+            daemon=True,
+        )
+        process.start()
+        try:
+            while True:
+                try:
+                    kind, value, timings = messages.get(timeout=1)
+                except queue.Empty:
+                    if not process.is_alive():
+                        raise RuntimeError(
+                            f"Rebuild process exited with code {process.exitcode}"
+                        )
+                    continue
+                job.stages.update(timings)
+                if kind == "stage":
+                    self._set_stage(job, value)
+                elif kind == "failed":
+                    raise RuntimeError(value)
+                else:
+                    return value
+        finally:
+            process.join()
+
+    def _publish(self, job: RebuildJob) -> None:
+        self._set_stage(job, "load snapshot")
+        with timed(job.stages, "load snapshot"):
+            snapshot = self.matcher.load_snapshot()
+        self._set_stage(job, "publish")
+        with timed(job.stages, "publish"):
+            job.version = self.matcher.publish_snapshot(snapshot).version
+            if self.on_published is not None:
+                self.on_published()
+
+    def _run(self, job: RebuildJob) -> None:
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = self._build(job)
+            # Если новых и измененных записей нет, ресурсы не менялись
+            if job.result["mode"] == "full" or (
+                job.result["added"] or job.result["replaced"]
+            ):
+                self._publish(job)
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+            logger.exception(f"Rebuild job {job.job_id} failed: {e}")
+        else:
+            job.status = SUCCEEDED
+            logger.info(f"Rebuild job {job.job_id} succeeded: {job.stages}")
+        finally:
+            job.stage = None
+            job.finished_at = time.time()
@@ -0,0 +1,453 @@
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import text
+
+from app.services.school_matcher.utils.name_pipeline import NamePipeline
+
+# Количество процессов предобработки при создании ресурсов (по умолчанию -
+# по процессу на ядро, 1 - без процессов) и минимальное количество
+# названий в одной части
+BUILD_WORKERS = int(os.getenv("SCHOOL_MATCHER_BUILD_WORKERS", os.cpu_count() or 1))
+MIN_CHUNK_SIZE = 500
+
+# Количество строк, читаемых из базы данных за один раз, и ограничение
+# памяти одной прочитанной части в мегабайтах (0 - без ограничения)
+READ_CHUNK_SIZE = int(os.getenv("SCHOOL_MATCHER_READ_CHUNK_SIZE", 50000))
+BUILD_MEMORY_MB = float(os.getenv("SCHOOL_MATCHER_BUILD_MEMORY_MB", 0))
+# Размер первой части, по которой оценивается память одной строки
+PROBE_ROWS = 1000
+
+# Предобработка названий в процессе пула
+_worker_pipeline: Optional[NamePipeline] = None
+
+
+def _init_worker(pipeline: NamePipeline) -> None:
+    global _worker_pipeline
+    _worker_pipeline = pipeline
+
+
+def preprocess_names_chunk(
+    names: List[str], pipeline: Optional[NamePipeline] = None
+) -> List[str]:
+    """
+    Предобрабатывает названия школ для создания ресурсов.
+
+    Parameters
+    ----------
+    names : List[str]
+        Названия школ.
+    pipeline : Optional[NamePipeline], optional
+        Предобработка названий (default is None - предобработка процесса).
+
+    Returns
+    -------
+    List[str]
+        Предобработанные названия.
+    """
+    pipeline = pipeline or _worker_pipeline
+    return [name for name, _ in pipeline.process_many(names)]
+
+
+class NamePreprocessor:
+    """
+    Предобработка названий школ частями в пуле процессов.
+
+    Пул создается при первой обработке, для которой нужно больше одной
+    части, и используется для всех последующих вызовов, поэтому при
+    потоковом чтении процессы не запускаются заново для каждой
+    прочитанной части. Каждый процесс получает предобработку названий
+    один раз при запуске и выполняет всю цепочку для своей части
+    названий. Порядок результатов совпадает с порядком названий.
+
+    Parameters
+    ----------
+    pipeline : NamePipeline
+        Предобработка названий.
+    n_workers : int, optional
+        Количество процессов, 1 - в текущем процессе
+        (default is BUILD_WORKERS).
+    chunk_size : Optional[int], optional
+        Количество названий в одной части (default is None - четыре
+        части на процесс, но не меньше MIN_CHUNK_SIZE названий).
+    """
+
+    def __init__(
+        self,
+        pipeline: NamePipeline,
+        n_workers: int = BUILD_WORKERS,
+        chunk_size: Optional[int] = None,
+    ):
+        self.pipeline = pipeline
+        self.n_workers = n_workers
+        self.chunk_size = chunk_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def __call__(self, names: List[str]) -> List[str]:
+        """
+        Предобрабатывает названия школ.
+
+        Parameters
+        ----------
+        names : List[str]
+            Названия школ.
+
+        Returns
+        -------
+        List[str]
+            Предобработанные названия.
+        """
+        chunk_size = self.chunk_size or max(
+            MIN_CHUNK_SIZE, -(-len(names) // (max(self.n_workers, 1) * 4))
+        )
+        if self.n_workers <= 1 or len(names) <= chunk_size:
+            return preprocess_names_chunk(names, self.pipeline)
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.n_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.pipeline,),
+            )
+        chunks = [names[i : i + chunk_size] for i in range(0, len(names), chunk_size)]
+        processed = self._executor.map(preprocess_names_chunk, chunks)
+        return [name for chunk in processed for name in chunk]
+
+    def close(self) -> None:
+        """Останавливает пул процессов."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> "NamePreprocessor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def preprocess_names(
+    names: List[str],
+    pipeline: NamePipeline,
+    n_workers: int = BUILD_WORKERS,
+    chunk_size: Optional[int] = None,
+) -> List[str]:
+    """
+    Предобрабатывает названия школ частями в пуле процессов (см.
+    NamePreprocessor).
+
+    Parameters
+    ----------
+    names : List[str]
+        Названия школ.
+    pipeline : NamePipeline
+        Предобработка названий.
+    n_workers : int, optional
+        Количество процессов, 1 - в текущем процессе
+        (default is BUILD_WORKERS).
+    chunk_size : Optional[int], optional
+        Количество названий в одной части (default is None).
+
+    Returns
+    -------
+    List[str]
+        Предобработанные названия.
+    """
+    with NamePreprocessor(pipeline, n_workers, chunk_size) as preprocess:
+        return preprocess(names)
+
+
+def read_sql_chunks(
+    connection: Any,
+    query: str,
+    params: Optional[Dict[str, Any]] = None,
+    chunk_size: int = READ_CHUNK_SIZE,
+    memory_mb: float = BUILD_MEMORY_MB,
+) -> Iterator[pd.DataFrame]:
+    """
+    Читает результат запроса частями через серверный курсор.
+
+    Для PostgreSQL строки передаются с сервера по мере чтения
+    (stream_results), а не загружаются драйвером целиком; курсор SQLite
+    читает строки по мере обращения. Если задано ограничение памяти,
+    размер первой части ограничен PROBE_ROWS строками, а размер
+    следующих частей вычисляется по памяти одной строки первой части.
+    Пустой результат возвращается одной пустой частью со столбцами
+    запроса.
+
+    Parameters
+    ----------
+    connection : Any
+        Соединение SQLAlchemy.
+    query : str
+        Текст запроса.
+    params : Optional[Dict[str, Any]], optional
+        Параметры запроса (default is None).
+    chunk_size : int, optional
+        Наибольшее количество строк в одной части
+        (default is READ_CHUNK_SIZE).
+    memory_mb : float, optional
+        Ограничение памяти одной части в мегабайтах, 0 - без
+        ограничения (default is BUILD_MEMORY_MB).
+
+    Yields
+    ------
+    pd.DataFrame
+        Части результата запроса.
+    """
+    result = connection.execute(
+        text(query).execution_options(stream_results=True, max_row_buffer=chunk_size),
+        params or {},
+    )
+    columns = list(result.keys())
+    size = min(chunk_size, PROBE_ROWS) if memory_mb else chunk_size
+    empty = True
+    try:
+        while True:
+            rows = result.fetchmany(size)
+            if not rows:
+                break
+            empty = False
+            chunk = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+            if memory_mb:
+                row_bytes = chunk.memory_usage(deep=True).sum() / len(chunk)
+                size = max(1, min(chunk_size, int(memory_mb * 2**20 / row_bytes)))
+            yield chunk
+    finally:
+        result.close()
+    if empty:
+        yield pd.DataFrame(columns=columns)
+
+
+def read_sql_frame(
+    connection: Any,
+    query: str,
+    params: Optional[Dict[str, Any]] = None,
+    chunk_size: int = READ_CHUNK_SIZE,
+    memory_mb: float = BUILD_MEMORY_MB,
+) -> pd.DataFrame:
+    """
+    Читает результат запроса частями (см. read_sql_chunks) и объединяет
+    их в один DataFrame.
+    """
+    return pd.concat(
+        read_sql_chunks(connection, query, params, chunk_size, memory_mb),
+        ignore_index=True,
+    )
+
+
+def read_table(path: str) -> pd.DataFrame:
+    """
+    Читает выгрузку таблицы из файла CSV или Parquet.
+
+    Для Parquet нужен pyarrow или fastparquet.
+
+    Parameters
+    ----------
+    path : str
+        Путь к файлу .csv или .parquet.
+
+    Returns
+    -------
+    pd.DataFrame
+        Данные таблицы.
+
+    Raises
+    ------
+    ValueError
+        Если формат файла не поддерживается.
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix == ".csv":
+        return pd.read_csv(path)
+    if suffix in (".parquet", ".pq"):
+        return pd.read_parquet(path)
+    raise ValueError(f"Unsupported file format: {path}")
+
+
+def read_table_chunks(
+    path: str, chunk_size: int = READ_CHUNK_SIZE
+) -> Iterator[pd.DataFrame]:
+    """
+    Читает выгрузку таблицы из файла CSV или Parquet частями.
+
+    Файл Parquet читается частями через pyarrow, без pyarrow - целиком.
+
+    Parameters
+    ----------
+    path : str
+        Путь к файлу .csv или .parquet.
+    chunk_size : int, optional
+        Количество строк в одной части (default is READ_CHUNK_SIZE).
+
+    Yields
+    ------
+    pd.DataFrame
+        Части таблицы.
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix == ".csv":
+        with pd.read_csv(path, chunksize=chunk_size) as reader:
+            yield from reader
+        return
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        pq = None
+    if pq is None or suffix not in (".parquet", ".pq"):
+        yield read_table(path)
+        return
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield batch.to_pandas()
+
+
+def build_from_files(
+    schools_path: str,
+    similar_schools_path: str,
+    resources_dir: str,
+    n_workers: int,
+) -> Dict[str, float]:
+    """
+    Создает ресурсы по выгрузкам таблиц schools и similar_schools.
+
+    Parameters
+    ----------
+    schools_path : str
+        Выгрузка schools с полями id, name и region.
+    similar_schools_path : str
+        Выгрузка similar_schools с полями school_id и name.
+    resources_dir : str
+        Директория ресурсов.
+    n_workers : int
+        Количество процессов предобработки.
+
+    Returns
+    -------
+    Dict[str, float]
+        Время этапов в секундах.
+    """
+    from app.services.school_matcher.school_matcher import SchoolMatcher, build_stage
+
+    timings: Dict[str, float] = {}
+    with build_stage("read data", timings):
+        data_reference = read_table(schools_path)
+
+    # Выгрузка similar_schools читается частями во время предобработки
+    matcher = SchoolMatcher(None, load=False, resources_dir=resources_dir)
+    matcher.process_resource(
+        data_reference,
+        (
+            chunk[["school_id", "name"]]
+            for chunk in read_table_chunks(similar_schools_path)
+        ),
+        timings,
+        n_workers=n_workers,
+    )
+    if not data_reference.empty:
+        matcher.save_index_state(
+            {
+                "column": "id",
+                "watermark": int(data_reference["id"].max()),
+                "fitted_at": time.time(),
+                "tokens": 0,
+                "oov_tokens": 0,
+            }
+        )
+    return timings
+
+
+def build_from_database(
+    database_url: str, resources_dir: str, n_workers: int
+) -> Dict[str, float]:
+    """
+    Создает ресурсы по данным из базы данных (см. create_resources).
+
+    Parameters
+    ----------
+    database_url : str
+        Строка подключения к базе данных.
+    resources_dir : str
+        Директория ресурсов.
+    n_workers : int
+        Количество процессов предобработки.
+
+    Returns
+    -------
+    Dict[str, float]
+        Время этапов в секундах.
+    """
+    from sqlalchemy import create_engine
+
+    from app.services.school_matcher.school_matcher import SchoolMatcher
+
+    matcher = SchoolMatcher(
+        create_engine(database_url), load=False, resources_dir=resources_dir
+    )
+    return matcher.create_resources(n_workers=n_workers)
+
+
+def format_timings(timings: Dict[str, float]) -> str:
+    """Форматирует время этапов в таблицу."""
+    width = max(len(name) for name in [*timings, "total"])
+    lines = [f"{name:<{width}}  {seconds:9.3f} s" for name, seconds in timings.items()]
+    lines.append(f"{'total':<{width}}  {sum(timings.values()):9.3f} s")
+    return "\n".join(lines)
+
+
+def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Создание ресурсов поиска школ с параллельной предобработкой"
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "--database-url", help="строка подключения к базе данных (DATABASE_URL)"
+    )
+    source.add_argument(
+        "--schools", help="выгрузка таблицы schools в формате CSV или Parquet"
+    )
+    parser.add_argument(
+        "--similar-schools",
+        help="выгрузка таблицы similar_schools в формате CSV или Parquet",
+    )
+    parser.add_argument(
+        "--output",
+        default="app/services/school_matcher/resources",
+        help="директория ресурсов",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=BUILD_WORKERS,
+        help="количество процессов предобработки "
+        "(по умолчанию SCHOOL_MATCHER_BUILD_WORKERS или количество ядер)",
+    )
+    parsed = parser.parse_args(args)
+    if parsed.schools and not parsed.similar_schools:
+        parser.error("--similar-schools is required with --schools")
+    return parsed
+
+
+def main(args: Optional[List[str]] = None) -> Tuple[Dict[str, float], str]:
+    parsed = parse_args(args)
+    if parsed.database_url:
+        timings = build_from_database(
+            parsed.database_url, parsed.output, parsed.workers
+        )
+    else:
+        timings = build_from_files(
+            parsed.schools, parsed.similar_schools, parsed.output, parsed.workers
+        )
+    report = format_timings(timings)
+    print(report)
+    return timings, report
+
+
+if __name__ == "__main__":
+    main()
@@ -1,62 +1,151 @@
+import itertools
 import os
+import re
 import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import joblib
 import numpy as np
 import pandas as pd
+from scipy.sparse import csr_matrix, vstack
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import (
-    cosine_similarity,
-    euclidean_distances,
-    manhattan_distances,
-)
 from sqlalchemy.orm import sessionmaker
 
 from app.core.logger import setup_logger
-from app.services.school_matcher.utils.load_functions import load_resources
+from app.core.metrics import metrics
+from app.core.startup import timed
+from app.services.school_matcher.resource_builder import (
+    BUILD_WORKERS,
+    NamePreprocessor,
+    preprocess_names,
+    read_sql_chunks,
+    read_sql_frame,
+)
+from app.services.school_matcher.utils.ann_index import (
+    RandomProjectionIndex,
+    recall_at_k,
+)
+from app.services.school_matcher.utils.load_functions import (
+    has_npy_resource,
+    load_resources,
+    save_npy_resources,
+    save_resource,
+)
+from app.services.school_matcher.utils.name_pipeline import NamePipeline
+from app.services.school_matcher.utils.pattern_matcher import MultiPatternMatcher
 from app.services.school_matcher.utils.preprocess_functions import (
-    abbr_preprocess_text,
-    lemmatize_text,
-    process_region,
-    remove_short_words,
-    remove_substrings,
-    replace_numbers_with_text,
-    simple_preprocess_text,
+    NUMBER_WORDS_MAX,
+    NumberWordsTable,
+    lemmatizer,
+)
+from app.services.school_matcher.utils.reference_index import RegionIndex
+from app.services.school_matcher.utils.region_canonicalizer import RegionCanonicalizer
+from app.services.school_matcher.utils.result_cache import ResultCache
+from app.services.school_matcher.utils.similarity_functions import (
+    DEFAULT_BLOCK_BYTES,
+    cosine_top_k,
+    euclidean_top_k,
+    manhattan_top_k,
+    top_k_from_dense,
 )
 
 # Инициализируем логгер для school_matcher
 logger = setup_logger("school_matcher", "app/logs/school_matcher/logs.log")
 
+# Бюджет памяти на блок матрицы схожестей при поиске совпадений
+BLOCK_MEMORY_MB = int(os.getenv("SCHOOL_MATCHER_BLOCK_MEMORY_MB", 64))
 
-def calculate_similarity(
-    x: np.ndarray, y: np.ndarray, method: str = "cosine"
-) -> np.ndarray:
-    """
-    Вычисляет схожесть между двумя векторами с использованием указанного метода.
+# Способ поиска кандидатов и порог отсечения частых терминов
+SEARCH_MODES = ("exact", "inverted", "taat", "lsh")
+SEARCH_MODE = os.getenv("SCHOOL_MATCHER_SEARCH_MODE", "exact")
+# Режим сопоставления всех вариантов расшифровки сокращений запроса
+# (см. find_variant_matches); задается вместо способа поиска
+VARIANTS_MODE = "variants"
+MAX_DF = float(os.getenv("SCHOOL_MATCHER_MAX_DF", 1.0))
 
-    Parameters
-    ----------
-    x : np.ndarray
-        Первый вектор.
-    y : np.ndarray
-        Второй вектор.
-    method : str, optional
-        Метод вычисления схожести. Может быть "cosine", "euclidean"
-        или "manhattan" (default is "cosine").
+# Параметры приближенного индекса (режим поиска "lsh"). По умолчанию
+# полнота top-5 на названиях из tests/data около 0.9 при оценке
+# четверти референсов (см. evaluate_search_recall)
+LSH_BITS = int(os.getenv("SCHOOL_MATCHER_LSH_BITS", 8))
+LSH_TABLES = int(os.getenv("SCHOOL_MATCHER_LSH_TABLES", 16))
+LSH_PROBES = int(os.getenv("SCHOOL_MATCHER_LSH_PROBES", 3))
 
-    Returns
-    -------
-    np.ndarray
-        Массив схожестей.
-    """
-    if method == "cosine":
-        return cosine_similarity(x, y)
-    elif method == "euclidean":
-        return -euclidean_distances(x, y)  # Инвертируем, чтобы максимизировать схожесть
-    elif method == "manhattan":
-        return -manhattan_distances(x, y)  # Инвертируем, чтобы максимизировать схожесть
-    else:
-        raise ValueError(f"Unknown similarity method: {method}")
+# Формат референсных ресурсов: "auto" (.npy, если файлы есть и не старше
+# joblib), "npy" или "joblib"
+RESOURCE_FORMAT = os.getenv("SCHOOL_MATCHER_RESOURCE_FORMAT", "auto")
+
+# Кэш результатов find_school_match: размер, время жизни записи в секундах
+# и количество самых востребованных запросов, сохраняемых для прогрева
+CACHE_SIZE = int(os.getenv("SCHOOL_MATCHER_CACHE_SIZE", 10000))
+CACHE_TTL = float(os.getenv("SCHOOL_MATCHER_CACHE_TTL", 3600))
+CACHE_PREWARM = int(os.getenv("SCHOOL_MATCHER_CACHE_PREWARM", 1000))
+
+# Метрики поиска (выгружаются эндпоинтом /main/metrics)
+CANDIDATE_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+REQUESTS = metrics.counter(
+    "school_matcher_requests_total", "Вызовы поиска школ", ("method",)
+)
+NAMES = metrics.counter(
+    "school_matcher_names_total", "Названия школ, переданные в поиск", ("method",)
+)
+CACHE_HITS = metrics.counter(
+    "school_matcher_cache_hits_total",
+    "Результаты find_school_match, взятые из кэша",
+    ("cache",),
+)
+REQUEST_SECONDS = metrics.histogram(
+    "school_matcher_request_seconds",
+    "Время вызова поиска школ в секундах",
+    ("method",),
+)
+STAGE_SECONDS = metrics.histogram(
+    "school_matcher_stage_seconds",
+    "Время этапа поиска школ за вызов в секундах",
+    ("method", "stage"),
+)
+CANDIDATES = metrics.histogram(
+    "school_matcher_candidates",
+    "Количество референсов, с которыми сравнивался запрос: для exact и "
+    "методов расстояний - все школы блока региона, для остальных способов "
+    "поиска - отобранные индексом кандидаты",
+    ("search_mode",),
+    buckets=CANDIDATE_BUCKETS,
+)
+REGION_FALLBACK = metrics.counter(
+    "school_matcher_region_fallback_total",
+    "Запросы, сравнивавшиеся со всеми школами из-за отсутствия школ в регионе",
+    ("search_mode",),
+)
+MANUAL_REVIEW = metrics.counter(
+    "school_matcher_manual_review_total",
+    "Запросы без совпадений выше порога (на ручную обработку)",
+    ("search_mode",),
+)
+
+# Инкрементальное обновление референсов: столбец таблицы schools, по
+# которому отбираются добавленные и измененные записи, доля слов вне
+# словаря векторизатора, при которой выполняется полное переобучение,
+# и интервал полного переобучения в секундах (0 - без расписания)
+WATERMARK_COLUMN = os.getenv("SCHOOL_MATCHER_WATERMARK_COLUMN", "id")
+DRIFT_THRESHOLD = float(os.getenv("SCHOOL_MATCHER_DRIFT_THRESHOLD", 0.1))
+REFIT_INTERVAL = float(os.getenv("SCHOOL_MATCHER_REFIT_INTERVAL", 7 * 24 * 3600))
+
+
+# Поиск ближайших референсов для методов расстояний
+DISTANCE_TOP_K = {"euclidean": euclidean_top_k, "manhattan": manhattan_top_k}
 
 
 def find_matches(
@@ -70,10 +159,17 @@ def find_matches(
     filter_by_region: bool = True,
     empty_region: str = "all",
     similarity_method: str = "cosine",
+    region_index: Optional[RegionIndex] = None,
+    max_block_bytes: int = DEFAULT_BLOCK_BYTES,
+    search_mode: str = "exact",
+    ann_index: Optional[RandomProjectionIndex] = None,
+    stats: Optional[Dict[str, Any]] = None,
 ):
     """
     Находит совпадения для заданных векторов с использованием
     различных методов схожести и фильтрации по регионам.
+    Запросы группируются по региону, и схожесть для каждой группы
+    вычисляется одним матричным произведением.
 
     Parameters
     ----------
@@ -96,86 +192,475 @@ def find_matches(
     empty_region : str, optional
         Способ обработки, если в текущем регионе нет школ для сравнения (default is "all").
     similarity_method : str, optional
-        Метод вычисления схожести (default is "cosine").
+        Метод вычисления схожести: "cosine", "euclidean" или "manhattan".
+        Для расстояний возвращаются top_k наименьших расстояний
+        (default is "cosine").
+    region_index : Optional[RegionIndex], optional
+        Заранее построенный индекс школ по регионам. Если передан,
+        блоки регионов берутся из него без вычисления маски
+        (default is None).
+    max_block_bytes : int, optional
+        Бюджет памяти на блок плотной матрицы схожестей или расстояний
+        в байтах (default is DEFAULT_BLOCK_BYTES).
+    search_mode : str, optional
+        Способ поиска для метода "cosine": "exact" - сравнение со всеми
+        школами блока, "inverted" - только с кандидатами из
+        инвертированного индекса, "taat" - кандидаты с накоплением по
+        терминам и досрочной остановкой, "lsh" - только с кандидатами
+        из приближенного индекса ann_index. Режимы кроме "exact"
+        требуют region_index (default is "exact").
+    ann_index : Optional[RandomProjectionIndex], optional
+        Приближенный индекс, построенный по тем же референсам, что и
+        region_index (default is None).
+    stats : Optional[Dict[str, Any]], optional
+        Словарь, в который записываются "candidates" - количество
+        референсов, с которыми сравнивался каждый запрос (при "exact" и
+        методах расстояний - размер блока региона, иначе - количество
+        кандидатов из индекса), и
+        "region_fallback" - количество запросов, сравнивавшихся со всеми
+        школами из-за отсутствия школ в регионе (default is None).
 
     Returns
     -------
     Tuple[List[List[Tuple[Union[int, None], float]]], List[np.ndarray]]
         Список совпадений и список для ручной обработки.
     """
-    y_pred = []
-    manual_review = []
+    if search_mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode: {search_mode}")
+    if search_mode != "exact" and region_index is None:
+        raise ValueError(f"Search mode {search_mode} requires region_index")
+    if search_mode == "lsh" and ann_index is None:
+        raise ValueError("Search mode lsh requires ann_index")
+
+    if region_index is not None:
+        reference_vec = region_index.all.vec
+        reference_id = region_index.all.ids
+
+    n_queries = x_vec.shape[0]
+    y_pred = [None] * n_queries
+    manual_review_rows = []
+    candidates = None
+    if stats is not None:
+        candidates = stats.setdefault("candidates", [])
+        stats.setdefault("region_fallback", 0)
+
+    # Группируем запросы по региону, чтобы для каждой группы схожесть
+    # считалась одним матричным произведением, а не построчно
+    groups = {}
+    for i in range(n_queries):
+        current_region = x_region[i] if filter_by_region else None
+        groups.setdefault(current_region, []).append(i)
+
+    for current_region, rows in groups.items():
+        shard = region_index.all if region_index is not None else None
 
-    for i, x in enumerate(x_vec):
         # Фильтруем reference_vec и reference_id по текущему региону,
         # если включена фильтрация по регионам
         if filter_by_region:
             # Фильтруем reference_vec и reference_id по текущему региону
-            current_region = x_region[i]
-            region_mask = reference_region == current_region
-            filtered_reference_vec = reference_vec[region_mask]
-            filtered_reference_id = reference_id[region_mask]
+            if region_index is not None:
+                shard = region_index.get(current_region) or region_index.empty
+                filtered_reference_vec = shard.vec
+                filtered_reference_id = shard.ids
+            else:
+                region_mask = reference_region == current_region
+                filtered_reference_vec = reference_vec[region_mask]
+                filtered_reference_id = reference_id[region_mask]
 
             # Способ обработки, если в текущем регионе нет школ для сравнения
             if empty_region == "all":
                 # Если в текущем регионе нет школ для сравнения, используем все школы
                 if filtered_reference_vec.shape[0] == 0:
+                    shard = region_index.all if region_index is not None else None
                     filtered_reference_vec = reference_vec
                     filtered_reference_id = reference_id
+                    if stats is not None:
+                        stats["region_fallback"] += len(rows)
             else:
                 if filtered_reference_vec.shape[0] == 0:
                     # Если в текущем регионе нет школ для сравнения,
                     # то помечаем на ручную обработку
-                    manual_review.append(x)
-                    top_matches = [(None, 0.0)] * top_k
-                    y_pred.append(top_matches)
+                    for i in rows:
+                        manual_review_rows.append(i)
+                        y_pred[i] = [(None, 0.0)] * top_k
                     continue
         else:
             filtered_reference_vec = reference_vec
             filtered_reference_id = reference_id
 
-        # Вычисляем выбранное расстояние
-        similarities = calculate_similarity(
-            x, filtered_reference_vec, method=similarity_method
-        ).flatten()
-        top_indices = similarities.argsort()[-top_k:][::-1]
-        max_similarity = max(similarities)
-
-        # Учитываем пороговое значение для различных методов
-        if similarity_method == "cosine":
-            if max_similarity < threshold:
-                manual_review.append(x)
-                top_matches = [(None, 0.0)] * top_k
+        # Вычисляем выбранное расстояние сразу для всей группы запросов
+        if similarity_method == "cosine" and search_mode == "exact":
+            top_indices, top_scores, max_similarities = cosine_top_k(
+                x_vec[rows],
+                filtered_reference_vec,
+                top_k=top_k,
+                max_block_bytes=max_block_bytes,
+            )
+            # Учитываем пороговое значение
+            accepted = max_similarities >= threshold
+            if candidates is not None:
+                candidates.extend([filtered_reference_vec.shape[0]] * len(rows))
+        elif similarity_method == "cosine":
+            # Оцениваем только кандидатов из инвертированного
+            # или приближенного индекса
+            if search_mode == "lsh":
+                searched = [
+                    ann_index.search(
+                        x_vec[i], shard.vec, shard.rows, top_k, candidates
+                    )
+                    for i in rows
+                ]
             else:
-                top_matches = [
-                    (filtered_reference_id[i], similarities[i]) for i in top_indices
+                searched = [
+                    shard.inverted.search(
+                        x_vec[i],
+                        top_k,
+                        early_termination=search_mode == "taat",
+                        candidates=candidates,
+                    )
+                    for i in rows
                 ]
-                if len(top_matches) < top_k:
-                    top_matches += [(None, 0.0)] * (top_k - len(top_matches))
+            top_indices = [indices for indices, _ in searched]
+            top_scores = [scores for _, scores in searched]
+            accepted = np.array(
+                [scores.size > 0 and scores[0] >= threshold for scores in top_scores]
+            )
         else:  # Для других методов расстояний (евклидово и манхэттенское)
-            if max_similarity > -threshold:  # Обратим внимание на инверсию
-                manual_review.append(x)
+            if similarity_method not in DISTANCE_TOP_K:
+                raise ValueError(f"Unknown similarity method: {similarity_method}")
+            # Нормы и списки вхождений блока строятся при первом поиске и
+            # переиспользуются (см. ReferenceShard)
+            reference_norms = reference_t = None
+            if shard is not None:
+                reference_norms = (
+                    shard.squared_norms
+                    if similarity_method == "euclidean"
+                    else shard.l1_norms
+                )
+                reference_t = shard.inverted.postings
+            top_indices, top_scores, min_distances = DISTANCE_TOP_K[
+                similarity_method
+            ](
+                x_vec[rows],
+                filtered_reference_vec,
+                top_k=top_k,
+                max_block_bytes=max_block_bytes,
+                reference_norms=reference_norms,
+                reference_t=reference_t,
+            )
+            # Порог применяется, как и для инвертированной схожести
+            # -distance: запрос принимается, если max(-distance) <= -threshold
+            accepted = np.isfinite(min_distances) & (min_distances >= threshold)
+            if candidates is not None:
+                candidates.extend([filtered_reference_vec.shape[0]] * len(rows))
+
+        for row, i in enumerate(rows):
+            if not accepted[row]:
+                manual_review_rows.append(i)
                 top_matches = [(None, 0.0)] * top_k
             else:
-                top_matches = [
-                    (filtered_reference_id[i], -similarities[i]) for i in top_indices
-                ]
+                top_matches = list(
+                    zip(filtered_reference_id[top_indices[row]], top_scores[row])
+                )
                 if len(top_matches) < top_k:
                     top_matches += [(None, 0.0)] * (top_k - len(top_matches))
 
-        y_pred.append(top_matches)
+            y_pred[i] = top_matches
+
+    # Список для ручной обработки возвращаем в порядке входных запросов
+    manual_review = [x_vec[i] for i in sorted(manual_review_rows)]
 
     return y_pred, manual_review
 
 
+def find_variant_matches(
+    x_vec: csr_matrix,
+    x_region: Optional[str],
+    region_index: RegionIndex,
+    top_k: int = 5,
+    threshold: float = 0.9,
+    empty_region: str = "all",
+    stats: Optional[Dict[str, Any]] = None,
+) -> List[Tuple[Optional[int], float]]:
+    """
+    Находит совпадения для одного запроса по всем вариантам его
+    названия: схожести всех вариантов с референсами региона вычисляются
+    одним матричным произведением, для каждого референса берется
+    наибольшая схожесть среди вариантов.
+
+    Parameters
+    ----------
+    x_vec : csr_matrix
+        Векторизованные варианты названия (по строке на вариант).
+    x_region : Optional[str]
+        Регион запроса.
+    region_index : RegionIndex
+        Индекс школ по регионам.
+    top_k : int, optional
+        Количество топ-совпадений (default is 5).
+    threshold : float, optional
+        Порог схожести (default is 0.9).
+    empty_region : str, optional
+        Способ обработки, если в регионе нет школ: "all" - сравнение со
+        всеми школами, иначе - ручная обработка (default is "all").
+    stats : Optional[Dict[str, Any]], optional
+        Словарь для статистики поиска (см. find_matches), дополнительно
+        учитывается "manual_review" (default is None).
+
+    Returns
+    -------
+    List[Tuple[Optional[int], float]]
+        top_k пар (id, схожесть) по убыванию схожести; (None, 0.0) для
+        запроса на ручную обработку и недостающих совпадений.
+    """
+    if stats is not None:
+        for key in ("region_fallback", "manual_review"):
+            stats.setdefault(key, 0)
+    empty = [(None, 0.0)] * top_k
+
+    shard = region_index.get(x_region) or region_index.empty
+    if shard.vec.shape[0] == 0:
+        if empty_region != "all":
+            if stats is not None:
+                stats["manual_review"] += 1
+            return empty
+        shard = region_index.all
+        if stats is not None:
+            stats["region_fallback"] += 1
+    if stats is not None:
+        stats.setdefault("candidates", []).append(shard.vec.shape[0])
+
+    # Векторы нормализованы, поэтому скалярное произведение - косинус
+    scores = (x_vec @ shard.vec.T).max(axis=0).toarray()
+    top_indices, top_scores = top_k_from_dense(scores, top_k)
+    if top_scores.size == 0 or top_scores[0, 0] < threshold:
+        if stats is not None:
+            stats["manual_review"] += 1
+        return empty
+
+    top_matches = list(zip(shard.ids[top_indices[0]], top_scores[0]))
+    return top_matches + empty[len(top_matches) :]
+
+
+def format_matches(
+    top_matches: List[Tuple[Optional[int], float]]
+) -> List[Dict[str, Union[int, float]]]:
+    """Преобразует пары (id, схожесть) в ответ (id -1 - нет совпадения)."""
+    return [
+        {
+            "id": int(id_) if id_ is not None else -1,
+            "score": float(score),
+        }
+        for id_, score in top_matches
+    ]
+
+
+def record_metrics(
+    method: str,
+    n_names: int,
+    search_mode: str,
+    seconds: float,
+    timings: Optional[Dict[str, float]] = None,
+    stats: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Записывает метрики одного вызова поиска.
+
+    Parameters
+    ----------
+    method : str
+        Метод SchoolMatcher.
+    n_names : int
+        Количество названий школ в вызове.
+    search_mode : str
+        Способ поиска.
+    seconds : float
+        Время вызова в секундах.
+    timings : Optional[Dict[str, float]], optional
+        Время этапов вызова в секундах (default is None).
+    stats : Optional[Dict[str, Any]], optional
+        Статистика поиска (см. find_matches и SchoolMatcher.predict)
+        (default is None).
+    """
+    REQUESTS.inc(method)
+    NAMES.inc(method, amount=n_names)
+    REQUEST_SECONDS.observe(seconds, method)
+    for stage, stage_seconds in (timings or {}).items():
+        STAGE_SECONDS.observe(stage_seconds, method, stage)
+    if stats:
+        for n_candidates in stats.get("candidates", ()):
+            CANDIDATES.observe(n_candidates, search_mode)
+        if stats.get("region_fallback"):
+            REGION_FALLBACK.inc(search_mode, amount=stats["region_fallback"])
+        if stats.get("manual_review"):
+            MANUAL_REVIEW.inc(search_mode, amount=stats["manual_review"])
+
+
+def build_ann_index(reference_vec: np.ndarray) -> RandomProjectionIndex:
+    """
+    Строит приближенный индекс с параметрами из переменных окружения.
+
+    Parameters
+    ----------
+    reference_vec : np.ndarray
+        Векторизованные референсные названия школ.
+
+    Returns
+    -------
+    RandomProjectionIndex
+        Приближенный индекс.
+    """
+    return RandomProjectionIndex(
+        reference_vec, n_bits=LSH_BITS, n_tables=LSH_TABLES, n_probes=LSH_PROBES
+    )
+
+
+class ResourceSnapshot(NamedTuple):
+    """
+    Неизменяемый набор ресурсов поиска школ.
+
+    Запрос берет текущий набор один раз и использует его до конца,
+    поэтому векторизатор и матрица референсов всегда согласованы, даже
+    если во время запроса опубликован новый набор.
+
+    Attributes
+    ----------
+    version : int
+        Версия ресурсов, совпадает с версией кэшей результатов.
+    vectorizer : TfidfVectorizer
+        Векторизатор названий школ.
+    reference_vec : csr_matrix
+        Векторизованные референсные названия школ.
+    reference_id : np.ndarray
+        Идентификаторы референсных школ.
+    reference_region : np.ndarray
+        Регионы референсных школ.
+    reference_name : np.ndarray
+        Предобработанные референсные названия школ.
+    abbreviations_dict : dict
+        Словарь сокращений.
+    region_dict : dict
+        Словарь регионов и городов.
+    blacklist_opf : list
+        Черный список ОПФ.
+    stop_words_list : list
+        Стоп-слова.
+    stop_words : frozenset
+        Стоп-слова для быстрой проверки вхождения.
+    region_index : RegionIndex
+        Индекс референсов по регионам.
+    ann_index : RandomProjectionIndex
+        Приближенный индекс для режима поиска "lsh".
+    pattern_matcher : MultiPatternMatcher
+        Индекс регионов, городов и ОПФ.
+    number_words : NumberWordsTable
+        Таблица текстовых представлений чисел.
+    region_canonicalizer : RegionCanonicalizer
+        Таблица приведения регионов к словарю регионов и коды регионов.
+    pipeline : NamePipeline
+        Предобработка названий школ на ресурсах набора.
+    """
+
+    version: int
+    vectorizer: TfidfVectorizer
+    reference_vec: Any
+    reference_id: np.ndarray
+    reference_region: np.ndarray
+    reference_name: np.ndarray
+    abbreviations_dict: dict
+    region_dict: dict
+    blacklist_opf: list
+    stop_words_list: list
+    stop_words: frozenset
+    region_index: RegionIndex
+    ann_index: RandomProjectionIndex
+    pattern_matcher: MultiPatternMatcher
+    number_words: NumberWordsTable
+    region_canonicalizer: RegionCanonicalizer
+    pipeline: NamePipeline
+
+
+@contextmanager
+def build_stage(
+    name: str,
+    timings: Dict[str, float],
+    progress: Optional[Callable[[str], None]] = None,
+) -> Iterator[None]:
+    """
+    Замеряет время этапа создания ресурсов и сообщает о его начале.
+
+    Parameters
+    ----------
+    name : str
+        Название этапа.
+    timings : Dict[str, float]
+        Словарь времени выполнения этапов.
+    progress : Optional[Callable[[str], None]], optional
+        Функция, которой передается название начатого этапа
+        (default is None).
+    """
+    if progress is not None:
+        progress(name)
+    with timed(timings, name):
+        yield
+
+
+def check_column_name(column: str) -> str:
+    """
+    Проверяет, что имя столбца можно подставить в SQL-запрос.
+
+    Raises
+    ------
+    ValueError
+        Если имя столбца содержит недопустимые символы.
+    """
+    if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", column):
+        raise ValueError(f"Invalid column name: {column}")
+    return column
+
+
+def to_python_value(value: Any) -> Any:
+    """Преобразует скаляр numpy в значение Python для параметров SQL."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
 class SchoolMatcher:
-    def __init__(self, engine):
+    def __init__(
+        self,
+        engine,
+        load: bool = True,
+        resources_dir: str = "app/services/school_matcher/resources",
+        persist_cache: bool = True,
+    ):
         self.engine = engine
+        # Сохранять востребованные запросы кэша и прогревать кэш из файла
+        self.persist_cache = persist_cache
         self.Session = sessionmaker(bind=engine)
-        self.resources_dir = "app/services/school_matcher/resources"
+        self.resources_dir = resources_dir
         self.original_dir = "app/services/school_matcher/original_resources"
-        self.ensure_resources_exist()
-        self.load_resources()
+        # Кэши по исходной строке и по нормализованному названию и региону
+        self.raw_cache = ResultCache(CACHE_SIZE, CACHE_TTL)
+        self.normalized_cache = ResultCache(CACHE_SIZE, CACHE_TTL)
+        # Текущий набор ресурсов, заменяется целиком (см. publish_snapshot)
+        self.snapshot: Optional[ResourceSnapshot] = None
+        self._publish_lock = threading.Lock()
+        # Фоновый прогрев кэша после публикации набора ресурсов
+        self._prewarm_thread: Optional[threading.Thread] = None
+        # Время загрузки компонентов в секундах
+        self.load_timings: Dict[str, float] = {}
+        with timed(self.load_timings, "copy resources"):
+            self.ensure_resources_exist()
+        if load:
+            self.load_resources()
+
+    def __getattr__(self, name: str) -> Any:
+        # Ресурсы текущего набора доступны как атрибуты объекта
+        snapshot = self.__dict__.get("snapshot")
+        if snapshot is not None and name in ResourceSnapshot._fields:
+            return getattr(snapshot, name)
+        raise AttributeError(
+            f"{type(self).__name__!r} object has no attribute {name!r}"
+        )
 
     def ensure_resources_exist(self):
         """
@@ -202,135 +687,833 @@ class SchoolMatcher:
                 )
 
     def load_resources(self):
+        """
+        Загружает ресурсы из директории ресурсов и публикует их.
+        """
+        self.publish_snapshot(self.load_snapshot())
+
+    def load_snapshot(self) -> ResourceSnapshot:
+        """
+        Загружает ресурсы и строит индексы, не меняя текущий набор.
+
+        Returns
+        -------
+        ResourceSnapshot
+            Новый набор ресурсов (версия назначается при публикации).
+        """
         logger.info("Load resources")
-        self.vectorizer = load_resources("vectorizer", "joblib")
-        self.reference_vec = load_resources("reference_vec", "joblib")
-        self.reference_id = load_resources("reference_id", "joblib")
-        self.reference_region = load_resources("reference_region", "joblib")
-        self.reference_name = load_resources("reference_name", "joblib")
-        self.abbreviations_dict = load_resources("abbreviations_dict", "joblib")
-        self.region_dict = load_resources("region_dict", "joblib")
-        self.blacklist_opf = load_resources("blacklist_opf", "joblib")
-        self.stop_words_list = load_resources("stop_words_list", "joblib")
-        logger.info("Resources is loaded/updated")
-
-    def find_school_match(self, school_name):
+        timings = self.load_timings
+        with timed(timings, "load resources"):
+            vectorizer = load_resources("vectorizer", "joblib", self.resources_dir)
+            reference_vec = self.load_reference("reference_vec")
+            reference_id = self.load_reference("reference_id")
+            reference_region = self.load_reference("reference_region")
+            reference_name = self.load_reference("reference_name")
+            abbreviations_dict = load_resources(
+                "abbreviations_dict", "joblib", self.resources_dir
+            )
+            region_dict = load_resources("region_dict", "joblib", self.resources_dir)
+            blacklist_opf = load_resources("blacklist_opf", "joblib", self.resources_dir)
+            stop_words_list = load_resources(
+                "stop_words_list", "joblib", self.resources_dir
+            )
+            region_aliases = load_resources(
+                "region_aliases", "joblib", self.resources_dir
+            )
+        region_canonicalizer = RegionCanonicalizer(region_dict, region_aliases)
+        with timed(timings, "region index"):
+            region_index = RegionIndex(
+                reference_vec,
+                reference_id,
+                reference_region,
+                max_df=MAX_DF,
+                region_codes=region_canonicalizer.encode(reference_region),
+            )
+        logger.info(f"Region index is built: {len(region_index)} regions")
+        with timed(timings, "ann index"):
+            ann_index = self.load_ann_index(reference_vec)
+        with timed(timings, "pattern matcher"):
+            pattern_matcher = self.load_pattern_matcher(region_dict, blacklist_opf)
+        with timed(timings, "number words"):
+            number_words = self.load_number_words()
+        stop_words = frozenset(stop_words_list)
+
+        return ResourceSnapshot(
+            version=0,
+            vectorizer=vectorizer,
+            reference_vec=reference_vec,
+            reference_id=reference_id,
+            reference_region=reference_region,
+            reference_name=reference_name,
+            abbreviations_dict=abbreviations_dict,
+            region_dict=region_dict,
+            blacklist_opf=blacklist_opf,
+            stop_words_list=stop_words_list,
+            stop_words=stop_words,
+            region_index=region_index,
+            ann_index=ann_index,
+            pattern_matcher=pattern_matcher,
+            number_words=number_words,
+            region_canonicalizer=region_canonicalizer,
+            pipeline=NamePipeline(
+                number_words, abbreviations_dict, pattern_matcher, stop_words
+            ),
+        )
+
+    def publish_snapshot(self, snapshot: ResourceSnapshot) -> ResourceSnapshot:
+        """
+        Атомарно заменяет текущий набор ресурсов и сбрасывает кэши
+        результатов. Запросы, начатые до замены, завершаются на прежнем
+        наборе; их результаты в кэш не попадают. Кэш прогревается
+        востребованными запросами в фоновом потоке после замены, поэтому
+        публикация не ждет их повторного вычисления (см. wait_prewarm).
+
+        Parameters
+        ----------
+        snapshot : ResourceSnapshot
+            Новый набор ресурсов.
+
+        Returns
+        -------
+        ResourceSnapshot
+            Опубликованный набор с назначенной версией.
+        """
+        with self._publish_lock:
+            # Результаты, полученные на прежних ресурсах, больше не выдаются
+            hot_keys = self.raw_cache.hottest(CACHE_PREWARM)
+            version = self.raw_cache.bump_version()
+            self.normalized_cache.bump_version()
+            snapshot = snapshot._replace(version=version)
+            self.snapshot = snapshot
+        logger.info(f"Resources is loaded/updated, version {version}")
+        if CACHE_SIZE > 0 and CACHE_PREWARM > 0 and (hot_keys or self.persist_cache):
+            self._prewarm_thread = threading.Thread(
+                target=self.prewarm_result_cache,
+                args=(hot_keys or None, version),
+                name=f"cache-prewarm-{version}",
+                daemon=True,
+            )
+            self._prewarm_thread.start()
+        return snapshot
+
+    def wait_prewarm(self, timeout: Optional[float] = None) -> bool:
+        """
+        Ожидает завершения фонового прогрева кэша.
+
+        Parameters
+        ----------
+        timeout : Optional[float], optional
+            Время ожидания в секундах (default is None - без ограничения).
+
+        Returns
+        -------
+        bool
+            True, если прогрев завершен или не запускался.
+        """
+        thread = self._prewarm_thread
+        if thread is None:
+            return True
+        thread.join(timeout)
+        return not thread.is_alive()
+
+    def save_result_cache(self) -> None:
+        """
+        Сохраняет самые востребованные запросы кэша результатов, чтобы
+        прогреть кэш после перезапуска. Сохраняются только запросы:
+        результаты вычисляются заново на актуальных ресурсах.
+        """
+        if CACHE_SIZE <= 0 or CACHE_PREWARM <= 0 or not self.persist_cache:
+            return
+        hot_keys = self.raw_cache.hottest(CACHE_PREWARM)
+        joblib.dump(hot_keys, os.path.join(self.resources_dir, "result_cache.joblib"))
+        logger.info(f"Result cache keys are saved: {len(hot_keys)}")
+
+    def prewarm_result_cache(
+        self,
+        hot_keys: Optional[List[Tuple[str, str]]] = None,
+        version: Optional[int] = None,
+    ) -> int:
+        """
+        Заполняет кэш результатов для самых востребованных запросов.
+
+        Parameters
+        ----------
+        hot_keys : Optional[List[Tuple[str, str]]], optional
+            Пары (название школы, способ поиска). Если не указаны,
+            загружаются из ресурсов при persist_cache (default is None).
+        version : Optional[int], optional
+            Версия набора ресурсов, для которой прогревается кэш. Прогрев
+            прекращается, если опубликован более новый набор
+            (default is None - без проверки).
+
+        Returns
+        -------
+        int
+            Количество прогретых запросов.
+        """
+        if CACHE_SIZE <= 0 or CACHE_PREWARM <= 0:
+            return 0
+        if hot_keys is None:
+            if not self.persist_cache:
+                return 0
+            cache_path = os.path.join(self.resources_dir, "result_cache.joblib")
+            if not os.path.exists(cache_path):
+                return 0
+            hot_keys = load_resources("result_cache", "joblib", self.resources_dir)
+
+        start = time.perf_counter()
+        n_warmed = 0
+        for school_name, search_mode in hot_keys[:CACHE_PREWARM]:
+            if version is not None and self.snapshot.version != version:
+                break
+            try:
+                self.find_school_match(school_name, search_mode)
+            except Exception as e:
+                logger.warning("Failed to prewarm cache for %s: %s", school_name, e)
+                continue
+            n_warmed += 1
+        logger.info(
+            "Result cache is prewarmed: %d queries in %.2f s",
+            n_warmed,
+            time.perf_counter() - start,
+        )
+        return n_warmed
+
+    def cache_stats(self) -> Dict[str, Dict[str, Union[int, float]]]:
+        """
+        Возвращает статистику кэшей результатов.
+
+        Returns
+        -------
+        Dict[str, Dict[str, Union[int, float]]]
+            Статистика кэша по исходной строке ("raw") и по
+            нормализованному названию ("normalized").
+        """
+        return {
+            "raw": self.raw_cache.stats(),
+            "normalized": self.normalized_cache.stats(),
+        }
+
+    def load_number_words(self) -> NumberWordsTable:
+        """
+        Загружает таблицу текстовых представлений чисел из ресурсов.
+        Если файл отсутствует или построен для другого диапазона чисел,
+        таблица строится заново и сохраняется.
+
+        Returns
+        -------
+        NumberWordsTable
+            Таблица текстовых представлений чисел.
+        """
+        table_path = os.path.join(self.resources_dir, "number_words.joblib")
+        if os.path.exists(table_path):
+            number_words = load_resources("number_words", "joblib", self.resources_dir)
+            if number_words.max_number == NUMBER_WORDS_MAX:
+                return number_words
+            logger.info("Number words table does not match settings, rebuilding")
+
+        logger.info("Build number words table")
+        number_words = NumberWordsTable(NUMBER_WORDS_MAX)
+        save_resource(number_words, "number_words", self.resources_dir)
+        return number_words
+
+    def load_pattern_matcher(
+        self, region_dict: dict, blacklist_opf: list
+    ) -> MultiPatternMatcher:
+        """
+        Загружает индекс регионов, городов и черного списка ОПФ из ресурсов.
+        Если файл отсутствует или построен по другим словарям, индекс
+        строится заново и сохраняется.
+
+        Parameters
+        ----------
+        region_dict : dict
+            Словарь регионов и городов.
+        blacklist_opf : list
+            Черный список ОПФ.
+
+        Returns
+        -------
+        MultiPatternMatcher
+            Индекс для поиска регионов и очистки названий.
+        """
+        matcher_path = os.path.join(self.resources_dir, "pattern_matcher.joblib")
+        fingerprint = MultiPatternMatcher.make_fingerprint(region_dict, blacklist_opf)
+        if os.path.exists(matcher_path):
+            pattern_matcher = load_resources(
+                "pattern_matcher", "joblib", self.resources_dir
+            )
+            if pattern_matcher.fingerprint == fingerprint:
+                return pattern_matcher
+            logger.info("Pattern matcher does not match resources, rebuilding")
+
+        logger.info("Build pattern matcher")
+        pattern_matcher = MultiPatternMatcher(region_dict, blacklist_opf)
+        save_resource(pattern_matcher, "pattern_matcher", self.resources_dir)
+        return pattern_matcher
+
+    def load_reference(self, resources_type: str):
+        """
+        Загружает референсный ресурс в формате RESOURCE_FORMAT.
+
+        Файлы .npy отображаются в память, поэтому несколько процессов
+        используют одну копию в страничном кэше. Если файлов .npy нет
+        или они старше файла joblib, ресурс загружается из joblib.
+
+        Parameters
+        ----------
+        resources_type : str
+            Тип ресурса (например, "reference_vec").
+
+        Returns
+        -------
+        Any
+            Загруженный ресурс.
+        """
+        if RESOURCE_FORMAT != "joblib":
+            if has_npy_resource(resources_type, self.resources_dir):
+                return load_resources(resources_type, "npy", self.resources_dir)
+            if RESOURCE_FORMAT == "npy":
+                logger.warning(
+                    f"No up-to-date npy files for {resources_type}, "
+                    "falling back to joblib"
+                )
+        return load_resources(resources_type, "joblib", self.resources_dir)
+
+    def load_ann_index(self, reference_vec) -> RandomProjectionIndex:
+        """
+        Загружает приближенный индекс из ресурсов. Если файл отсутствует
+        или построен по другим референсам или параметрам, индекс
+        строится заново и сохраняется рядом с reference_vec.
+
+        Parameters
+        ----------
+        reference_vec : csr_matrix
+            Векторизованные референсные названия школ.
+
+        Returns
+        -------
+        RandomProjectionIndex
+            Приближенный индекс для режима поиска "lsh".
+        """
+        ann_path = os.path.join(self.resources_dir, "ann_index.joblib")
+        if os.path.exists(ann_path):
+            # Массивы индекса отображаются в память и разделяются процессами
+            ann_index = load_resources(
+                "ann_index", "joblib", self.resources_dir, mmap_mode="r"
+            )
+            if (
+                ann_index.n_rows == reference_vec.shape[0]
+                and ann_index.planes.shape[0] == reference_vec.shape[1]
+                and (ann_index.n_bits, ann_index.n_tables, ann_index.n_probes)
+                == (LSH_BITS, LSH_TABLES, LSH_PROBES)
+            ):
+                return ann_index
+            logger.info("ANN index does not match resources, rebuilding")
+
+        logger.info("Build ANN index")
+        ann_index = build_ann_index(reference_vec)
+        save_resource(ann_index, "ann_index", self.resources_dir)
+        return ann_index
+
+    def preprocess(
+        self,
+        x: str,
+        snapshot: Optional[ResourceSnapshot] = None,
+        timings: Optional[Dict[str, float]] = None,
+    ) -> Tuple[str, Optional[str]]:
+        """
+        Предобрабатывает название школы и находит в нем регион (см.
+        NamePipeline.process).
+
+        Parameters
+        ----------
+        x : str
+            Название школы.
+        snapshot : Optional[ResourceSnapshot], optional
+            Набор ресурсов (default is None - текущий набор).
+        timings : Optional[Dict[str, float]], optional
+            Словарь, к значениям которого добавляется время этапов
+            предобработки в секундах (default is None).
+
+        Returns
+        -------
+        Tuple[str, Optional[str]]
+            Предобработанное название школы и регион.
+        """
+        return (snapshot or self.snapshot).pipeline.process(x, timings)
+
+    def preprocess_variants(
+        self,
+        x: str,
+        snapshot: Optional[ResourceSnapshot] = None,
+        timings: Optional[Dict[str, float]] = None,
+    ) -> List[Tuple[str, Optional[str]]]:
+        """
+        Предобрабатывает название школы во всех вариантах расшифровки
+        сокращений (см. NamePipeline.process_variants).
+
+        Parameters
+        ----------
+        x : str
+            Название школы.
+        snapshot : Optional[ResourceSnapshot], optional
+            Набор ресурсов (default is None - текущий набор).
+        timings : Optional[Dict[str, float]], optional
+            Словарь, к значению "variants" которого добавляется время
+            предобработки в секундах (default is None).
+
+        Returns
+        -------
+        List[Tuple[str, Optional[str]]]
+            Пары (название, регион) вариантов.
+        """
+        start = time.perf_counter()
+        variants = (snapshot or self.snapshot).pipeline.process_variants(x)
+        if timings is not None:
+            seconds = time.perf_counter() - start
+            timings["variants"] = timings.get("variants", 0.0) + seconds
+        return variants
+
+    def match_preprocessed(
+        self,
+        names: List[str],
+        regions: List[Optional[str]],
+        search_mode: Optional[str] = None,
+        snapshot: Optional[ResourceSnapshot] = None,
+        timings: Optional[Dict[str, float]] = None,
+        stats: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Dict[str, Union[int, float]]]]:
+        """
+        Находит совпадения для уже предобработанных названий школ.
+        Все названия векторизуются одним вызовом.
+
+        Parameters
+        ----------
+        names : List[str]
+            Предобработанные названия школ.
+        regions : List[Optional[str]]
+            Регионы школ.
+        search_mode : Optional[str], optional
+            Способ поиска (см. find_matches). Если не указан, используется
+            значение из SCHOOL_MATCHER_SEARCH_MODE (default is None).
+        snapshot : Optional[ResourceSnapshot], optional
+            Набор ресурсов (default is None - текущий набор).
+        timings : Optional[Dict[str, float]], optional
+            Словарь для времени этапов (см. predict) (default is None).
+        stats : Optional[Dict[str, Any]], optional
+            Словарь для статистики поиска (см. predict) (default is None).
+
+        Returns
+        -------
+        List[List[Dict[str, Union[int, float]]]]
+            Списки совпадений в порядке входных названий.
+        """
+        return [
+            format_matches(top_matches)
+            for top_matches in self.predict(
+                names, regions, search_mode, snapshot, timings, stats
+            )
+        ]
+
+    def match_variants(
+        self,
+        variants: List[List[Tuple[str, Optional[str]]]],
+        snapshot: Optional[ResourceSnapshot] = None,
+        timings: Optional[Dict[str, float]] = None,
+        stats: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Dict[str, Union[int, float]]]]:
+        """
+        Находит совпадения для запросов по всем вариантам их названий
+        (см. find_variant_matches). Варианты всех запросов векторизуются
+        одним вызовом.
+
+        Parameters
+        ----------
+        variants : List[List[Tuple[str, Optional[str]]]]
+            Для каждого запроса - пары (название, регион) вариантов
+            (см. NamePipeline.process_variants). Регион запроса берется
+            из первого варианта.
+        snapshot : Optional[ResourceSnapshot], optional
+            Набор ресурсов (default is None - текущий набор).
+        timings : Optional[Dict[str, float]], optional
+            Словарь для времени этапов (см. predict) (default is None).
+        stats : Optional[Dict[str, Any]], optional
+            Словарь для статистики поиска (см. predict) (default is None).
+
+        Returns
+        -------
+        List[List[Dict[str, Union[int, float]]]]
+            Списки совпадений в порядке запросов.
+        """
+        if not variants:
+            return []
+
+        snapshot = snapshot or self.snapshot
+        timings = timings if timings is not None else {}
+
+        with timed(timings, "vectorize"):
+            x_vec = snapshot.vectorizer.transform(
+                [name for query in variants for name, _ in query]
+            )
+
+        results = []
+        with timed(timings, "search"):
+            start = 0
+            for query in variants:
+                end = start + len(query)
+                top_matches = find_variant_matches(
+                    x_vec[start:end],
+                    query[0][1],
+                    snapshot.region_index,
+                    top_k=5,
+                    threshold=0.00000001,
+                    empty_region="all",
+                    stats=stats,
+                )
+                results.append(format_matches(top_matches))
+                start = end
+        return results
+
+    def predict(
+        self,
+        names: List[str],
+        regions: List[Optional[str]],
+        search_mode: Optional[str] = None,
+        snapshot: Optional[ResourceSnapshot] = None,
+        timings: Optional[Dict[str, float]] = None,
+        stats: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Tuple[Optional[int], float]]]:
+        """
+        Векторизует предобработанные названия школ и находит совпадения.
+
+        Parameters
+        ----------
+        names : List[str]
+            Предобработанные названия школ.
+        regions : List[Optional[str]]
+            Регионы школ.
+        search_mode : Optional[str], optional
+            Способ поиска (см. find_matches) (default is None).
+        snapshot : Optional[ResourceSnapshot], optional
+            Набор ресурсов (default is None - текущий набор).
+        timings : Optional[Dict[str, float]], optional
+            Словарь, в который записывается время векторизации
+            ("vectorize") и поиска ("search") в секундах (default is None).
+        stats : Optional[Dict[str, Any]], optional
+            Словарь, в который записывается статистика find_matches и
+            количество запросов на ручную обработку ("manual_review")
+            (default is None).
+
+        Returns
+        -------
+        List[List[Tuple[Optional[int], float]]]
+            Списки пар (id, схожесть) в порядке входных названий.
+        """
+        if not names:
+            return []
+
+        snapshot = snapshot or self.snapshot
+        timings = timings if timings is not None else {}
+
+        # Векторизация текста
+        with timed(timings, "vectorize"):
+            x_vec = snapshot.vectorizer.transform(names)
+
+        with timed(timings, "search"):
+            y_pred, manual_review = find_matches(
+                x_vec,
+                np.array(regions, dtype=object),
+                snapshot.reference_id,
+                snapshot.reference_vec,
+                snapshot.reference_region,
+                top_k=5,
+                threshold=0.00000001,
+                filter_by_region=True,
+                empty_region="all",  # is ignored if filter_by_region=False
+                similarity_method="cosine",
+                region_index=snapshot.region_index,
+                max_block_bytes=BLOCK_MEMORY_MB * 1024 * 1024,
+                search_mode=search_mode or SEARCH_MODE,
+                ann_index=snapshot.ann_index,
+                stats=stats,
+            )
+
+        if stats is not None:
+            stats["manual_review"] = len(manual_review)
+        return y_pred
+
+    def find_school_match(self, school_name, search_mode=None):
         """
         Предсказывает соответствия для заданного названия школы.
 
+        Результаты кэшируются по исходной строке и по нормализованному
+        названию и региону. Кэш сбрасывается при загрузке ресурсов.
+        Весь запрос выполняется на одном наборе ресурсов.
+
         Parameters
         ----------
         school_name : str
             Название школы.
+        search_mode : Optional[str], optional
+            Способ поиска (см. find_matches) (default is None).
 
         Returns
         -------
         List[int]
             Список id наиболее вероятных совпадений.
         """
+        start = time.perf_counter()
+        search_mode = search_mode or SEARCH_MODE
 
-        def preprocess_name(x: str) -> str:
-            """
-            Предобрабатывает название школы.
+        raw_key = (school_name, search_mode)
+        matches = self.raw_cache.get(raw_key)
+        if matches is not None:
+            CACHE_HITS.inc("raw")
+            record_metrics(
+                "find_school_match", 1, search_mode, time.perf_counter() - start
+            )
+            return [dict(match) for match in matches]
 
-            Parameters
-            ----------
-            x : str
-                Название школы.
+        snapshot = self.snapshot
+        version = snapshot.version
+        timings, stats = {}, {}
+        if search_mode == VARIANTS_MODE:
+            variants = self.preprocess_variants(school_name, snapshot, timings)
+            normalized_key = (tuple(variants), search_mode)
+        else:
+            x, region = self.preprocess(school_name, snapshot, timings)
+            normalized_key = (x, region, search_mode)
 
-            Returns
-            -------
-            str
-                Предобработанное название школы.
-            """
-            x = simple_preprocess_text(x)
-            x = replace_numbers_with_text(x)
-            x = abbr_preprocess_text(
-                x,
-                self.abbreviations_dict,
-                False,
-                False,
-                False,
-                False,
-            )
-            x = process_region(x, self.region_dict)
-            x = remove_substrings(x, self.blacklist_opf)
-            x = lemmatize_text(x, self.stop_words_list)
-            x = remove_short_words(x)
-            return x
+        # Варианты написания с одинаковой нормализацией используют
+        # общий результат
+        matches = self.normalized_cache.get(normalized_key)
+        if matches is None:
+            if search_mode == VARIANTS_MODE:
+                matches = self.match_variants([variants], snapshot, timings, stats)
+            else:
+                matches = self.match_preprocessed(
+                    [x], [region], search_mode, snapshot, timings, stats
+                )
+            matches = matches[0]
+            self.normalized_cache.put(normalized_key, matches, version)
+        else:
+            CACHE_HITS.inc("normalized")
+        self.raw_cache.put(raw_key, matches, version)
 
-        def preprocess_region(x: str) -> str:
-            """
-            Предобрабатывает регион школы.
+        record_metrics(
+            "find_school_match",
+            1,
+            search_mode,
+            time.perf_counter() - start,
+            timings,
+            stats,
+        )
+        return [dict(match) for match in matches]
 
-            Parameters
-            ----------
-            x : str
-                Название школы.
+    def find_school_matches(
+        self, school_names: List[str], search_mode: Optional[str] = None
+    ) -> List[Dict[str, Union[str, list, None]]]:
+        """
+        Предсказывает соответствия для пакета названий школ.
 
-            Returns
-            -------
-            str
-                Регион школы.
-            """
-            x = simple_preprocess_text(x)
-            x = replace_numbers_with_text(x)
-            x = abbr_preprocess_text(
-                x, self.abbreviations_dict, False, False, False, False
-            )
-            return process_region(x, self.region_dict, return_region=True)
+        Названия предобрабатываются по отдельности, затем векторизуются
+        и сравниваются с референсами одним проходом. Ошибка предобработки
+        одного названия не прерывает обработку остальных.
+
+        Parameters
+        ----------
+        school_names : List[str]
+            Названия школ.
+        search_mode : Optional[str], optional
+            Способ поиска (см. find_matches) (default is None).
+
+        Returns
+        -------
+        List[Dict[str, Union[str, list, None]]]
+            Результаты в порядке входных названий: название школы,
+            список совпадений и текст ошибки (None, если ошибки нет).
+        """
+        start = time.perf_counter()
+        results = [
+            {"school_name": school_name, "matches": [], "error": None}
+            for school_name in school_names
+        ]
 
-        vectorized_preprocess = np.vectorize(preprocess_name)
-        vectorized_region = np.vectorize(preprocess_region)
+        snapshot = self.snapshot
+        variants_mode = (search_mode or SEARCH_MODE) == VARIANTS_MODE
+        timings, stats = {}, {}
+        valid_positions, names, regions, variants = [], [], [], []
+        for position, school_name in enumerate(school_names):
+            try:
+                if variants_mode:
+                    variants.append(
+                        self.preprocess_variants(school_name, snapshot, timings)
+                    )
+                else:
+                    name, region = self.preprocess(school_name, snapshot, timings)
+                    names.append(name)
+                    regions.append(region)
+            except Exception as e:
+                logger.warning("Failed to preprocess school %s: %s", school_name, e)
+                results[position]["error"] = str(e)
+                continue
+            valid_positions.append(position)
 
-        x = vectorized_preprocess(np.array([school_name]))
-        region = vectorized_region(np.array([school_name]))
+        if variants_mode:
+            matches = self.match_variants(variants, snapshot, timings, stats)
+        else:
+            matches = self.match_preprocessed(
+                names, regions, search_mode, snapshot, timings, stats
+            )
+        for position, position_matches in zip(valid_positions, matches):
+            results[position]["matches"] = position_matches
 
-        # Векторизация текста
-        x_vec = self.vectorizer.transform(x)
-
-        y_pred, manual_review = find_matches(
-            x_vec,
-            region,
-            self.reference_id,
-            self.reference_vec,
-            self.reference_region,
-            top_k=5,
-            threshold=0.00000001,
-            filter_by_region=True,
-            empty_region="all",  # is ignored if filter_by_region=False
-            similarity_method="cosine",
+        record_metrics(
+            "find_school_matches",
+            len(school_names),
+            search_mode or SEARCH_MODE,
+            time.perf_counter() - start,
+            timings,
+            stats,
         )
+        return results
+
+    def evaluate_search_recall(
+        self, school_names: List[str], search_mode: str = "lsh"
+    ) -> Dict[str, Union[float, int, str]]:
+        """
+        Сравнивает результаты приближенного поиска с точным поиском
+        на заданных названиях школ. Названия, которые не удалось
+        предобработать, не оцениваются и учитываются в "n_errors".
+
+        Parameters
+        ----------
+        school_names : List[str]
+            Названия школ.
+        search_mode : str, optional
+            Оцениваемый способ поиска (default is "lsh").
 
-        converted_results = [
+        Returns
+        -------
+        Dict[str, Union[float, int, str]]
+            Полнота относительно точного поиска и время обоих поисков.
+        """
+        snapshot = self.snapshot
+        names, regions = [], []
+        n_errors = 0
+        for school_name in school_names:
+            try:
+                name, region = self.preprocess(school_name, snapshot)
+            except Exception as e:
+                logger.warning("Failed to preprocess school %s: %s", school_name, e)
+                n_errors += 1
+                continue
+            names.append(name)
+            regions.append(region)
+
+        start = time.perf_counter()
+        exact = self.predict(names, regions, "exact", snapshot)
+        exact_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        approximate = self.predict(names, regions, search_mode, snapshot)
+        approximate_seconds = time.perf_counter() - start
+
+        report = recall_at_k(exact, approximate)
+        report.update(
             {
-                "id": int(id_) if id_ is not None else -1,
-                "score": float(score),
+                "search_mode": search_mode,
+                "n_queries": len(school_names),
+                "n_errors": n_errors,
+                "exact_seconds": exact_seconds,
+                "approximate_seconds": approximate_seconds,
             }
-            for id_, score in y_pred[0]
-        ]
+        )
+        logger.info("Search recall report: %s", report)
+        return report
 
-        return converted_results
+    def create_resources(
+        self,
+        timings: Optional[Dict[str, float]] = None,
+        progress: Optional[Callable[[str], None]] = None,
+        column: str = WATERMARK_COLUMN,
+        n_workers: int = BUILD_WORKERS,
+    ) -> Dict[str, float]:
+        """
+        Создает ресурсы по данным из базы данных и сохраняет их в
+        директорию ресурсов. Текущий набор ресурсов не меняется: новые
+        ресурсы публикуются вызовом load_resources.
 
-    def create_resources(self):
+        Таблица similar_schools читается частями через серверный курсор
+        (см. read_sql_chunks) и предобрабатывается по мере чтения, поэтому
+        в памяти одновременно находится одна прочитанная часть.
+
+        Parameters
+        ----------
+        timings : Optional[Dict[str, float]], optional
+            Словарь, в который записывается время этапов
+            (default is None).
+        progress : Optional[Callable[[str], None]], optional
+            Функция, которой передается название начатого этапа
+            (default is None).
+        column : str, optional
+            Столбец таблицы schools, максимальное значение которого
+            сохраняется как отметка для инкрементального обновления
+            (default is WATERMARK_COLUMN).
+        n_workers : int, optional
+            Количество процессов предобработки (default is BUILD_WORKERS).
+
+        Returns
+        -------
+        Dict[str, float]
+            Время этапов в секундах.
+        """
+        timings = {} if timings is None else timings
+        check_column_name(column)
         session = self.Session()
 
         try:
             # Выполняем запросы к базе данных
-            query_schools = "SELECT id, name, region FROM schools"
+            extra_column = f", {column}" if column not in ("id", "name", "region") else ""
+            query_schools = f"SELECT id, name, region{extra_column} FROM schools"
+            # Соединение со schools сохранено: при повторяющихся id школ
+            # обучающие названия повторяются, как и в исходном запросе
             query_similar_schools = """
-                SELECT ss.school_id, ss.name, s.name AS reference_name, s.region 
-                FROM similar_schools AS ss 
+                SELECT ss.school_id, ss.name
+                FROM similar_schools AS ss
                 LEFT JOIN schools AS s ON ss.school_id = s.id
             """
 
             # Используем session.connection() для выполнения SQL запросов с Pandas
-            data_reference = pd.read_sql(query_schools, session.connection())
-            data_train = pd.read_sql(query_similar_schools, session.connection())
+            with build_stage("read data", timings, progress):
+                data_reference = read_sql_frame(session.connection(), query_schools)
+            data_train = read_sql_chunks(session.connection(), query_similar_schools)
+
+            watermark = (
+                to_python_value(data_reference[column].max())
+                if not data_reference.empty
+                else None
+            )
 
             # Логика создания ресурсов на основе данных
-            if self.process_resource(data_reference, data_train[["school_id", "name"]]):
+            if self.process_resource(
+                data_reference,
+                data_train,
+                timings,
+                progress,
+                n_workers,
+            ):
                 print("Ресурсы созданы")
+            self.save_index_state(
+                {
+                    "column": column,
+                    "watermark": watermark,
+                    "fitted_at": time.time(),
+                    "tokens": 0,
+                    "oov_tokens": 0,
+                }
+            )
 
             # Если всё прошло успешно, коммитим транзакцию
             session.commit()
@@ -345,135 +1528,374 @@ class SchoolMatcher:
             # Закрываем сессию в любом случае
             session.close()
 
-    def process_resource(self, data_reference, data_train):
-        # preprocess data_reference
-        data_reference.region = data_reference.region.apply(
-            simple_preprocess_text
-        ).str.lower()
-        for reference_region in data_reference.region.sort_values().unique():
-            if reference_region not in self.region_dict:
-                for region in self.region_dict:
-                    if reference_region in self.region_dict[region]:
-                        data_reference.region = data_reference.region.str.replace(
-                            f"{reference_region}", f"{region}"
-                        )
-
-        for reference_region in data_reference.region.sort_values().unique():
-            if reference_region not in self.region_dict:
-                print(f"Unknown region: {reference_region}")
-
-        data_reference.region = data_reference.region.str.replace(
-            "республика саха",
-            "республика саха якутия",
-        )
-        data_reference.region = data_reference.region.str.replace(
-            "республика чувашия",
-            "чувашская республика",
-        )
-        data_reference.region = data_reference.region.str.replace(
-            "хмао югра",
-            "ханты мансийский автономный округ",
-        )
-        data_reference.region = data_reference.region.str.replace(
-            "ямало ненецкий ао",
-            "ямало ненецкий автономный округ",
+        return timings
+
+    def process_resource(
+        self,
+        data_reference,
+        data_train,
+        timings=None,
+        progress=None,
+        n_workers: int = BUILD_WORKERS,
+    ):
+        timings = {} if timings is None else timings
+        # Словари берутся из текущего набора ресурсов или из директории
+        # ресурсов, если объект создан без загрузки
+        with build_stage("load dictionaries", timings, progress):
+            snapshot = self.snapshot or self.load_snapshot()
+        pattern_matcher = MultiPatternMatcher(
+            snapshot.region_dict, snapshot.blacklist_opf
         )
-        data_reference.region = data_reference.region.str.replace(
-            "бранская область",
-            "брянская область",
+        pipeline = NamePipeline(
+            snapshot.number_words,
+            snapshot.abbreviations_dict,
+            pattern_matcher,
+            snapshot.stop_words,
         )
-        data_reference.region = data_reference.region.str.replace(
-            "воронежская обл",
-            "воронежская область",
+
+        with build_stage("preprocess reference", timings, progress):
+            data_reference = self.preprocess_reference(
+                data_reference, snapshot, pipeline, n_workers
+            )
+            reference_id = data_reference["id"].to_numpy(dtype="int").flatten()
+            reference_name = (
+                data_reference["processed_name"].to_numpy(dtype="str").flatten()
+            )
+            reference_region = data_reference["region"].to_numpy(dtype="str").flatten()
+
+        with build_stage("preprocess train", timings, progress):
+            # preprocess data_train
+            if isinstance(data_train, pd.DataFrame):
+                data_train = [data_train]
+            x_train: List[str] = []
+            with NamePreprocessor(pipeline, n_workers) as preprocess:
+                for chunk in data_train:
+                    x_train.extend(preprocess(chunk.dropna().name.tolist()))
+            logger.info(f"Lemma cache: {lemmatizer.cache_info()}")
+
+        with build_stage("fit vectorizer", timings, progress):
+            # Векторизация текстов без копирования названий в общий массив
+            vectorizer = TfidfVectorizer().fit(itertools.chain(x_train, reference_name))
+
+            reference_vec = vectorizer.transform(reference_name)
+
+        with build_stage("save resources", timings, progress):
+            save_resource(vectorizer, "vectorizer", self.resources_dir)
+            save_resource(pattern_matcher, "pattern_matcher", self.resources_dir)
+            save_resource(snapshot.number_words, "number_words", self.resources_dir)
+            self.save_reference(
+                reference_id, reference_name, reference_region, reference_vec
+            )
+
+        return True
+
+    def preprocess_reference(
+        self,
+        data_reference: pd.DataFrame,
+        snapshot: ResourceSnapshot,
+        pipeline: NamePipeline,
+        n_workers: int = 1,
+    ) -> pd.DataFrame:
+        """
+        Предобрабатывает записи таблицы schools: приводит регионы к
+        названиям из словаря регионов (см. RegionCanonicalizer), удаляет
+        дубликаты и служебную запись и добавляет столбец processed_name.
+        Регионы, которых нет в словаре, записываются в лог.
+
+        Parameters
+        ----------
+        data_reference : pd.DataFrame
+            Записи с полями id, name и region.
+        snapshot : ResourceSnapshot
+            Набор ресурсов со словарями.
+        pipeline : NamePipeline
+            Предобработка названий.
+        n_workers : int, optional
+            Количество процессов предобработки названий (default is 1).
+
+        Returns
+        -------
+        pd.DataFrame
+            Предобработанные записи.
+        """
+        # Приведение регионов к словарю регионов по таблице написаний
+        canonicalizer = snapshot.region_canonicalizer
+        data_reference = data_reference.assign(
+            region=canonicalizer.canonicalize(data_reference.region)
         )
+        unknown_regions = canonicalizer.unknown(data_reference.region)
+        if unknown_regions:
+            logger.warning(f"Unknown regions: {unknown_regions}")
 
         data_reference = data_reference[~data_reference.duplicated(subset="id")]
         data_reference = data_reference[~(data_reference.id == 99999)]
 
-        data_reference["processed_name"] = data_reference.name.apply(
-            simple_preprocess_text
-        )
-        data_reference.processed_name = data_reference.processed_name.apply(
-            replace_numbers_with_text
-        )
-        data_reference.processed_name = data_reference.processed_name.apply(
-            abbr_preprocess_text,
-            args=(self.abbreviations_dict, False, False, False, False),
-        )
-        data_reference.processed_name = data_reference.processed_name.apply(
-            process_region, args=(list(self.region_dict.keys()),)
-        )
-        data_reference.processed_name = data_reference.processed_name.apply(
-            remove_substrings, args=(self.blacklist_opf,)
-        )
-        data_reference.processed_name = data_reference.processed_name.apply(
-            simple_preprocess_text
-        )
-        data_reference.processed_name = data_reference.processed_name.apply(
-            lemmatize_text, args=(self.stop_words_list,)
-        )
-        data_reference.processed_name = data_reference.processed_name.apply(
-            remove_short_words
+        return data_reference.assign(
+            processed_name=preprocess_names(
+                data_reference.name.tolist(), pipeline, n_workers
+            )
         )
 
-        reference_id = data_reference["id"].to_numpy(dtype="int").flatten()
-        reference_name = (
-            data_reference["processed_name"].to_numpy(dtype="str").flatten()
-        )
-        reference_region = data_reference["region"].to_numpy(dtype="str").flatten()
+    def save_reference(
+        self,
+        reference_id: np.ndarray,
+        reference_name: np.ndarray,
+        reference_region: np.ndarray,
+        reference_vec,
+    ) -> None:
+        """
+        Сохраняет референсы и построенный по ним приближенный индекс.
 
-        # preprocess data_train
+        Файлы заменяются атомарно: обслуживающие процессы продолжают
+        работать с прежними ресурсами до публикации нового набора.
+        """
+        resources = {
+            "reference_id": reference_id,
+            "reference_name": reference_name,
+            "reference_region": reference_region,
+            "reference_vec": reference_vec,
+        }
+        for resources_type, resource in resources.items():
+            save_resource(resource, resources_type, self.resources_dir)
+        save_resource(build_ann_index(reference_vec), "ann_index", self.resources_dir)
+        if RESOURCE_FORMAT != "joblib":
+            save_npy_resources(resources, self.resources_dir)
 
-        data_train = data_train.dropna()
-        data_train["processed_name"] = data_train.name.apply(simple_preprocess_text)
-        data_train.processed_name = data_train.processed_name.apply(
-            replace_numbers_with_text
-        )
+    def save_index_state(self, state: Dict[str, Any]) -> None:
+        """
+        Сохраняет состояние референсов для инкрементального обновления.
 
-        data_train.processed_name = data_train.processed_name.apply(
-            abbr_preprocess_text,
-            args=(self.abbreviations_dict, False, False, False, False),
-        )
-        data_train["region"] = data_train.processed_name.apply(
-            process_region, args=(list(self.region_dict.keys()), True)
-        )
-        data_train.processed_name = data_train.processed_name.apply(
-            process_region, args=(list(self.region_dict.keys()),)
-        )
-        data_train.processed_name = data_train.processed_name.apply(
-            remove_substrings, args=(self.blacklist_opf,)
-        )
-        data_train.processed_name = data_train.processed_name.apply(
-            simple_preprocess_text
-        )
-        data_train.processed_name = data_train.processed_name.apply(
-            lemmatize_text, args=(self.stop_words_list,)
-        )
-        data_train.processed_name = data_train.processed_name.apply(remove_short_words)
+        Parameters
+        ----------
+        state : Dict[str, Any]
+            Столбец отметки ("column"), отметка - максимальное значение
+            столбца среди учтенных записей ("watermark"), момент полного
+            переобучения ("fitted_at") и количество всех и неизвестных
+            словарю слов в добавленных с тех пор названиях ("tokens",
+            "oov_tokens").
+        """
+        save_resource(state, "index_state", self.resources_dir)
 
-        x_train = data_train["processed_name"].to_numpy(dtype="str").flatten()
+    def load_index_state(
+        self, snapshot: ResourceSnapshot, column: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Загружает состояние референсов для инкрементального обновления.
 
-        # Векторизация текстов
-        vectorizer = TfidfVectorizer().fit(np.append(x_train, reference_name))
+        Если состояние не сохранено, а отметкой служит id, отметка
+        восстанавливается по референсам набора ресурсов.
 
-        reference_vec = vectorizer.transform(reference_name)
+        Parameters
+        ----------
+        snapshot : ResourceSnapshot
+            Набор ресурсов.
+        column : str
+            Столбец отметки.
 
-        joblib.dump(
-            reference_id, "app/services/school_matcher/resources/reference_id.joblib"
-        )
-        joblib.dump(
-            reference_name,
-            "app/services/school_matcher/resources/reference_name.joblib",
-        )
-        joblib.dump(
-            reference_region,
-            "app/services/school_matcher/resources/reference_region.joblib",
-        )
-        joblib.dump(
-            reference_vec, "app/services/school_matcher/resources/reference_vec.joblib"
-        )
-        joblib.dump(
-            vectorizer, "app/services/school_matcher/resources/vectorizer.joblib"
+        Returns
+        -------
+        Optional[Dict[str, Any]]
+            Состояние (см. save_index_state) или None, если отметка
+            неизвестна.
+        """
+        state_path = os.path.join(self.resources_dir, "index_state.joblib")
+        if os.path.exists(state_path):
+            state = load_resources("index_state", "joblib", self.resources_dir)
+            if state["column"] == column:
+                return state
+            logger.info(f"Index state is saved for column {state['column']}")
+        if column != "id":
+            return None
+        vectorizer_path = os.path.join(self.resources_dir, "vectorizer.joblib")
+        return {
+            "column": column,
+            "watermark": (
+                to_python_value(np.max(snapshot.reference_id))
+                if len(snapshot.reference_id)
+                else None
+            ),
+            "fitted_at": os.path.getmtime(vectorizer_path),
+            "tokens": 0,
+            "oov_tokens": 0,
+        }
+
+    def update_resources(
+        self,
+        timings: Optional[Dict[str, float]] = None,
+        progress: Optional[Callable[[str], None]] = None,
+        column: str = WATERMARK_COLUMN,
+        drift_threshold: float = DRIFT_THRESHOLD,
+        refit_interval: float = REFIT_INTERVAL,
+    ) -> Dict[str, Any]:
+        """
+        Инкрементально обновляет референсы по записям таблицы schools,
+        добавленным или измененным после сохраненной отметки.
+
+        Новые записи предобрабатываются и векторизуются прежним
+        векторизатором: записи с известным id заменяют прежние строки
+        reference_vec, reference_id, reference_region и reference_name,
+        остальные добавляются в конец. Полное переобучение
+        (create_resources) выполняется, если отметка неизвестна, с
+        последнего переобучения прошло refit_interval секунд или доля
+        неизвестных словарю слов в добавленных с тех пор названиях
+        превысила drift_threshold. Текущий набор ресурсов не меняется:
+        новые ресурсы публикуются вызовом load_resources.
+
+        Parameters
+        ----------
+        timings : Optional[Dict[str, float]], optional
+            Словарь, в который записывается время этапов
+            (default is None).
+        progress : Optional[Callable[[str], None]], optional
+            Функция, которой передается название начатого этапа
+            (default is None).
+        column : str, optional
+            Столбец отметки: "id" учитывает только добавленные записи,
+            столбец времени изменения - также измененные
+            (default is WATERMARK_COLUMN).
+        drift_threshold : float, optional
+            Допустимая доля неизвестных словарю слов
+            (default is DRIFT_THRESHOLD).
+        refit_interval : float, optional
+            Интервал полного переобучения в секундах, 0 - без расписания
+            (default is REFIT_INTERVAL).
+
+        Returns
+        -------
+        Dict[str, Any]
+            Способ обновления ("incremental" или "full"), причина полного
+            переобучения, количество добавленных и замененных записей,
+            доля неизвестных слов и новая отметка.
+        """
+        timings = {} if timings is None else timings
+        check_column_name(column)
+        with build_stage("load dictionaries", timings, progress):
+            snapshot = self.snapshot or self.load_snapshot()
+        state = self.load_index_state(snapshot, column)
+
+        if state is None:
+            reason = "no watermark"
+        elif refit_interval and time.time() - state["fitted_at"] >= refit_interval:
+            reason = "schedule"
+        else:
+            reason = None
+        if reason is not None:
+            return self._refit(timings, progress, column, reason)
+
+        with build_stage("read data", timings, progress):
+            extra_column = f", {column}" if column not in ("id", "name", "region") else ""
+            query = f"SELECT id, name, region{extra_column} FROM schools"
+            params = {}
+            if state["watermark"] is not None:
+                query += f" WHERE {column} > :watermark"
+                params["watermark"] = state["watermark"]
+            session = self.Session()
+            try:
+                data_reference = read_sql_frame(session.connection(), query, params)
+            finally:
+                session.close()
+
+        summary = {
+            "mode": "incremental",
+            "reason": None,
+            "added": 0,
+            "replaced": 0,
+            "drift": state["oov_tokens"] / state["tokens"] if state["tokens"] else 0.0,
+            "watermark": state["watermark"],
+        }
+        if data_reference.empty:
+            logger.info(f"No schools changed after {column} {state['watermark']}")
+            return summary
+        watermark = to_python_value(data_reference[column].max())
+
+        with build_stage("preprocess reference", timings, progress):
+            data_reference = self.preprocess_reference(
+                data_reference, snapshot, snapshot.pipeline
+            )
+            new_id = data_reference["id"].to_numpy(dtype="int").flatten()
+            new_name = data_reference["processed_name"].to_numpy(dtype="str").flatten()
+            new_region = data_reference["region"].to_numpy(dtype="str").flatten()
+
+        # Доля слов, которых нет в словаре векторизатора, среди всех
+        # названий, добавленных после полного переобучения
+        analyzer = snapshot.vectorizer.build_analyzer()
+        vocabulary = snapshot.vectorizer.vocabulary_
+        tokens = [token for name in new_name for token in analyzer(name)]
+        n_tokens = state["tokens"] + len(tokens)
+        n_oov = state["oov_tokens"] + sum(token not in vocabulary for token in tokens)
+        drift = n_oov / n_tokens if n_tokens else 0.0
+        if drift > drift_threshold:
+            return self._refit(timings, progress, column, "drift", drift)
+
+        with build_stage("update reference", timings, progress):
+            reference_id = np.asarray(snapshot.reference_id)
+            positions = {int(id_): row for row, id_ in enumerate(reference_id)}
+            n_rows = len(reference_id)
+            # Порядок строк объединенных референсов: замененные строки
+            # остаются на своих местах, новые добавляются в конец
+            order = np.arange(n_rows)
+            appended = []
+            for offset, id_ in enumerate(new_id):
+                row = positions.get(int(id_))
+                if row is None:
+                    appended.append(n_rows + offset)
+                else:
+                    order[row] = n_rows + offset
+            order = np.concatenate([order, np.array(appended, dtype=order.dtype)])
+
+            reference_vec = vstack(
+                [snapshot.reference_vec, snapshot.vectorizer.transform(new_name)],
+                format="csr",
+            )[order]
+            reference_id = np.concatenate([reference_id, new_id])[order]
+            reference_name = np.concatenate(
+                [np.asarray(snapshot.reference_name), new_name]
+            )[order]
+            reference_region = np.concatenate(
+                [np.asarray(snapshot.reference_region), new_region]
+            )[order]
+
+        with build_stage("save resources", timings, progress):
+            self.save_reference(
+                reference_id, reference_name, reference_region, reference_vec
+            )
+            self.save_index_state(
+                {
+                    "column": column,
+                    "watermark": watermark,
+                    "fitted_at": state["fitted_at"],
+                    "tokens": n_tokens,
+                    "oov_tokens": n_oov,
+                }
+            )
+
+        summary.update(
+            {
+                "added": len(appended),
+                "replaced": len(new_id) - len(appended),
+                "drift": drift,
+                "watermark": watermark,
+            }
         )
+        logger.info(f"Reference is updated incrementally: {summary}")
+        return summary
 
-        return True
+    def _refit(
+        self,
+        timings: Dict[str, float],
+        progress: Optional[Callable[[str], None]],
+        column: str,
+        reason: str,
+        drift: float = 0.0,
+    ) -> Dict[str, Any]:
+        logger.info(f"Full refit of resources, reason: {reason}")
+        self.create_resources(timings, progress, column)
+        state = load_resources("index_state", "joblib", self.resources_dir)
+        return {
+            "mode": "full",
+            "reason": reason,
+            "added": None,
+            "replaced": None,
+            "drift": drift,
+            "watermark": state["watermark"],
+        }
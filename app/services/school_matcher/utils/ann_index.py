@@ -0,0 +1,215 @@
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from app.services.school_matcher.utils.similarity_functions import top_k_from_dense
+
+# Количество строк, проецируемых за один раз при построении индекса
+PROJECTION_BLOCK_ROWS = 65536
+
+
+class RandomProjectionIndex:
+    """
+    Приближенный индекс ближайших соседей по косинусу на основе
+    знаковых случайных проекций (LSH).
+
+    Каждая из n_tables таблиц хэширует вектор в n_bits знаков его
+    проекций на случайные гиперплоскости. Близкие по косинусу векторы
+    с высокой вероятностью попадают в одну корзину хотя бы в одной
+    таблице. Корзины хранятся как отсортированные массивы кодов, поэтому
+    индекс сериализуется без словарей. Дополнительно проверяются корзины,
+    отличающиеся инвертированием n_probes битов с наименьшей проекцией.
+
+    Parameters
+    ----------
+    reference_vec : csr_matrix
+        Векторизованные референсные названия школ.
+    n_bits : int, optional
+        Количество битов в коде таблицы (default is 8).
+    n_tables : int, optional
+        Количество хэш-таблиц (default is 16).
+    n_probes : int, optional
+        Количество дополнительно проверяемых соседних корзин на таблицу
+        (default is 3).
+    seed : int, optional
+        Начальное значение генератора случайных чисел (default is 0).
+    """
+
+    def __init__(
+        self,
+        reference_vec: csr_matrix,
+        n_bits: int = 8,
+        n_tables: int = 16,
+        n_probes: int = 3,
+        seed: int = 0,
+    ):
+        if not 0 < n_bits < 64:
+            raise ValueError(f"n_bits must be in [1, 63], got {n_bits}")
+
+        self.n_bits = n_bits
+        self.n_tables = n_tables
+        self.n_probes = n_probes
+        self.seed = seed
+
+        reference_vec = csr_matrix(reference_vec)
+        self.n_rows, n_features = reference_vec.shape
+
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal(
+            (n_features, n_tables * n_bits), dtype=np.float32
+        )
+        self._weights = np.left_shift(
+            np.uint64(1), np.arange(n_bits, dtype=np.uint64)
+        )
+
+        codes = np.empty((self.n_rows, n_tables), dtype=np.uint64)
+        for start in range(0, self.n_rows, PROJECTION_BLOCK_ROWS):
+            end = min(start + PROJECTION_BLOCK_ROWS, self.n_rows)
+            codes[start:end] = self._codes(reference_vec[start:end] @ self.planes)
+
+        # Корзины таблицы - отрезки отсортированного массива кодов
+        self.order = np.argsort(codes, axis=0, kind="stable").T.copy()
+        self.sorted_codes = np.take_along_axis(codes, self.order.T, axis=0).T.copy()
+
+    def _codes(self, projections: np.ndarray) -> np.ndarray:
+        bits = (np.asarray(projections) > 0).reshape(
+            -1, self.n_tables, self.n_bits
+        )
+        return (bits.astype(np.uint64) * self._weights).sum(axis=2, dtype=np.uint64)
+
+    def _probe_codes(self, projections: np.ndarray) -> List[np.ndarray]:
+        """
+        Возвращает коды проверяемых корзин для каждой таблицы.
+        """
+        projections = np.asarray(projections).reshape(self.n_tables, self.n_bits)
+        codes = self._codes(projections.reshape(1, -1))[0]
+        n_probes = min(self.n_probes, self.n_bits)
+        flips = np.argsort(np.abs(projections), axis=1)[:, :n_probes]
+
+        probes = []
+        for table in range(self.n_tables):
+            flipped = codes[table] ^ self._weights[flips[table]]
+            probes.append(np.concatenate(([codes[table]], flipped)))
+        return probes
+
+    def candidates(self, x: csr_matrix) -> np.ndarray:
+        """
+        Возвращает строки референсов из корзин запроса.
+
+        Parameters
+        ----------
+        x : csr_matrix
+            Векторизованный запрос (одна строка).
+
+        Returns
+        -------
+        np.ndarray
+            Отсортированные номера строк кандидатов.
+        """
+        if x.nnz == 0:
+            return np.empty(0, dtype=np.intp)
+
+        found = []
+        for table, codes in enumerate(self._probe_codes(x @ self.planes)):
+            starts = np.searchsorted(self.sorted_codes[table], codes, side="left")
+            ends = np.searchsorted(self.sorted_codes[table], codes, side="right")
+            for start, end in zip(starts, ends):
+                found.append(self.order[table, start:end])
+
+        if not found:
+            return np.empty(0, dtype=np.intp)
+        return np.unique(np.concatenate(found))
+
+    def search(
+        self,
+        x: csr_matrix,
+        reference_vec: csr_matrix,
+        rows: np.ndarray,
+        top_k: int = 5,
+        candidates: Optional[List[int]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Находит top_k наиболее близких по косинусу референсов среди
+        кандидатов, входящих в заданный блок.
+
+        Parameters
+        ----------
+        x : csr_matrix
+            Векторизованный запрос (одна строка).
+        reference_vec : csr_matrix
+            Векторизованные референсные названия школ блока.
+        rows : np.ndarray
+            Отсортированные номера строк блока в исходной матрице,
+            по которой построен индекс.
+        top_k : int, optional
+            Количество совпадений (default is 5).
+        candidates : Optional[List[int]], optional
+            Список, в который добавляется количество кандидатов блока,
+            для которых вычислена схожесть (default is None).
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            Номера строк найденных референсов внутри блока и их
+            схожести по убыванию.
+        """
+        _, _, local = np.intersect1d(
+            self.candidates(x), rows, assume_unique=True, return_indices=True
+        )
+        if candidates is not None:
+            candidates.append(local.size)
+        if local.size == 0:
+            return local, np.empty(0)
+
+        scores = (reference_vec[local] @ x.T).toarray().reshape(1, -1)
+        top_indices, top_scores = top_k_from_dense(scores, top_k)
+        return local[top_indices[0]], top_scores[0]
+
+
+def recall_at_k(
+    exact: List[List[Tuple[object, float]]],
+    approximate: List[List[Tuple[object, float]]],
+) -> Dict[str, Union[float, int]]:
+    """
+    Вычисляет полноту приближенного поиска относительно точного.
+
+    Учитываются только совпадения точного поиска с положительной
+    схожестью. Найденным считается совпадение приближенного поиска со
+    схожестью не ниже k-й схожести точного поиска, поэтому выбор между
+    равными по схожести референсами на границе top_k не снижает полноту.
+
+    Parameters
+    ----------
+    exact : List[List[Tuple[object, float]]]
+        Результаты точного поиска (id, схожесть) для каждого запроса.
+    approximate : List[List[Tuple[object, float]]]
+        Результаты приближенного поиска для тех же запросов.
+
+    Returns
+    -------
+    Dict[str, Union[float, int]]
+        Средняя полнота по запросам ("recall"), доля запросов, для
+        которых совпал лучший результат ("top1_agreement"), и количество
+        оцененных запросов ("n_evaluated").
+    """
+    recalls, top1 = [], []
+    for exact_matches, approximate_matches in zip(exact, approximate):
+        expected = [
+            score for id_, score in exact_matches if id_ is not None and score > 0
+        ]
+        if not expected:
+            continue
+        kth_score = min(expected) - 1e-12
+        found = sum(
+            id_ is not None and score >= kth_score
+            for id_, score in approximate_matches
+        )
+        recalls.append(min(found, len(expected)) / len(expected))
+        top1.append(approximate_matches[0][1] >= exact_matches[0][1] - 1e-12)
+
+    return {
+        "recall": float(np.mean(recalls)) if recalls else 1.0,
+        "top1_agreement": float(np.mean(top1)) if top1 else 1.0,
+        "n_evaluated": len(recalls),
+    }
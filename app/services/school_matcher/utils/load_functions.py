@@ -1,10 +1,30 @@
+import argparse
+import os
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Union
 
 import joblib
+import numpy as np
+from scipy.sparse import csr_matrix
 
+# Директория ресурсов по умолчанию
+RESOURCES_DIR = Path("app/services/school_matcher/resources")
 
-def load_resources(resources_type: str, file_type: str) -> Any:
+# Ресурсы, которые можно хранить в виде массивов .npy
+NPY_RESOURCES = ("reference_vec", "reference_id", "reference_name", "reference_region")
+
+# Ресурсы, которые хранятся как разреженные матрицы и как коды значений
+CSR_RESOURCES = ("reference_vec",)
+CODED_RESOURCES = ("reference_region",)
+
+
+def load_resources(
+    resources_type: str,
+    file_type: str,
+    resources_dir: Union[str, Path] = RESOURCES_DIR,
+    mmap_mode: Optional[str] = None,
+) -> Any:
     """
     Загрузка ресурсов из файла.
 
@@ -13,7 +33,15 @@ def load_resources(resources_type: str, file_type: str) -> Any:
     resources_type : str
         Тип ресурса (например, "vectorizer", "reference_vec").
     file_type : str
-        Тип файла (например, "joblib").
+        Тип файла: "joblib" или "npy". Ресурсы "npy" открываются через
+        отображение файла в память и разделяются процессами через
+        страничный кэш.
+    resources_dir : Union[str, Path], optional
+        Директория ресурсов (default is RESOURCES_DIR).
+    mmap_mode : Optional[str], optional
+        Режим отображения в память массивов numpy внутри файла joblib
+        (например, "r"), см. joblib.load (default is None - массивы
+        читаются в память процесса).
 
     Returns
     -------
@@ -26,15 +54,243 @@ def load_resources(resources_type: str, file_type: str) -> Any:
         Если указан неподдерживаемый тип файла.
     """
     # Формируем путь к файлу с ресурсами
-    model_path = (
-        Path("app/services/school_matcher/resources") / f"{resources_type}.{file_type}"
-    )
+    model_path = Path(resources_dir) / f"{resources_type}.{file_type}"
 
     # Проверка типа файла и загрузка ресурсов
     if file_type == "joblib":
-        with open(model_path, "rb") as file:
-            resources = joblib.load(file)
+        if mmap_mode is not None:
+            resources = joblib.load(model_path, mmap_mode=mmap_mode)
+        else:
+            with open(model_path, "rb") as file:
+                resources = joblib.load(file)
+    elif file_type == "npy":
+        resources = load_npy_resource(resources_type, resources_dir)
     else:
         raise ValueError(f"Unsupported file type: {file_type}")
 
     return resources
+
+
+@contextmanager
+def _atomic_file(path: Path) -> Iterator[BinaryIO]:
+    """Открывает временный файл, который после записи заменяет path."""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as file:
+            yield file
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def save_resource(
+    resource: Any, resources_type: str, resources_dir: Union[str, Path] = RESOURCES_DIR
+) -> Path:
+    """
+    Сохраняет ресурс в файл joblib.
+
+    Ресурс записывается во временный файл, который затем атомарно
+    заменяет прежний: процессы, читающие или отобразившие в память
+    прежний файл, не видят частично записанных данных.
+
+    Parameters
+    ----------
+    resource : Any
+        Ресурс.
+    resources_type : str
+        Тип ресурса (например, "vectorizer").
+    resources_dir : Union[str, Path], optional
+        Директория ресурсов (default is RESOURCES_DIR).
+
+    Returns
+    -------
+    Path
+        Путь к файлу ресурса.
+    """
+    path = Path(resources_dir) / f"{resources_type}.joblib"
+    with _atomic_file(path) as file:
+        joblib.dump(resource, file)
+    return path
+
+
+def npy_resource_files(
+    resources_type: str, resources_dir: Union[str, Path] = RESOURCES_DIR
+) -> List[Path]:
+    """
+    Возвращает файлы .npy, из которых состоит ресурс.
+
+    Parameters
+    ----------
+    resources_type : str
+        Тип ресурса из NPY_RESOURCES.
+    resources_dir : Union[str, Path], optional
+        Директория ресурсов (default is RESOURCES_DIR).
+
+    Returns
+    -------
+    List[Path]
+        Пути к файлам ресурса.
+    """
+    if resources_type in CSR_RESOURCES:
+        parts = ["data", "indices", "indptr", "shape"]
+    elif resources_type in CODED_RESOURCES:
+        parts = ["codes", "values"]
+    else:
+        parts = [None]
+    return [
+        Path(resources_dir)
+        / (f"{resources_type}.{part}.npy" if part else f"{resources_type}.npy")
+        for part in parts
+    ]
+
+
+def has_npy_resource(
+    resources_type: str, resources_dir: Union[str, Path] = RESOURCES_DIR
+) -> bool:
+    """
+    Проверяет, что ресурс есть в формате .npy и не старше одноименного
+    файла joblib.
+
+    Parameters
+    ----------
+    resources_type : str
+        Тип ресурса.
+    resources_dir : Union[str, Path], optional
+        Директория ресурсов (default is RESOURCES_DIR).
+
+    Returns
+    -------
+    bool
+        True, если ресурс можно загрузить из .npy.
+    """
+    if resources_type not in NPY_RESOURCES:
+        return False
+    files = npy_resource_files(resources_type, resources_dir)
+    if not all(file.exists() for file in files):
+        return False
+    joblib_path = Path(resources_dir) / f"{resources_type}.joblib"
+    if joblib_path.exists():
+        oldest = min(file.stat().st_mtime for file in files)
+        return oldest >= joblib_path.stat().st_mtime
+    return True
+
+
+def load_npy_resource(
+    resources_type: str, resources_dir: Union[str, Path] = RESOURCES_DIR
+) -> Any:
+    """
+    Открывает ресурс из файлов .npy без копирования массивов в память
+    процесса.
+
+    Parameters
+    ----------
+    resources_type : str
+        Тип ресурса из NPY_RESOURCES.
+    resources_dir : Union[str, Path], optional
+        Директория ресурсов (default is RESOURCES_DIR).
+
+    Returns
+    -------
+    Any
+        Разреженная матрица или массив.
+    """
+    arrays = [
+        np.load(file, mmap_mode="r", allow_pickle=False)
+        for file in npy_resource_files(resources_type, resources_dir)
+    ]
+    if resources_type in CSR_RESOURCES:
+        data, indices, indptr, shape = arrays
+        return csr_matrix((data, indices, indptr), shape=tuple(shape), copy=False)
+    if resources_type in CODED_RESOURCES:
+        codes, values = arrays
+        return values[codes]
+    return arrays[0]
+
+
+def save_npy_resources(
+    resources: Dict[str, Any], resources_dir: Union[str, Path] = RESOURCES_DIR
+) -> None:
+    """
+    Сохраняет ресурсы в формате .npy.
+
+    Разреженная матрица сохраняется как массивы data, indices, indptr и
+    shape, регионы - как целочисленные коды и таблица значений. Файлы
+    заменяются атомарно (см. save_resource), поэтому уже отображенные
+    в память массивы не меняются.
+
+    Parameters
+    ----------
+    resources : Dict[str, Any]
+        Тип ресурса -> ресурс (типы из NPY_RESOURCES).
+    resources_dir : Union[str, Path], optional
+        Директория ресурсов (default is RESOURCES_DIR).
+    """
+    for resources_type, resource in resources.items():
+        files = npy_resource_files(resources_type, resources_dir)
+        if resources_type in CSR_RESOURCES:
+            matrix = csr_matrix(resource)
+            arrays = [
+                matrix.data,
+                matrix.indices,
+                matrix.indptr,
+                np.array(matrix.shape, dtype=np.int64),
+            ]
+        elif resources_type in CODED_RESOURCES:
+            values, codes = np.unique(np.asarray(resource), return_inverse=True)
+            arrays = [codes.astype(np.int32), values]
+        else:
+            arrays = [np.asarray(resource)]
+        for file, array in zip(files, arrays):
+            with _atomic_file(file) as npy_file:
+                np.save(npy_file, array, allow_pickle=False)
+
+
+def convert_resources(
+    source_dir: Union[str, Path], target_dir: Union[str, Path] = RESOURCES_DIR
+) -> List[str]:
+    """
+    Конвертирует ресурсы joblib в формат .npy.
+
+    Parameters
+    ----------
+    source_dir : Union[str, Path]
+        Директория с ресурсами joblib (например, original_resources).
+    target_dir : Union[str, Path], optional
+        Директория для файлов .npy (default is RESOURCES_DIR).
+
+    Returns
+    -------
+    List[str]
+        Сконвертированные типы ресурсов.
+    """
+    Path(target_dir).mkdir(parents=True, exist_ok=True)
+    converted = [
+        resources_type
+        for resources_type in NPY_RESOURCES
+        if (Path(source_dir) / f"{resources_type}.joblib").exists()
+    ]
+    save_npy_resources(
+        {
+            resources_type: load_resources(resources_type, "joblib", source_dir)
+            for resources_type in converted
+        },
+        target_dir,
+    )
+    return converted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Конвертация ресурсов joblib в формат .npy"
+    )
+    parser.add_argument(
+        "--source",
+        default="app/services/school_matcher/original_resources",
+        help="директория с ресурсами joblib",
+    )
+    parser.add_argument(
+        "--target", default=str(RESOURCES_DIR), help="директория для файлов .npy"
+    )
+    args = parser.parse_args()
+    print(f"Converted: {convert_resources(args.source, args.target)}")
@@ -0,0 +1,159 @@
+import time
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
+
+from app.services.school_matcher.utils.pattern_matcher import MultiPatternMatcher
+from app.services.school_matcher.utils.preprocess_functions import (
+    ABBR_MAX_VARIANTS,
+    NumberWordsTable,
+    lemmatize_text,
+    preprocessor,
+    remove_short_words,
+)
+
+
+class NamePipeline:
+    """
+    Предобработка названий школ, общая для поиска и создания ресурсов.
+
+    Один проход по названию возвращает и предобработанное название, и
+    регион: общая часть цепочки (простая предобработка, замена чисел,
+    сокращения) выполняется один раз, регион находится и удаляется одним
+    поиском. Объект создается один раз для набора ресурсов и передается
+    в процессы предобработки при создании ресурсов, поэтому названия
+    референсов, обучающей выборки и запросов обрабатываются одинаково.
+
+    Parameters
+    ----------
+    number_words : NumberWordsTable
+        Таблица текстовых представлений чисел.
+    abbreviations_dict : dict
+        Словарь сокращений.
+    pattern_matcher : MultiPatternMatcher
+        Индекс регионов, городов и ОПФ.
+    stop_words : Collection[str]
+        Стоп-слова. Для быстрой проверки передается frozenset.
+    """
+
+    def __init__(
+        self,
+        number_words: NumberWordsTable,
+        abbreviations_dict: dict,
+        pattern_matcher: MultiPatternMatcher,
+        stop_words: Collection[str],
+    ):
+        self.number_words = number_words
+        self.abbreviations_dict = abbreviations_dict
+        self.pattern_matcher = pattern_matcher
+        self.stop_words = stop_words
+
+    def process(
+        self, text: str, timings: Optional[Dict[str, float]] = None
+    ) -> Tuple[str, Optional[str]]:
+        """
+        Предобрабатывает название школы и находит в нем регион.
+
+        Parameters
+        ----------
+        text : str
+            Название школы.
+        timings : Optional[Dict[str, float]], optional
+            Словарь, к значениям которого добавляется время этапов
+            предобработки в секундах: "simple", "numbers",
+            "abbreviations", "region", "opf", "lemmatize", "short_words"
+            (default is None).
+
+        Returns
+        -------
+        Tuple[str, Optional[str]]
+            Предобработанное название и регион (None, если регион не
+            найден).
+        """
+        clock = time.perf_counter
+        t0 = clock()
+        x = preprocessor.simple(text)
+        t1 = clock()
+        x = self.number_words.replace(x)
+        t2 = clock()
+        x = preprocessor.abbr(x, self.abbreviations_dict)
+        t3 = clock()
+        region, x = self.pattern_matcher.split_region(x)
+        t4 = clock()
+        x = self.pattern_matcher.remove_substrings(x)
+        t5 = clock()
+        x = preprocessor.simple(x)
+        t6 = clock()
+        x = lemmatize_text(x, self.stop_words)
+        t7 = clock()
+        x = remove_short_words(x)
+
+        if timings is not None:
+            t8 = clock()
+            for stage, seconds in (
+                ("simple", t1 - t0 + t6 - t5),
+                ("numbers", t2 - t1),
+                ("abbreviations", t3 - t2),
+                ("region", t4 - t3),
+                ("opf", t5 - t4),
+                ("lemmatize", t7 - t6),
+                ("short_words", t8 - t7),
+            ):
+                timings[stage] = timings.get(stage, 0.0) + seconds
+        return x, region
+
+    def process_variants(
+        self, text: str, max_variants: int = ABBR_MAX_VARIANTS
+    ) -> List[Tuple[str, Optional[str]]]:
+        """
+        Предобрабатывает название школы во всех вариантах расшифровки
+        неоднозначных сокращений (не больше max_variants).
+
+        Первый вариант совпадает с результатом process (неоднозначные
+        сокращения удалены), за ним следуют варианты с каждой из
+        расшифровок. Одинаковые после предобработки варианты не
+        повторяются.
+
+        Parameters
+        ----------
+        text : str
+            Название школы.
+        max_variants : int, optional
+            Наибольшее количество вариантов (default is ABBR_MAX_VARIANTS).
+
+        Returns
+        -------
+        List[Tuple[str, Optional[str]]]
+            Пары (название, регион).
+        """
+        variants = [self.process(text)]
+        x = self.number_words.replace(preprocessor.simple(text))
+        expansions = preprocessor.abbr(
+            x, self.abbreviations_dict, output_list=True, max_variants=max_variants
+        )
+        for expansion in expansions:
+            if len(variants) >= max_variants:
+                break
+            region, x = self.pattern_matcher.split_region(expansion)
+            x = self.pattern_matcher.remove_substrings(x)
+            x = preprocessor.simple(x)
+            x = lemmatize_text(x, self.stop_words)
+            variant = (remove_short_words(x), region)
+            if variant not in variants:
+                variants.append(variant)
+        return variants
+
+    def process_many(self, texts: Iterable[str]) -> List[Tuple[str, Optional[str]]]:
+        """
+        Предобрабатывает список названий школ (см. process).
+
+        Parameters
+        ----------
+        texts : Iterable[str]
+            Названия школ.
+
+        Returns
+        -------
+        List[Tuple[str, Optional[str]]]
+            Пары (название, регион) в порядке входных названий.
+        """
+        process = self.process
+        return [process(text) for text in texts]
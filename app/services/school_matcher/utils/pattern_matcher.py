@@ -0,0 +1,350 @@
+import hashlib
+import re
+from typing import Dict, List, Optional, Tuple, Union
+
+# Последовательности словесных символов (как \w в регулярных выражениях)
+WORD_RUN_PATTERN = re.compile(r"\w+")
+
+# Символы вне ASCII и основной кириллицы. Для текста из этих диапазонов
+# поиск без учета регистра через str.lower совпадает с re.IGNORECASE
+UNSAFE_CHAR_PATTERN = re.compile(r"[^\x00-\x7fЀ-ӿ]")
+
+# Символы, которые поглощает окончание города [а-я]* с re.IGNORECASE
+CITY_SUFFIX_CHARS = frozenset(
+    "абвгдежзийклмнопрстуфхцчшщъыьэюя" "АБВГДЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ"
+)
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _is_regular(key: str) -> bool:
+    """
+    Проверяет, что ключ можно искать по индексу слов: он непустой,
+    в нижнем регистре, состоит из безопасных символов и начинается
+    и заканчивается словесным символом.
+    """
+    return (
+        bool(key)
+        and key.lower() == key
+        and UNSAFE_CHAR_PATTERN.search(key) is None
+        and _is_word_char(key[0])
+        and _is_word_char(key[-1])
+    )
+
+
+class MultiPatternMatcher:
+    """
+    Поиск регионов, городов и удаление подстрок из черного списка ОПФ
+    за один проход по словам текста.
+
+    Вместо компиляции регулярного выражения для каждого региона и города
+    при каждом вызове строится индекс: первое слово региона (города) ->
+    регионы (города) с этим словом. Текст один раз разбивается на слова,
+    кандидаты проверяются сравнением подстрок с учетом границ слов.
+    Результаты совпадают с process_region, process_cities и
+    remove_substrings: при равных условиях побеждает регион (город),
+    идущий раньше в списке, а найденный фрагмент и удаление вычисляются
+    заранее скомпилированным шаблоном победителя. Текст с символами вне
+    ASCII и основной кириллицы обрабатывается перебором шаблонов.
+
+    Объект сериализуется вместе с остальными ресурсами: скомпилированные
+    шаблоны не сохраняются и создаются при первом использовании.
+
+    Parameters
+    ----------
+    region_dict : Dict[str, List[str]]
+        Словарь регион -> список городов региона.
+    blacklist_opf : List[str]
+        Подстроки (организационно-правовые формы) для удаления.
+    """
+
+    def __init__(self, region_dict: Dict[str, List[str]], blacklist_opf: List[str]):
+        self.regions = list(region_dict)
+        self.cities = [city for cities in region_dict.values() for city in cities]
+        self.blacklist_opf = list(blacklist_opf)
+        self.fingerprint = self.make_fingerprint(region_dict, blacklist_opf)
+
+        self._region_index, self._irregular_regions = self._build_index(
+            self.regions
+        )
+        self._city_index, self._irregular_cities = self._build_index(self.cities)
+
+        # Однословные города ищутся как префиксы слов текста
+        self._single_city_index: Dict[str, List[int]] = {}
+        for priority, city in enumerate(self.cities):
+            if _is_regular(city) and WORD_RUN_PATTERN.fullmatch(city):
+                self._single_city_index.setdefault(city, []).append(priority)
+                self._city_index[city].remove(priority)
+                if not self._city_index[city]:
+                    del self._city_index[city]
+        self._single_city_lengths = sorted({len(c) for c in self._single_city_index})
+
+        self._region_patterns: Dict[int, re.Pattern] = {}
+        self._city_patterns: Dict[int, re.Pattern] = {}
+
+    @staticmethod
+    def make_fingerprint(
+        region_dict: Dict[str, List[str]], blacklist_opf: List[str]
+    ) -> str:
+        """
+        Вычисляет отпечаток исходных данных, чтобы определить, соответствует
+        ли сохраненный объект текущим ресурсам.
+        """
+        digest = hashlib.sha1()
+        for region, cities in region_dict.items():
+            digest.update(repr((region, list(cities))).encode("utf-8"))
+        digest.update(repr(list(blacklist_opf)).encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def _build_index(keys: List[str]) -> Tuple[Dict[str, List[int]], List[int]]:
+        index: Dict[str, List[int]] = {}
+        irregular = []
+        for priority, key in enumerate(keys):
+            if _is_regular(key):
+                first_word = WORD_RUN_PATTERN.match(key).group(0)
+                index.setdefault(first_word, []).append(priority)
+            else:
+                irregular.append(priority)
+        return index, irregular
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_region_patterns"] = {}
+        state["_city_patterns"] = {}
+        return state
+
+    def region_pattern(self, priority: int) -> re.Pattern:
+        """Возвращает шаблон региона, как в process_region."""
+        pattern = self._region_patterns.get(priority)
+        if pattern is None:
+            pattern = re.compile(
+                r"\b" + re.escape(self.regions[priority]) + r"\b", re.IGNORECASE
+            )
+            self._region_patterns[priority] = pattern
+        return pattern
+
+    def city_pattern(self, priority: int) -> re.Pattern:
+        """Возвращает шаблон города, как в process_cities."""
+        pattern = self._city_patterns.get(priority)
+        if pattern is None:
+            pattern = re.compile(
+                r"\b" + re.escape(self.cities[priority]) + r"[а-я]*\b",
+                re.IGNORECASE,
+            )
+            self._city_patterns[priority] = pattern
+        return pattern
+
+    def _scan_priorities(
+        self, text: str, find_city: bool = True
+    ) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Находит регион и город с наименьшим приоритетом (индексом в списке),
+        встречающиеся в тексте.
+        """
+        if UNSAFE_CHAR_PATTERN.search(text) is not None:
+            return self._scan_priorities_slow(text, find_city)
+
+        lowered = text.lower()
+        length = len(lowered)
+        best_region = best_city = None
+
+        for match in WORD_RUN_PATTERN.finditer(lowered):
+            start, word = match.start(), match.group(0)
+
+            for priority in self._region_index.get(word, ()):
+                if best_region is not None and priority >= best_region:
+                    break
+                region = self.regions[priority]
+                end = start + len(region)
+                if lowered.startswith(region, start) and (
+                    end == length or not _is_word_char(lowered[end])
+                ):
+                    best_region = priority
+
+            if not find_city:
+                continue
+            candidates = list(self._city_index.get(word, ()))
+            for city_length in self._single_city_lengths:
+                if city_length > len(word):
+                    break
+                candidates.extend(self._single_city_index.get(word[:city_length], ()))
+            for priority in candidates:
+                if best_city is not None and priority >= best_city:
+                    continue
+                city = self.cities[priority]
+                end = start + len(city)
+                if not lowered.startswith(city, start):
+                    continue
+                while end < length and lowered[end] in CITY_SUFFIX_CHARS:
+                    end += 1
+                if end == length or not _is_word_char(lowered[end]):
+                    best_city = priority
+
+        # Ключи, которые нельзя искать по индексу, проверяем шаблонами
+        for priority in self._irregular_regions:
+            if best_region is not None and priority >= best_region:
+                break
+            if self.region_pattern(priority).search(text):
+                best_region = priority
+        for priority in self._irregular_cities if find_city else ():
+            if best_city is not None and priority >= best_city:
+                break
+            if self.city_pattern(priority).search(text):
+                best_city = priority
+
+        return best_region, best_city
+
+    def _scan_priorities_slow(
+        self, text: str, find_city: bool = True
+    ) -> Tuple[Optional[int], Optional[int]]:
+        best_region = best_city = None
+        for priority in range(len(self.regions)):
+            if self.region_pattern(priority).search(text):
+                best_region = priority
+                break
+        for priority in range(len(self.cities) if find_city else 0):
+            if self.city_pattern(priority).search(text):
+                best_city = priority
+                break
+        return best_region, best_city
+
+    def process_region(
+        self, text: str, return_region: bool = False
+    ) -> Union[str, Union[str, None]]:
+        """
+        Находит в тексте регион, удаляет его и возвращает либо новый текст
+        без региона, либо регион (см. process_region).
+
+        Parameters
+        ----------
+        text : str
+            Исходный текст.
+        return_region : bool, optional
+            Если True, возвращает найденный регион, иначе возвращает
+            текст без региона (default is False).
+
+        Returns
+        -------
+        Union[str, Union[str, None]]
+            Либо новый текст без региона, либо найденный регион.
+        """
+        priority = self._scan_priorities(text, find_city=False)[0]
+        if priority is None:
+            return None if return_region else text
+        pattern = self.region_pattern(priority)
+        if return_region:
+            return pattern.search(text).group(0)
+        return pattern.sub("", text).strip()
+
+    def split_region(self, text: str) -> Tuple[Optional[str], str]:
+        """
+        Находит в тексте регион и удаляет его за один поиск (см.
+        process_region).
+
+        Parameters
+        ----------
+        text : str
+            Исходный текст.
+
+        Returns
+        -------
+        Tuple[Optional[str], str]
+            Найденный регион (None, если регион не найден) и текст без
+            региона.
+        """
+        priority = self._scan_priorities(text, find_city=False)[0]
+        if priority is None:
+            return None, text
+        pattern = self.region_pattern(priority)
+        return pattern.search(text).group(0), pattern.sub("", text).strip()
+
+    def process_cities(
+        self, text: str, return_city: bool = False
+    ) -> Union[str, Union[str, None]]:
+        """
+        Находит в тексте город, удаляет его и возвращает либо новый текст
+        без города, либо город (см. process_cities).
+
+        Parameters
+        ----------
+        text : str
+            Исходный текст.
+        return_city : bool, optional
+            Если True, возвращает найденный город, иначе возвращает
+            текст без города (default is False).
+
+        Returns
+        -------
+        Union[str, Union[str, None]]
+            Либо новый текст без города, либо найденный город.
+        """
+        priority = self._scan_priorities(text)[1]
+        if priority is None:
+            return None if return_city else text
+        pattern = self.city_pattern(priority)
+        if return_city:
+            return pattern.search(text).group(0)
+        return pattern.sub("", text).strip()
+
+    def remove_substrings(self, text: str) -> str:
+        """
+        Удаляет подстроки черного списка ОПФ из текста (см. remove_substrings).
+
+        Подстроки, стоящие в списке до первой найденной в тексте, не влияют
+        на результат, кроме обрезки пробелов, поэтому последовательное
+        удаление начинается с первой найденной подстроки.
+
+        Parameters
+        ----------
+        text : str
+            Исходный текст.
+
+        Returns
+        -------
+        str
+            Текст без подстрок.
+        """
+        if not self.blacklist_opf:
+            return text
+
+        text = text.replace(self.blacklist_opf[0], "").strip()
+        for first in range(1, len(self.blacklist_opf)):
+            if self.blacklist_opf[first] in text:
+                break
+        else:
+            return text
+
+        for substring in self.blacklist_opf[first:]:
+            text = text.replace(substring, "").strip()
+        return text
+
+    def scan(self, text: str) -> Tuple[Optional[str], Optional[str], str]:
+        """
+        Находит регион и город и очищает текст за один проход по словам.
+
+        Parameters
+        ----------
+        text : str
+            Исходный текст.
+
+        Returns
+        -------
+        Tuple[Optional[str], Optional[str], str]
+            Найденный регион, найденный город и текст без региона и
+            подстрок черного списка ОПФ.
+        """
+        region_priority, city_priority = self._scan_priorities(text)
+
+        region = city = None
+        cleaned = text
+        if region_priority is not None:
+            pattern = self.region_pattern(region_priority)
+            region = pattern.search(text).group(0)
+            cleaned = pattern.sub("", text).strip()
+        if city_priority is not None:
+            city = self.city_pattern(city_priority).search(text).group(0)
+
+        return region, city, self.remove_substrings(cleaned)
@@ -1,24 +1,295 @@
+import functools
 import itertools
+import os
 import re
-from typing import Dict, List, Union
+from typing import Collection, Dict, Iterable, List, Optional, Union
 
 import nltk
 import pymorphy3
-from nltk.tokenize import word_tokenize
+from nltk.tokenize import NLTKWordTokenizer, word_tokenize
 from num2words import num2words
 
-from app.core.logger import setup_logger
-
-# Загружаем необходимые ресурсы
-nltk.download("punkt", quiet=True)
-nltk.download("punkt_tab", quiet=True)
-
-# Инициализация морфологического анализатора для русского языка
-morph = pymorphy3.MorphAnalyzer()
+from app.core.logger import LogCounter, setup_logger
 
 # Инициализируем логгер для school_matcher
 logger = setup_logger("school_matcher", "app/logs/school_matcher/logs.log")
 
+# Неизвестные аббревиатуры не записываются в лог при каждой встрече:
+# счетчик периодически записывает сводку (интервал в секундах)
+UNKNOWN_ABBR_LOG_INTERVAL = float(
+    os.getenv("SCHOOL_MATCHER_UNKNOWN_ABBR_LOG_INTERVAL", 300)
+)
+unknown_abbreviations = LogCounter(
+    logger, "Unknown abbreviations", UNKNOWN_ABBR_LOG_INTERVAL
+)
+
+# Данные токенизатора nltk (punkt) поставляются вместе с приложением и не
+# скачиваются при импорте. Скачивание по сети включается явно
+NLTK_DATA_DIR = os.getenv(
+    "SCHOOL_MATCHER_NLTK_DATA", "app/services/school_matcher/nltk_data"
+)
+NLTK_DOWNLOAD = os.getenv("SCHOOL_MATCHER_NLTK_DOWNLOAD", "false").lower() == "true"
+if NLTK_DATA_DIR not in nltk.data.path:
+    nltk.data.path.insert(0, NLTK_DATA_DIR)
+
+# Размер кэша лемм и способ токенизации для lemmatize_text. Токенизатор
+# "regex" не использует данные punkt; "nltk" требует их (см. ensure_nltk_data)
+LEMMA_CACHE_SIZE = int(os.getenv("SCHOOL_MATCHER_LEMMA_CACHE_SIZE", 100000))
+TOKENIZER = os.getenv("SCHOOL_MATCHER_TOKENIZER", "regex")
+
+# Наибольшее количество вариантов расшифровки сокращений одного названия
+ABBR_MAX_VARIANTS = int(os.getenv("SCHOOL_MATCHER_ABBR_MAX_VARIANTS", 16))
+
+# Наибольшее число, текстовое представление которого вычисляется заранее
+NUMBER_WORDS_MAX = int(os.getenv("SCHOOL_MATCHER_NUMBER_WORDS_MAX", 10000))
+
+
+@functools.lru_cache(maxsize=None)
+def get_morph() -> pymorphy3.MorphAnalyzer:
+    """
+    Возвращает морфологический анализатор для русского языка.
+    Анализатор создается при первом обращении.
+
+    Returns
+    -------
+    pymorphy3.MorphAnalyzer
+        Морфологический анализатор.
+    """
+    return pymorphy3.MorphAnalyzer()
+
+
+def ensure_nltk_data(download: bool = NLTK_DOWNLOAD) -> bool:
+    """
+    Проверяет наличие данных токенизатора punkt для word_tokenize.
+
+    Parameters
+    ----------
+    download : bool, optional
+        Скачать данные в NLTK_DATA_DIR, если их нет (default is
+        NLTK_DOWNLOAD).
+
+    Returns
+    -------
+    bool
+        True, если данные доступны.
+    """
+    try:
+        nltk.data.find("tokenizers/punkt_tab/russian/")
+        return True
+    except LookupError:
+        if not download:
+            logger.warning(
+                f"nltk punkt data is not found in {NLTK_DATA_DIR}, "
+                "word_tokenize is unavailable"
+            )
+            return False
+    logger.info(f"Download nltk punkt data to {NLTK_DATA_DIR}")
+    return nltk.download("punkt_tab", download_dir=NLTK_DATA_DIR, quiet=True)
+
+
+class TextPreprocessor:
+    """
+    Движок предобработки текста с заранее скомпилированными регулярными
+    выражениями.
+
+    Все шаблоны компилируются один раз при создании объекта. Проходы,
+    которые заведомо ничего не изменят, пропускаются по быстрой проверке
+    подстроки: обозначения номера ищутся только при наличии латинской
+    "n", замена "ё" - только при наличии "ё". Замена служебных символов,
+    схлопывание пробелов и обрезка краев объединены в один вызов
+    str.split. Результат совпадает побайтно с последовательной
+    обработкой исходными регулярными выражениями.
+    """
+
+    # Предлоги и обозначения номера для abbr_preprocess_text
+    TWO_LETTER_PREPOSITIONS = [
+        " в ",
+        " во ",
+        " до ",
+        " из ",
+        " на ",
+        " по ",
+        " о ",
+        " об ",
+        " обо ",
+        " у ",
+    ]
+    NUMBER_SYMBOLS = [" no", " NO", " No", "номер"]
+
+    def __init__(self):
+        self.punctuation_pattern = re.compile(r"[^\w\s]")
+        self.single_letter_pattern = re.compile(r"\b[А-ЯЁа-яё]\b")
+        # Знак "№" удаляется вместе с пунктуацией раньше этого шага
+        self.number_sign_pattern = re.compile(r"\b(?:No|no|N|NO|№)(\d*)\b")
+        # Шаблон предлогов фактически является одной строкой-литералом,
+        # поэтому наличие литерала проверяется до поиска по шаблону
+        self.prepositions_literal = "".join(self.TWO_LETTER_PREPOSITIONS) + "".join(
+            self.NUMBER_SYMBOLS
+        )
+        self.prepositions_pattern = re.compile(
+            r"\b(?:" + self.prepositions_literal + r")\b"
+        )
+        self.uppercase_abbreviation_pattern = re.compile(
+            r"\b[А-ЯЁа-яё]+[а-яё]*[А-ЯЁ]+\b"
+        )
+        self.control_table = str.maketrans("\n\t\r", "   ")
+        self.yo_table = str.maketrans("Ёё", "ее")
+
+    def _replace_yo(self, text: str) -> str:
+        if "ё" in text or "Ё" in text:
+            return text.translate(self.yo_table)
+        return text
+
+    def simple(self, text: str) -> str:
+        """
+        Простая предобработка текста (см. simple_preprocess_text).
+
+        Parameters
+        ----------
+        text : str
+            Исходный текст.
+
+        Returns
+        -------
+        str
+            Предобработанный текст.
+        """
+        if text is None:
+            text = ""
+
+        # Удаление пунктуации и отдельных букв, замена букв ё
+        text = self.punctuation_pattern.sub(" ", text)
+        text = self.single_letter_pattern.sub(" ", text)
+        text = self._replace_yo(text)
+
+        # Замена обозначений номера: все варианты содержат латинскую "n"
+        if "N" in text or "n" in text:
+            text = self.number_sign_pattern.sub(r" \1", text)
+
+        # Удаление служебных символов, лишних пробелов и пробелов по краям
+        return " ".join(text.split())
+
+    def abbr(
+        self,
+        name: str,
+        abbreviation_dict: Dict[str, Union[str, List[str]]],
+        output_list: bool = False,
+        unknown_answer: bool = False,
+        remove_unknown_abbr: bool = False,
+        remove_all_abbr: bool = False,
+        max_variants: int = ABBR_MAX_VARIANTS,
+    ) -> Union[str, List[str]]:
+        """
+        Предобработка текста с учетом сокращений и аббревиатур
+        (см. abbr_preprocess_text).
+        """
+        # Удаляем служебные символы (перенос строки, табуляция и т.д.)
+        name = name.translate(self.control_table)
+
+        # Заменяем все предлоги на пробел (предварительное решение
+        # вместо трудоемкого удаления стоп-слов)
+        if self.prepositions_literal in name:
+            name = self.prepositions_pattern.sub(" ", name)
+
+        # Удаление пунктуации и отдельных букв, замена букв ё
+        name = self.punctuation_pattern.sub(" ", name)
+        name = self.single_letter_pattern.sub(" ", name)
+        name = self._replace_yo(name)
+
+        unknown_abbr = []
+        # Находим аббревиатуры большими буквами и приводим их к нижнему регистру
+        # Надо уточнить поиск неизвестных.
+        # А если в конце аббревиатуры прописная буква?
+        # В тексте без прописных букв аббревиатур нет
+        if name.islower():
+            uppercase_abbreviations = []
+        else:
+            uppercase_abbreviations = self.uppercase_abbreviation_pattern.findall(name)
+        for abbr in uppercase_abbreviations:
+            abbr = abbr.lower()
+            if abbr not in abbreviation_dict:
+                unknown_abbr.append(abbr.upper())
+                unknown_abbreviations.add(abbr.upper())
+                if remove_unknown_abbr:
+                    name = re.sub(r"\b" + re.escape(abbr.upper()) + r"\b", " ", name)
+
+        # Удаление лишних пробелов, в том числе в начале и в конце
+        name = " ".join(name.split())
+
+        if unknown_answer:
+            return list(set(unknown_abbr))
+
+        parts = name.lower().split()
+
+        if not output_list:
+            # Нужен только первый вариант: для каждого слова первая замена,
+            # неоднозначные сокращения удаляются
+            words = []
+            for part in parts:
+                if part in abbreviation_dict:
+                    if not remove_all_abbr:
+                        replacement = abbreviation_dict[part]
+                        if not isinstance(replacement, str):
+                            replacement = ""
+                        words.append(replacement)
+                else:
+                    words.append(part)
+            return " ".join(words).strip()
+
+        possible_replacements = []
+        for part in parts:
+            if part in abbreviation_dict:
+                if not remove_all_abbr:
+                    replacements = abbreviation_dict[part]
+                    if isinstance(replacements, str):
+                        replacements = [replacements]
+                    possible_replacements.append(replacements)
+            else:
+                possible_replacements.append([part])
+
+        # Комбинации генерируются лениво и не больше max_variants: при
+        # нескольких неоднозначных сокращениях их количество растет
+        # экспоненциально
+        return [
+            " ".join(combination).strip()
+            for combination in itertools.islice(
+                itertools.product(*possible_replacements), max(1, max_variants)
+            )
+        ]
+
+    def process_many(
+        self,
+        texts: Iterable[str],
+        abbreviation_dict: Optional[Dict[str, Union[str, List[str]]]] = None,
+        **abbr_kwargs,
+    ) -> List[Union[str, List[str]]]:
+        """
+        Предобрабатывает список текстов.
+
+        Parameters
+        ----------
+        texts : Iterable[str]
+            Исходные тексты.
+        abbreviation_dict : Optional[Dict[str, Union[str, List[str]]]], optional
+            Словарь сокращений. Если передан, к текстам применяется
+            abbr_preprocess_text с параметрами abbr_kwargs, иначе
+            simple_preprocess_text (default is None).
+
+        Returns
+        -------
+        List[Union[str, List[str]]]
+            Предобработанные тексты в порядке входных.
+        """
+        if abbreviation_dict is None:
+            simple = self.simple
+            return [simple(text) for text in texts]
+        abbr = self.abbr
+        return [abbr(text, abbreviation_dict, **abbr_kwargs) for text in texts]
+
+
+# Общий движок предобработки, используемый функциями модуля
+preprocessor = TextPreprocessor()
+
 
 def simple_preprocess_text(text: str) -> str:
     """
@@ -34,37 +305,73 @@ def simple_preprocess_text(text: str) -> str:
     str
         Предобработанный текст.
     """
-    if text is None:
-        text = ""
-
-    # Удаляем служебные символы (перенос строки, табуляция и т.д.)
-    text = re.sub(r"[\n\t\r]", " ", text)
-
-    # Удаление пунктуации
-    text = re.sub(r"[^\w\s]", " ", text)
-
-    # Удаление отдельных букв
-    text = re.sub(r"\b[А-ЯЁа-яё]\b", " ", text)
-
-    # Замена букв ё
-    text = re.sub(r"[Ёё]", "е", text)
+    return preprocessor.simple(text)
 
-    # Регулярное выражение для поиска различных обозначений номера, включая случаи, когда за ними сразу идут цифры
-    pattern = re.compile(r"\b(?:No|no|N|NO|№)(\d*)\b")
 
-    # Замена найденных обозначений на "номер"
-    text = pattern.sub(lambda match: f" {match.group(1)}", text)
-
-    # Удаление лишних пробелов
-    text = re.sub(r"\s+", " ", text)
-
-    # Удаление пробелов в начале и в конце
-    text = text.strip()
+class NumberWordsTable:
+    """
+    Заранее вычисленные текстовые представления чисел от 0 до max_number.
 
-    return text
+    Номера школ почти всегда небольшие, поэтому вместо вызова num2words
+    для каждого числа в названии текст берется из таблицы. Для чисел
+    больше max_number используется num2words. Таблица сохраняется вместе
+    с остальными ресурсами.
 
+    Parameters
+    ----------
+    max_number : int, optional
+        Наибольшее число в таблице (default is NUMBER_WORDS_MAX).
+    lang : str, optional
+        Язык текстового представления (default is "ru").
+    """
 
-def replace_numbers_with_text(text: str) -> str:
+    def __init__(self, max_number: int = NUMBER_WORDS_MAX, lang: str = "ru"):
+        self.max_number = max_number
+        self.lang = lang
+        self.words = [num2words(number, lang=lang) for number in range(max_number + 1)]
+        self.number_pattern = re.compile(r"\d+")
+
+    def to_words(self, number: int) -> str:
+        """
+        Возвращает текстовое представление числа.
+
+        Parameters
+        ----------
+        number : int
+            Число.
+
+        Returns
+        -------
+        str
+            Текстовое представление числа.
+        """
+        if 0 <= number <= self.max_number:
+            return self.words[number]
+        return num2words(number, lang=self.lang)
+
+    def replace(self, text: str) -> str:
+        """
+        Заменяет числа в тексте на их текстовое представление
+        (см. replace_numbers_with_text).
+
+        Parameters
+        ----------
+        text : str
+            Исходный текст.
+
+        Returns
+        -------
+        str
+            Текст с замененными числами.
+        """
+        return self.number_pattern.sub(
+            lambda match: self.to_words(int(match.group(0))), text
+        )
+
+
+def replace_numbers_with_text(
+    text: str, number_words: Optional[NumberWordsTable] = None
+) -> str:
     """
     Замена чисел в тексте на их текстовое представление.
 
@@ -72,12 +379,17 @@ def replace_numbers_with_text(text: str) -> str:
     ----------
     text : str
         Исходный текст.
+    number_words : Optional[NumberWordsTable], optional
+        Таблица текстовых представлений чисел. Если не указана, каждое
+        число преобразуется через num2words (default is None).
 
     Returns
     -------
     str
         Текст с замененными числами.
     """
+    if number_words is not None:
+        return number_words.replace(text)
 
     # Функция для замены чисел на их текстовое представление
     def num_to_text(match):
@@ -98,6 +410,7 @@ def abbr_preprocess_text(
     unknown_answer: bool = False,
     remove_unknown_abbr: bool = False,
     remove_all_abbr: bool = False,
+    max_variants: int = ABBR_MAX_VARIANTS,
 ) -> Union[str, List[str]]:
     """
     Предобработка текста с учетом сокращений и аббревиатур.
@@ -116,98 +429,26 @@ def abbr_preprocess_text(
         Флаг для удаления неизвестных аббревиатур (default is False).
     remove_all_abbr : bool, optional
         Флаг для удаления всех аббревиатур (default is False).
+    max_variants : int, optional
+        Наибольшее количество комбинаций при output_list=True
+        (default is ABBR_MAX_VARIANTS).
 
     Returns
     -------
     Union[str, List[str]]
-        Обработанный текст или список всех возможных комбинаций.
+        Обработанный текст или список возможных комбинаций (первые
+        max_variants).
     """
-    two_letter_prepositions = [
-        " в ",
-        " во ",
-        " до ",
-        " из ",
-        " на ",
-        " по ",
-        " о ",
-        " об ",
-        " обо ",
-        " у ",
-    ]
-
-    symbols = [" no", " NO", " No", "номер"]
-
-    # Удаляем служебные символы (перенос строки, табуляция и т.д.)
-    name = re.sub(r"[\n\t\r]", " ", name)
-
-    # Создаем регулярное выражение для предлогов
-    prepositions_pattern = (
-        r"\b(?:" + "".join(two_letter_prepositions) + "".join(symbols) + r")\b"
+    return preprocessor.abbr(
+        name,
+        abbreviation_dict,
+        output_list,
+        unknown_answer,
+        remove_unknown_abbr,
+        remove_all_abbr,
+        max_variants,
     )
 
-    # Заменяем все предлоги на пробел (предварительное решение
-    # вместо трудоемкого удаления стоп-слов)
-    name = re.sub(prepositions_pattern, " ", name)
-
-    # Удаление пунктуации
-    name = re.sub(r"[^\w\s]", " ", name)
-
-    # Удаление отдельных букв
-    name = re.sub(r"\b[А-ЯЁа-яё]\b", " ", name)
-
-    # Удаление букв ё
-    name = re.sub(r"[Ёё]", "е", name)
-
-    unknown_abbr = []
-    # Находим аббревиатуры большими буквами и приводим их к нижнему регистру
-    # Надо уточнить поиск неизвестных.
-    # А если в конце аббревиатуры прописная буква?
-    uppercase_abbreviations = re.findall(r"\b[А-ЯЁа-яё]+[а-яё]*[А-ЯЁ]+\b", name)
-    for abbr in uppercase_abbreviations:
-        abbr = abbr.lower()
-        if abbr not in abbreviation_dict:
-            unknown_abbr.append(abbr.upper())
-            logger.info(unknown_abbr)
-            if remove_unknown_abbr:
-                name = re.sub(r"\b" + re.escape(abbr.upper()) + r"\b", " ", name)
-
-    # Удаление лишних пробелов
-    name = re.sub(r"\s+", " ", name)
-
-    # Удаление пробелов в начале и в конце
-    name = name.strip()
-
-    possible_replacements = []
-    parts = name.lower().split()
-
-    for part in parts:
-        if part in abbreviation_dict:
-            if not remove_all_abbr:
-                replacements = abbreviation_dict[part]
-                if isinstance(replacements, str):
-                    replacements = [replacements]
-                elif not output_list:
-                    replacements = [""]
-                possible_replacements.append(replacements)
-            else:
-                pass
-        else:
-            possible_replacements.append([part])
-
-    # Генерируем все возможные комбинации
-    all_combinations = list(itertools.product(*possible_replacements))
-
-    # Формируем итоговые наименования
-    final_phrases = [" ".join(combination).strip() for combination in all_combinations]
-
-    if not output_list:
-        final_phrases = final_phrases[0]
-
-    if unknown_answer:
-        return list(set(unknown_abbr))
-
-    return final_phrases
-
 
 def process_region(
     text: str, region_list: List[str], return_region: bool = False
@@ -297,7 +538,122 @@ def process_cities(
     return None if return_city else text
 
 
-def lemmatize_text(text: str, stop_words_list: List[str]) -> str:
+class Lemmatizer:
+    """
+    Лемматизация с кэшем нормальных форм слов.
+
+    Названия школ состоят из небольшого словаря, поэтому результат
+    morph.parse для слова кэшируется в ограниченном LRU-кэше. Токенизатор
+    "regex" разбивает по пробелам текст, состоящий только из строчных
+    русских и латинских букв, цифр, "_" и пробельных символов: на таком
+    тексте word_tokenize дает те же токены, кроме английских сокращений
+    вроде "cannot". Текст с другими символами или с такими сокращениями
+    токенизируется word_tokenize без разбиения на предложения, поэтому
+    токенизатору "regex" не нужны данные punkt. Токенизатор "nltk"
+    всегда использует word_tokenize с разбиением на предложения.
+
+    Parameters
+    ----------
+    cache_size : int, optional
+        Максимальное количество слов в кэше (default is LEMMA_CACHE_SIZE).
+    tokenizer : str, optional
+        Токенизатор: "nltk" или "regex" (default is TOKENIZER).
+    """
+
+    TOKENIZERS = ("nltk", "regex")
+
+    def __init__(self, cache_size: int = LEMMA_CACHE_SIZE, tokenizer: str = TOKENIZER):
+        if tokenizer not in self.TOKENIZERS:
+            raise ValueError(
+                f"Unknown tokenizer: {tokenizer}, expected one of {self.TOKENIZERS}"
+            )
+        self.tokenizer = tokenizer
+        self.simple_text_pattern = re.compile(r"[0-9_a-zа-яё\s]*")
+        # Слова, которые word_tokenize разбивает на части
+        self.contraction_patterns = NLTKWordTokenizer.CONTRACTIONS2
+        self.normal_form = functools.lru_cache(maxsize=cache_size)(self._parse)
+
+    @staticmethod
+    def _parse(word: str) -> str:
+        return get_morph().parse(word)[0].normal_form
+
+    def tokenize(self, text: str) -> List[str]:
+        """
+        Разбивает текст в нижнем регистре на токены.
+
+        Parameters
+        ----------
+        text : str
+            Текст в нижнем регистре.
+
+        Returns
+        -------
+        List[str]
+            Токены.
+        """
+        if self.tokenizer == "regex" and self.simple_text_pattern.fullmatch(text):
+            # word_tokenize ищет сокращения в тексте, окруженном пробелами
+            padded = f" {text} "
+            if not any(pattern.search(padded) for pattern in self.contraction_patterns):
+                return text.split()
+        return word_tokenize(
+            text, language="russian", preserve_line=self.tokenizer == "regex"
+        )
+
+    def lemmatize(self, text: str, stop_words: Collection[str]) -> str:
+        """
+        Лемматизация текста и удаление стоп-слов (см. lemmatize_text).
+
+        Parameters
+        ----------
+        text : str
+            Исходный текст.
+        stop_words : Collection[str]
+            Стоп-слова. Для быстрой проверки передается frozenset.
+
+        Returns
+        -------
+        str
+            Лемматизированный текст без стоп-слов.
+        """
+        if not isinstance(stop_words, (set, frozenset)):
+            stop_words = frozenset(stop_words)
+
+        lemmatized_words = [
+            self.normal_form(word) for word in self.tokenize(text.lower())
+        ]
+        return " ".join(word for word in lemmatized_words if word not in stop_words)
+
+    def cache_info(self) -> Dict[str, Union[int, float]]:
+        """
+        Возвращает статистику кэша лемм.
+
+        Returns
+        -------
+        Dict[str, Union[int, float]]
+            Количество попаданий ("hits") и промахов ("misses"), текущий
+            ("size") и максимальный ("max_size") размер кэша и доля
+            попаданий ("hit_rate").
+        """
+        info = self.normal_form.cache_info()
+        requests = info.hits + info.misses
+        return {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "max_size": info.maxsize,
+            "hit_rate": info.hits / requests if requests else 0.0,
+        }
+
+    def cache_clear(self) -> None:
+        """Очищает кэш лемм и счетчики."""
+        self.normal_form.cache_clear()
+
+
+lemmatizer = Lemmatizer()
+
+
+def lemmatize_text(text: str, stop_words_list: Collection[str]) -> str:
     """
     Лемматизация текста и удаление стоп-слов.
 
@@ -305,24 +661,15 @@ def lemmatize_text(text: str, stop_words_list: List[str]) -> str:
     ----------
     text : str
         Исходный текст.
-    stop_words_list : List[str]
-        Список стоп-слов для удаления.
+    stop_words_list : Collection[str]
+        Стоп-слова для удаления. Для быстрой проверки передается frozenset.
 
     Returns
     -------
     str
         Лемматизированный текст без стоп-слов.
     """
-    # Токенизация
-    words = word_tokenize(text.lower(), language="russian")
-
-    # Лемматизация
-    lemmatized_words = [morph.parse(word)[0].normal_form for word in words]
-
-    # Удаление стоп-слов
-    filtered_words = [word for word in lemmatized_words if word not in stop_words_list]
-
-    return " ".join(filtered_words)
+    return lemmatizer.lemmatize(text, stop_words_list)
 
 
 def remove_short_words(text: str) -> str:
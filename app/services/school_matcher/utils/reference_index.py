@@ -0,0 +1,336 @@
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from app.services.school_matcher.utils.similarity_functions import (
+    l1_norms,
+    squared_norms,
+    top_k_from_dense,
+)
+
+
+class InvertedIndex:
+    """
+    Инвертированный индекс: термин словаря -> строки референсов,
+    в которых он встречается.
+
+    Позволяет оценивать только тех кандидатов, у которых есть хотя бы
+    один общий термин с запросом. Термины, встречающиеся в доле
+    референсов больше max_df (например, "школа" или "спортивный"),
+    используются для отбора кандидатов, только если без них нельзя
+    гарантировать точный top_k (см. search), и учитываются при подсчете
+    схожести отобранных кандидатов.
+
+    Parameters
+    ----------
+    reference_vec : csr_matrix
+        Векторизованные референсные названия школ (нормированные по L2).
+    max_df : float, optional
+        Максимальная доля референсов, содержащих термин, при которой
+        термин используется для отбора кандидатов (default is 1.0).
+    """
+
+    def __init__(self, reference_vec: csr_matrix, max_df: float = 1.0):
+        self.reference_vec = csr_matrix(reference_vec)
+        # Строки транспонированной матрицы - списки вхождений терминов
+        self.postings = self.reference_vec.T.tocsr()
+        self.postings.sort_indices()
+
+        n_rows = self.reference_vec.shape[0]
+        document_frequency = np.diff(self.postings.indptr)
+        self.pruned = document_frequency > max_df * n_rows
+
+        # Максимальный вес термина - для верхней оценки вклада термина
+        self.max_weight = np.zeros(self.postings.shape[0])
+        non_empty = document_frequency > 0
+        if non_empty.any():
+            self.max_weight[non_empty] = np.maximum.reduceat(
+                self.postings.data, self.postings.indptr[:-1][non_empty]
+            )
+
+    def _posting(self, term: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self.postings.indptr[term], self.postings.indptr[term + 1]
+        return self.postings.indices[start:end], self.postings.data[start:end]
+
+    def _add_contributions(
+        self,
+        rows: np.ndarray,
+        scores: np.ndarray,
+        terms: np.ndarray,
+        weights: np.ndarray,
+    ) -> None:
+        """
+        Добавляет к схожестям уже отобранных строк вклад терминов,
+        не участвовавших в отборе кандидатов.
+        """
+        for term, weight in zip(terms, weights):
+            term_rows, term_values = self._posting(term)
+            if term_rows.size == 0:
+                continue
+            positions = np.minimum(
+                np.searchsorted(term_rows, rows), term_rows.size - 1
+            )
+            hit = term_rows[positions] == rows
+            scores[hit] += weight * term_values[positions[hit]]
+
+    def candidates(self, x: csr_matrix) -> np.ndarray:
+        """
+        Возвращает строки референсов, имеющих общий термин с запросом.
+
+        Parameters
+        ----------
+        x : csr_matrix
+            Векторизованный запрос (одна строка).
+
+        Returns
+        -------
+        np.ndarray
+            Отсортированные номера строк кандидатов.
+        """
+        terms = x.indices[~self.pruned[x.indices]]
+        if terms.size == 0:
+            return np.empty(0, dtype=np.intp)
+        return np.unique(np.concatenate([self._posting(t)[0] for t in terms]))
+
+    def search(
+        self,
+        x: csr_matrix,
+        top_k: int = 5,
+        early_termination: bool = False,
+        candidates: Optional[List[int]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Находит top_k наиболее близких по косинусу референсов среди кандидатов.
+
+        Схожесть накапливается по спискам вхождений терминов запроса
+        (term-at-a-time) в плотном массиве размера блока. Верхняя оценка
+        вклада термина - его вес в запросе, умноженный на максимальный
+        вес термина в референсах. Как только k-я накопленная схожесть
+        больше суммы оценок еще не обработанных терминов, ни один не
+        встреченный референс не может попасть в top_k, и расширение
+        множества кандидатов прекращается. Вклад оставшихся терминов
+        затем добавляется только для отобранных кандидатов, поэтому их
+        схожести точные, а результат совпадает с полным перебором.
+
+        Без early_termination сначала обрабатываются все термины, кроме
+        частых (см. max_df), с проверкой остановки перед каждым частым
+        термином; при early_termination проверка выполняется перед
+        каждым термином, термины обрабатываются по убыванию оценки.
+
+        Parameters
+        ----------
+        x : csr_matrix
+            Векторизованный запрос (одна строка).
+        top_k : int, optional
+            Количество совпадений (default is 5).
+        early_termination : bool, optional
+            Использовать досрочную остановку (default is False).
+        candidates : Optional[List[int]], optional
+            Список, в который добавляется количество кандидатов, для
+            которых вычислена схожесть (default is None).
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            Номера строк найденных референсов и их схожести по убыванию.
+            Если кандидатов меньше top_k, массивы короче.
+        """
+        terms, weights = x.indices, x.data
+        pruned = self.pruned[terms]
+        bounds = weights * self.max_weight[terms]
+        # Частые термины обрабатываются последними, внутри групп -
+        # по убыванию оценки вклада
+        order = np.lexsort((-bounds, pruned))
+        terms, weights, bounds = terms[order], weights[order], bounds[order]
+        n_selecting = int((~pruned).sum())
+
+        n_rows = self.reference_vec.shape[0]
+        scores = np.zeros(n_rows)
+        seen = np.zeros(n_rows, dtype=bool)
+        n_seen = 0
+        remaining = bounds.sum()
+        n_processed = 0
+        for term, weight, bound in zip(terms, weights, bounds):
+            if (early_termination or n_processed >= n_selecting) and (
+                0 < top_k <= n_seen
+            ):
+                kth = np.partition(scores[seen], n_seen - top_k)[n_seen - top_k]
+                if kth > remaining:
+                    break
+            term_rows, term_values = self._posting(term)
+            scores[term_rows] += weight * term_values
+            n_seen += int(np.count_nonzero(~seen[term_rows]))
+            seen[term_rows] = True
+            remaining -= bound
+            n_processed += 1
+
+        rows = np.flatnonzero(seen)
+        scores = scores[rows]
+        if candidates is not None:
+            candidates.append(rows.size)
+        if rows.size == 0:
+            return rows, scores
+
+        # Точная схожесть кандидатов с учетом всех терминов запроса
+        self._add_contributions(
+            rows, scores, terms[n_processed:], weights[n_processed:]
+        )
+        top_indices, top_scores = top_k_from_dense(scores.reshape(1, -1), top_k)
+        return rows[top_indices[0]], top_scores[0]
+
+
+class ReferenceShard:
+    """
+    Блок референсных школ, по которому выполняется поиск.
+
+    Инвертированный индекс и нормы векторов строятся при первом
+    обращении: они нужны только способам поиска "inverted" и "taat" и
+    методам расстояний, поэтому процесс, выполняющий только точный
+    поиск по косинусу, не хранит их копий.
+
+    Parameters
+    ----------
+    vec : csr_matrix
+        Векторизованные референсные названия школ блока.
+    ids : np.ndarray
+        Идентификаторы референсных школ блока.
+    rows : np.ndarray
+        Номера строк блока в исходной матрице reference_vec.
+    max_df : float, optional
+        Порог отсечения частых терминов для инвертированного индекса
+        (default is 1.0).
+    """
+
+    def __init__(
+        self, vec: csr_matrix, ids: np.ndarray, rows: np.ndarray, max_df: float = 1.0
+    ):
+        self.vec = vec
+        self.ids = ids
+        self.rows = rows
+        self.max_df = max_df
+
+    @cached_property
+    def inverted(self) -> InvertedIndex:
+        """Инвертированный индекс блока."""
+        return InvertedIndex(self.vec, self.max_df)
+
+    @cached_property
+    def squared_norms(self) -> np.ndarray:
+        """Квадраты L2-норм векторов блока (для евклидова расстояния)."""
+        return squared_norms(self.vec)
+
+    @cached_property
+    def l1_norms(self) -> np.ndarray:
+        """L1-нормы векторов блока (для манхэттенского расстояния)."""
+        return l1_norms(self.vec)
+
+
+def row_slice(vec: csr_matrix, start: int, end: int) -> csr_matrix:
+    """
+    Возвращает строки [start, end) CSR-матрицы, разделяющие с ней
+    массивы данных и индексов (копируется только indptr).
+    """
+    indptr = vec.indptr[start : end + 1]
+    first, last = indptr[0], indptr[-1]
+    return csr_matrix(
+        (vec.data[first:last], vec.indices[first:last], indptr - first),
+        shape=(end - start, vec.shape[1]),
+        copy=False,
+    )
+
+
+class RegionIndex:
+    """
+    Индекс референсных школ, заранее разбитый по регионам.
+
+    Строится один раз при загрузке ресурсов: для каждого региона хранится
+    непрерывный CSR-блок и массив идентификаторов, поэтому при поиске не
+    нужно вычислять маску по всем регионам и копировать подматрицу.
+    Порядок школ внутри региона совпадает с порядком в reference_vec.
+    Блоки регионов - срезы одной упорядоченной по регионам копии
+    reference_vec (копия не создается, если школы уже упорядочены по
+    регионам); блок всех школ использует reference_vec без копирования.
+
+    Parameters
+    ----------
+    reference_vec : csr_matrix
+        Векторизованные референсные названия школ.
+    reference_id : np.ndarray
+        Идентификаторы референсных школ.
+    reference_region : np.ndarray
+        Регионы референсных школ.
+    max_df : float, optional
+        Порог отсечения частых терминов для инвертированных индексов
+        блоков (default is 1.0).
+    region_codes : Optional[np.ndarray], optional
+        Целочисленные коды регионов (см. RegionCanonicalizer.encode).
+        Если переданы, школы группируются по кодам вместо сравнения
+        строк (default is None).
+    """
+
+    def __init__(
+        self,
+        reference_vec: csr_matrix,
+        reference_id: np.ndarray,
+        reference_region: np.ndarray,
+        max_df: float = 1.0,
+        region_codes: Optional[np.ndarray] = None,
+    ):
+        reference_vec = csr_matrix(reference_vec)
+        n_rows = reference_vec.shape[0]
+
+        # Блок со всеми школами используется, если в регионе нет школ
+        self.all = ReferenceShard(
+            reference_vec, reference_id, np.arange(n_rows), max_df
+        )
+        self.empty = ReferenceShard(
+            reference_vec[:0], reference_id[:0], np.arange(0), max_df
+        )
+        self.shards: Dict[str, ReferenceShard] = {}
+
+        if n_rows == 0:
+            return
+
+        # Стабильная сортировка сохраняет исходный порядок школ внутри региона
+        keys = reference_region if region_codes is None else region_codes
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        sorted_region = reference_region[order]
+        sorted_id = reference_id[order]
+        if np.all(order[1:] > order[:-1]):
+            sorted_vec = reference_vec
+        else:
+            sorted_vec = reference_vec[order]
+
+        boundaries = np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [n_rows]))
+
+        for start, end in zip(starts, ends):
+            self.shards[sorted_region[start]] = ReferenceShard(
+                row_slice(sorted_vec, start, end),
+                sorted_id[start:end],
+                order[start:end],
+                max_df,
+            )
+
+    def get(self, region: Optional[str]) -> Optional[ReferenceShard]:
+        """
+        Возвращает блок школ региона.
+
+        Parameters
+        ----------
+        region : Optional[str]
+            Регион.
+
+        Returns
+        -------
+        Optional[ReferenceShard]
+            Блок школ региона или None, если в регионе нет школ.
+        """
+        return self.shards.get(region)
+
+    def __len__(self) -> int:
+        return len(self.shards)
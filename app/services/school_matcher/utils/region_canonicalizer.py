@@ -0,0 +1,128 @@
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.services.school_matcher.utils.preprocess_functions import (
+    simple_preprocess_text,
+)
+
+
+class RegionCanonicalizer:
+    """
+    Приведение регионов школ к названиям из словаря регионов по таблице
+    написаний.
+
+    Таблица строится один раз: регион словаря соответствует сам себе,
+    город - своему региону (если город есть в нескольких регионах,
+    выбирается первый), написание из ресурса region_aliases - указанному
+    в нем региону. Значение сначала проходит простую предобработку и
+    приводится к нижнему регистру, затем ищется в таблице целиком.
+    Столбец обрабатывается одним вызовом Series.map: предобработка и
+    поиск выполняются один раз для каждого уникального значения.
+
+    Регионы словаря получают целочисленные коды в порядке словаря.
+
+    Parameters
+    ----------
+    region_dict : Dict[str, List[str]]
+        Словарь регион -> список городов региона.
+    aliases : Optional[Dict[str, str]], optional
+        Написание -> регион словаря (default is None).
+    """
+
+    def __init__(
+        self,
+        region_dict: Dict[str, List[str]],
+        aliases: Optional[Dict[str, str]] = None,
+    ):
+        self.regions = list(region_dict)
+        self.codes = {region: code for code, region in enumerate(self.regions)}
+
+        self.table: Dict[str, str] = {}
+        for region, cities in region_dict.items():
+            for city in cities:
+                self.table.setdefault(city, region)
+        self.table.update(aliases or {})
+        self.table.update({region: region for region in self.regions})
+
+    def canonicalize_value(self, value: Optional[str]) -> str:
+        """
+        Приводит одно значение региона к названию из словаря регионов.
+        Неизвестное значение возвращается после предобработки.
+
+        Parameters
+        ----------
+        value : Optional[str]
+            Регион школы.
+
+        Returns
+        -------
+        str
+            Регион из словаря регионов или предобработанное значение.
+        """
+        value = simple_preprocess_text(value).lower()
+        return self.table.get(value, value)
+
+    def canonicalize(self, regions: pd.Series) -> pd.Series:
+        """
+        Приводит столбец регионов к названиям из словаря регионов.
+
+        Parameters
+        ----------
+        regions : pd.Series
+            Регионы школ.
+
+        Returns
+        -------
+        pd.Series
+            Регионы из словаря регионов; неизвестные значения после
+            предобработки.
+        """
+        mapping = {value: self.canonicalize_value(value) for value in regions.unique()}
+        return regions.map(mapping)
+
+    def unknown(self, regions: Iterable[str]) -> Dict[str, int]:
+        """
+        Возвращает отчет о регионах, которых нет в словаре регионов.
+
+        Parameters
+        ----------
+        regions : Iterable[str]
+            Регионы после приведения (см. canonicalize).
+
+        Returns
+        -------
+        Dict[str, int]
+            Неизвестный регион -> количество записей, по убыванию
+            количества.
+        """
+        counts = Counter(region for region in regions if region not in self.codes)
+        return dict(counts.most_common())
+
+    def encode(self, regions: Iterable[str]) -> np.ndarray:
+        """
+        Возвращает целочисленные коды регионов.
+
+        Регионы словаря получают свои коды, неизвестные регионы - коды
+        после кодов словаря в порядке сортировки значений, поэтому
+        разные неизвестные регионы не совпадают.
+
+        Parameters
+        ----------
+        regions : Iterable[str]
+            Регионы после приведения (см. canonicalize).
+
+        Returns
+        -------
+        np.ndarray
+            Коды регионов (int32).
+        """
+        regions = list(regions)
+        codes = dict(self.codes)
+        for region in sorted(set(regions) - codes.keys()):
+            codes[region] = len(codes)
+        return np.fromiter(
+            (codes[region] for region in regions), dtype=np.int32, count=len(regions)
+        )
@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Union
+
+
+class ResultCache:
+    """
+    Ограниченный LRU-кэш результатов с временем жизни записей.
+
+    Каждая запись помечается версией ресурсов, на которых получен
+    результат. Запись с версией, отличной от текущей, не сохраняется,
+    поэтому результат, вычисленный до обновления ресурсов, не попадает
+    в кэш после него. Для каждой записи считается количество попаданий,
+    чтобы сохранять и заранее прогревать самые востребованные запросы.
+
+    Parameters
+    ----------
+    max_size : int
+        Максимальное количество записей. При 0 кэш отключен.
+    ttl : float
+        Время жизни записи в секундах. При 0 записи не устаревают.
+    clock : Callable[[], float], optional
+        Источник времени (default is time.monotonic).
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.version = 0
+        # Ключ -> [значение, момент устаревания, количество попаданий]
+        self._entries: "OrderedDict[Hashable, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Возвращает значение по ключу или None, если записи нет
+        или она устарела.
+
+        Parameters
+        ----------
+        key : Hashable
+            Ключ записи.
+
+        Returns
+        -------
+        Optional[Any]
+            Значение записи.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and entry[1] <= self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            entry[2] += 1
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, version: int) -> None:
+        """
+        Сохраняет значение, если оно получено на текущей версии ресурсов.
+
+        Parameters
+        ----------
+        key : Hashable
+            Ключ записи.
+        value : Any
+            Значение.
+        version : int
+            Версия ресурсов, на которых получено значение.
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if version != self.version:
+                return
+            previous = self._entries.pop(key, None)
+            hits = previous[2] if previous is not None else 0
+            self._entries[key] = [value, self.clock() + self.ttl, hits]
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def bump_version(self) -> int:
+        """
+        Увеличивает версию ресурсов и удаляет все записи.
+
+        Returns
+        -------
+        int
+            Новая версия.
+        """
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            return self.version
+
+    def hottest(self, n: int) -> List[Hashable]:
+        """
+        Возвращает ключи n записей с наибольшим количеством попаданий.
+
+        Parameters
+        ----------
+        n : int
+            Количество ключей.
+
+        Returns
+        -------
+        List[Hashable]
+            Ключи по убыванию количества попаданий.
+        """
+        with self._lock:
+            items = list(self._entries.items())
+        items.sort(key=lambda item: item[1][2], reverse=True)
+        return [key for key, _ in items[:n]]
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """
+        Возвращает статистику кэша.
+
+        Returns
+        -------
+        Dict[str, Union[int, float]]
+            Количество записей, попаданий, промахов, вытеснений и
+            устаревших записей, доля попаданий и версия ресурсов.
+        """
+        requests = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "version": self.version,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,321 @@
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.preprocessing import normalize
+
+# Размер блока схожестей по умолчанию (64 МБ float64)
+DEFAULT_BLOCK_BYTES = 64 * 1024 * 1024
+
+
+def rows_per_block(n_columns: int, max_block_bytes: int = DEFAULT_BLOCK_BYTES) -> int:
+    """
+    Вычисляет, сколько строк плотной матрицы float64 с заданным
+    количеством столбцов помещается в бюджет памяти.
+
+    Parameters
+    ----------
+    n_columns : int
+        Количество столбцов матрицы.
+    max_block_bytes : int, optional
+        Бюджет памяти на блок в байтах (default is DEFAULT_BLOCK_BYTES).
+
+    Returns
+    -------
+    int
+        Количество строк в блоке (не меньше одной).
+    """
+    return max(1, max_block_bytes // (8 * max(1, n_columns)))
+
+
+def top_k_from_dense(
+    scores: np.ndarray, top_k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Выбирает top_k наибольших значений в каждой строке плотной матрицы.
+
+    Используется argpartition, поэтому полная сортировка строки не
+    выполняется. Результат упорядочен по убыванию значения, при равных
+    значениях первым идет меньший индекс.
+
+    Parameters
+    ----------
+    scores : np.ndarray
+        Матрица значений размера (n_queries, n_references).
+    top_k : int
+        Количество наибольших значений.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        Индексы и значения top_k наибольших элементов каждой строки.
+    """
+    n_rows, n_columns = scores.shape
+    k = min(top_k, n_columns)
+    if k == 0:
+        return (
+            np.empty((n_rows, 0), dtype=np.intp),
+            np.empty((n_rows, 0), dtype=scores.dtype),
+        )
+
+    if k < n_columns:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(n_columns), (n_rows, n_columns))
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+
+    # Сортируем кандидатов по убыванию значения, затем по возрастанию индекса
+    order = np.lexsort((candidates, -candidate_scores), axis=1)
+    top_indices = np.take_along_axis(candidates, order, axis=1)
+    top_scores = np.take_along_axis(candidate_scores, order, axis=1)
+    return top_indices, top_scores
+
+
+def cosine_top_k(
+    x_vec: csr_matrix,
+    reference_vec: csr_matrix,
+    top_k: int = 5,
+    max_block_bytes: int = DEFAULT_BLOCK_BYTES,
+    assume_normalized: bool = True,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Находит top_k наиболее близких по косинусу референсов для каждого запроса.
+
+    Выход TfidfVectorizer уже нормирован по L2, поэтому косинусная
+    схожесть сводится к разреженному скалярному произведению. Запросы
+    обрабатываются блоками так, чтобы плотная матрица схожестей блока
+    не превышала max_block_bytes.
+
+    Parameters
+    ----------
+    x_vec : csr_matrix
+        Векторизованные запросы.
+    reference_vec : csr_matrix
+        Векторизованные референсные названия школ.
+    top_k : int, optional
+        Количество совпадений на запрос (default is 5).
+    max_block_bytes : int, optional
+        Бюджет памяти на блок схожестей в байтах
+        (default is DEFAULT_BLOCK_BYTES).
+    assume_normalized : bool, optional
+        Если False, векторы предварительно нормируются по L2
+        (default is True).
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray, np.ndarray]
+        Индексы top_k референсов, их схожести (по убыванию) и
+        максимальная схожесть для каждого запроса.
+    """
+    if not assume_normalized:
+        x_vec = normalize(x_vec)
+        reference_vec = normalize(reference_vec)
+
+    n_queries = x_vec.shape[0]
+    n_references = reference_vec.shape[0]
+    k = min(top_k, n_references)
+
+    top_indices = np.empty((n_queries, k), dtype=np.intp)
+    top_scores = np.empty((n_queries, k), dtype=np.float64)
+    max_scores = np.full(n_queries, -np.inf)
+
+    reference_t = csr_matrix(reference_vec).T.tocsc()
+    block_size = rows_per_block(n_references, max_block_bytes)
+
+    for start in range(0, n_queries, block_size):
+        end = min(start + block_size, n_queries)
+        scores = (x_vec[start:end] @ reference_t).toarray()
+        indices, values = top_k_from_dense(scores, k)
+        top_indices[start:end] = indices
+        top_scores[start:end] = values
+        if k > 0:
+            max_scores[start:end] = values[:, 0]
+
+    return top_indices, top_scores, max_scores
+
+
+def squared_norms(vec: csr_matrix) -> np.ndarray:
+    """Квадраты L2-норм строк разреженной матрицы."""
+    vec = csr_matrix(vec)
+    return np.asarray(vec.multiply(vec).sum(axis=1), dtype=np.float64).ravel()
+
+
+def l1_norms(vec: csr_matrix) -> np.ndarray:
+    """L1-нормы строк разреженной матрицы."""
+    return np.asarray(abs(csr_matrix(vec)).sum(axis=1), dtype=np.float64).ravel()
+
+
+def _smallest_k(
+    block_distances: Callable[[int, int], np.ndarray],
+    n_queries: int,
+    n_references: int,
+    top_k: int,
+    max_block_bytes: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Выбирает top_k наименьших расстояний, вычисляя плотную матрицу
+    расстояний блоками запросов [start, end) в пределах max_block_bytes.
+    """
+    k = min(top_k, n_references)
+    top_indices = np.empty((n_queries, k), dtype=np.intp)
+    top_distances = np.empty((n_queries, k), dtype=np.float64)
+    min_distances = np.full(n_queries, np.inf)
+
+    block_size = rows_per_block(n_references, max_block_bytes)
+    for start in range(0, n_queries, block_size):
+        end = min(start + block_size, n_queries)
+        indices, values = top_k_from_dense(-block_distances(start, end), k)
+        top_indices[start:end] = indices
+        top_distances[start:end] = -values
+        if k > 0:
+            min_distances[start:end] = -values[:, 0]
+
+    return top_indices, top_distances, min_distances
+
+
+def euclidean_top_k(
+    x_vec: csr_matrix,
+    reference_vec: csr_matrix,
+    top_k: int = 5,
+    max_block_bytes: int = DEFAULT_BLOCK_BYTES,
+    reference_norms: Optional[np.ndarray] = None,
+    reference_t: Optional[csr_matrix] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Находит top_k ближайших по евклидову расстоянию референсов для
+    каждого запроса.
+
+    Квадрат расстояния вычисляется как ‖x‖² + ‖y‖² − 2x·y: нужны только
+    разреженное скалярное произведение и заранее вычисленные квадраты
+    норм референсов. Корень извлекается только из отобранных расстояний.
+
+    Parameters
+    ----------
+    x_vec : csr_matrix
+        Векторизованные запросы.
+    reference_vec : csr_matrix
+        Векторизованные референсные названия школ.
+    top_k : int, optional
+        Количество совпадений на запрос (default is 5).
+    max_block_bytes : int, optional
+        Бюджет памяти на блок расстояний в байтах
+        (default is DEFAULT_BLOCK_BYTES).
+    reference_norms : Optional[np.ndarray], optional
+        Квадраты L2-норм референсов (см. squared_norms)
+        (default is None - вычисляются при вызове).
+    reference_t : Optional[csr_matrix], optional
+        Транспонированная матрица референсов (термин -> референсы),
+        например списки вхождений InvertedIndex (default is None -
+        вычисляется при вызове).
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray, np.ndarray]
+        Индексы top_k референсов, расстояния до них (по возрастанию) и
+        минимальное расстояние для каждого запроса (inf, если
+        референсов нет).
+    """
+    x_vec = csr_matrix(x_vec)
+    if reference_norms is None:
+        reference_norms = squared_norms(reference_vec)
+    if reference_t is None:
+        reference_t = csr_matrix(reference_vec).T.tocsr()
+    x_norms = squared_norms(x_vec)
+
+    def block_distances(start: int, end: int) -> np.ndarray:
+        products = (x_vec[start:end] @ reference_t).toarray()
+        distances = x_norms[start:end, None] + reference_norms[None, :]
+        distances -= 2 * products
+        # Ошибки округления не должны давать отрицательных квадратов
+        return np.maximum(distances, 0, out=distances)
+
+    top_indices, top_distances, min_distances = _smallest_k(
+        block_distances,
+        x_vec.shape[0],
+        reference_norms.shape[0],
+        top_k,
+        max_block_bytes,
+    )
+    return top_indices, np.sqrt(top_distances), np.sqrt(min_distances)
+
+
+def manhattan_top_k(
+    x_vec: csr_matrix,
+    reference_vec: csr_matrix,
+    top_k: int = 5,
+    max_block_bytes: int = DEFAULT_BLOCK_BYTES,
+    reference_norms: Optional[np.ndarray] = None,
+    reference_t: Optional[csr_matrix] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Находит top_k ближайших по манхэттенскому расстоянию референсов для
+    каждого запроса.
+
+    Вне пересечения ненулевых элементов запроса и референса расстояние
+    складывается из их L1-норм, поэтому ‖x − y‖₁ = ‖x‖₁ + ‖y‖₁ −
+    Σ (|xᵢ| + |yᵢ| − |xᵢ − yᵢ|), где сумма берется только по общим
+    терминам. Поправки собираются по спискам вхождений терминов
+    запросов, плотная разность векторов не строится.
+
+    Parameters
+    ----------
+    x_vec : csr_matrix
+        Векторизованные запросы.
+    reference_vec : csr_matrix
+        Векторизованные референсные названия школ.
+    top_k : int, optional
+        Количество совпадений на запрос (default is 5).
+    max_block_bytes : int, optional
+        Бюджет памяти на блок расстояний в байтах
+        (default is DEFAULT_BLOCK_BYTES).
+    reference_norms : Optional[np.ndarray], optional
+        L1-нормы референсов (см. l1_norms)
+        (default is None - вычисляются при вызове).
+    reference_t : Optional[csr_matrix], optional
+        Транспонированная матрица референсов (термин -> референсы)
+        с упорядоченными индексами, например списки вхождений
+        InvertedIndex (default is None - вычисляется при вызове).
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray, np.ndarray]
+        Индексы top_k референсов, расстояния до них (по возрастанию) и
+        минимальное расстояние для каждого запроса (inf, если
+        референсов нет).
+    """
+    x_vec = csr_matrix(x_vec, copy=True)
+    x_vec.sum_duplicates()
+    if reference_norms is None:
+        reference_norms = l1_norms(reference_vec)
+    if reference_t is None:
+        reference_t = csr_matrix(reference_vec).T.tocsr()
+    x_norms = l1_norms(x_vec)
+    n_references = reference_norms.shape[0]
+
+    def block_distances(start: int, end: int) -> np.ndarray:
+        block = x_vec[start:end]
+        n_rows = block.shape[0]
+        query_rows = np.repeat(np.arange(n_rows), np.diff(block.indptr))
+
+        # Списки вхождений всех терминов блока одним массивом
+        starts = reference_t.indptr[block.indices]
+        lengths = reference_t.indptr[block.indices + 1] - starts
+        positions = np.arange(lengths.sum()) + np.repeat(
+            starts - (np.cumsum(lengths) - lengths), lengths
+        )
+        reference_rows = reference_t.indices[positions]
+        y = reference_t.data[positions]
+        x = np.repeat(block.data, lengths)
+
+        overlap = np.bincount(
+            np.repeat(query_rows, lengths) * n_references + reference_rows,
+            weights=np.abs(x) + np.abs(y) - np.abs(x - y),
+            minlength=n_rows * n_references,
+        ).reshape(n_rows, n_references)
+        distances = x_norms[start:end, None] + reference_norms[None, :]
+        distances -= overlap
+        return np.maximum(distances, 0, out=distances)
+
+    return _smallest_k(
+        block_distances, x_vec.shape[0], n_references, top_k, max_block_bytes
+    )
@@ -0,0 +1,211 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, Tuple
+
+from sqlalchemy import create_engine
+
+from app.core.logger import setup_logger
+from app.core.metrics import metrics
+
+# Инициализируем логгер для school_matcher
+logger = setup_logger("school_matcher", "app/logs/school_matcher/logs.log")
+
+# Количество процессов-обработчиков (0 - поиск в потоках основного процесса;
+# по умолчанию - по процессу на ядро, но не больше 4: каждый процесс
+# загружает собственный набор ресурсов), максимальное количество ожидающих
+# запросов и время ожидания в секундах
+MATCHER_WORKERS = int(
+    os.getenv("SCHOOL_MATCHER_WORKERS", min(os.cpu_count() or 1, 4))
+)
+MATCHER_MAX_PENDING = int(os.getenv("SCHOOL_MATCHER_MAX_PENDING", 64))
+MATCHER_TIMEOUT = float(os.getenv("SCHOOL_MATCHER_TIMEOUT", 30))
+
+# SchoolMatcher процесса-обработчика
+_worker_matcher = None
+
+
+class MatcherOverloadedError(RuntimeError):
+    """Очередь запросов к обработчикам заполнена."""
+
+
+def create_school_matcher(database_url: str):
+    """
+    Создает SchoolMatcher в процессе-обработчике.
+
+    Parameters
+    ----------
+    database_url : str
+        Строка подключения к базе данных.
+
+    Returns
+    -------
+    SchoolMatcher
+        Объект поиска школ с загруженными ресурсами.
+    """
+    from app.services.school_matcher.school_matcher import SchoolMatcher
+
+    # Кэш результатов процесса не сохраняется и не прогревается из файла:
+    # в каждом процессе он свой
+    return SchoolMatcher(create_engine(database_url), persist_cache=False)
+
+
+def _init_worker(factory: Callable[..., Any], factory_args: Tuple) -> None:
+    global _worker_matcher
+    _worker_matcher = factory(*factory_args)
+
+
+def _call_worker(method: str, args: Tuple) -> Tuple[Any, dict]:
+    # Метрики, накопленные процессом, передаются в основной процесс
+    # вместе с результатом
+    result = getattr(_worker_matcher, method)(*args)
+    return result, metrics.drain()
+
+
+class MatcherPool:
+    """
+    Пул обработчиков поиска школ с асинхронным интерфейсом.
+
+    Предобработка и поиск выполняются под GIL, поэтому в потоках одного
+    процесса запросы фактически обрабатываются по одному. При
+    n_workers > 0 запросы выполняются в отдельных процессах, каждый из
+    которых загружает собственный SchoolMatcher. При n_workers = 0
+    методы matcher вызываются в потоках основного процесса.
+
+    Количество одновременно ожидающих запросов ограничено max_pending:
+    сверх него запрос сразу отклоняется с MatcherOverloadedError. Запрос,
+    не выполненный за timeout секунд, завершается с TimeoutError; уже
+    начатая обработка в процессе при этом не прерывается. Если процесс
+    завершился аварийно, запросы к пулу завершаются с BrokenProcessPool,
+    а пул процессов создается заново при следующем запросе.
+
+    Parameters
+    ----------
+    matcher : Optional[Any], optional
+        Объект поиска для режима без процессов (default is None).
+    n_workers : int, optional
+        Количество процессов (default is MATCHER_WORKERS).
+    max_pending : int, optional
+        Максимальное количество ожидающих запросов
+        (default is MATCHER_MAX_PENDING).
+    timeout : float, optional
+        Время ожидания результата в секундах (default is MATCHER_TIMEOUT).
+    factory : Callable[..., Any], optional
+        Функция создания объекта поиска в процессе
+        (default is create_school_matcher).
+    factory_args : Tuple, optional
+        Аргументы factory (default is ()).
+    """
+
+    def __init__(
+        self,
+        matcher: Optional[Any] = None,
+        n_workers: int = MATCHER_WORKERS,
+        max_pending: int = MATCHER_MAX_PENDING,
+        timeout: float = MATCHER_TIMEOUT,
+        factory: Callable[..., Any] = create_school_matcher,
+        factory_args: Tuple = (),
+    ):
+        if n_workers <= 0 and matcher is None:
+            raise ValueError("matcher is required when n_workers is 0")
+        self.matcher = matcher
+        self.n_workers = n_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.factory = factory
+        self.factory_args = factory_args
+        self.pending = 0
+        self.executor: Optional[Executor] = None
+
+    def _create_executor(self) -> Executor:
+        if self.n_workers <= 0:
+            return ThreadPoolExecutor(thread_name_prefix="matcher")
+        logger.info(f"Start {self.n_workers} matcher worker processes")
+        return ProcessPoolExecutor(
+            max_workers=self.n_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.factory, self.factory_args),
+        )
+
+    def start(self) -> None:
+        """Запускает обработчики, если они еще не запущены."""
+        if self.executor is None:
+            self.executor = self._create_executor()
+
+    async def call(self, method: str, *args: Any) -> Any:
+        """
+        Вызывает метод объекта поиска в обработчике.
+
+        Parameters
+        ----------
+        method : str
+            Имя метода SchoolMatcher (например, "find_school_match").
+        *args : Any
+            Аргументы метода.
+
+        Returns
+        -------
+        Any
+            Результат метода.
+
+        Raises
+        ------
+        MatcherOverloadedError
+            Если очередь запросов заполнена.
+        TimeoutError
+            Если результат не получен за timeout секунд.
+        BrokenProcessPool
+            Если процесс-обработчик завершился аварийно.
+        """
+        if self.pending >= self.max_pending:
+            raise MatcherOverloadedError(
+                f"Matcher queue is full: {self.pending} pending requests"
+            )
+
+        self.start()
+        executor = self.executor
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        try:
+            if self.n_workers <= 0:
+                future = loop.run_in_executor(
+                    executor, getattr(self.matcher, method), *args
+                )
+                return await asyncio.wait_for(future, self.timeout)
+
+            future = loop.run_in_executor(executor, _call_worker, method, args)
+            result, state = await asyncio.wait_for(future, self.timeout)
+            metrics.merge(state)
+            return result
+        except BrokenProcessPool:
+            self._discard_broken(executor)
+            raise
+        finally:
+            self.pending -= 1
+
+    def _discard_broken(self, executor: Executor) -> None:
+        # Пул с аварийно завершившимся процессом не принимает задачи;
+        # следующий запрос создаст новый (см. start)
+        if self.executor is executor:
+            logger.error("Matcher worker process died, worker pool is recreated")
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def restart(self) -> None:
+        """
+        Перезапускает процессы, чтобы они загрузили обновленные ресурсы.
+        Начатые запросы завершаются в прежних процессах.
+        """
+        if self.n_workers <= 0 or self.executor is None:
+            return
+        old_executor, self.executor = self.executor, self._create_executor()
+        old_executor.shutdown(wait=False)
+
+    def shutdown(self) -> None:
+        """Останавливает обработчики."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,308 @@
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+from benchmarks.synthetic import SyntheticData
+
+# Способы поиска, для которых замеряется find_matches
+SEARCH_MODES = ("exact", "inverted", "taat", "lsh")
+
+
+class Result(NamedTuple):
+    """
+    Результат замера.
+
+    Attributes
+    ----------
+    case : str
+        Название замера.
+    size : int
+        Размер синтетических данных (количество референсных школ).
+    n_ops : int
+        Количество операций (названий, запросов или сборок).
+    total_seconds : float
+        Общее время в секундах.
+    p50_ms : Optional[float]
+        Медиана времени одной операции в миллисекундах (None, если
+        операции выполняются одним вызовом).
+    p95_ms : Optional[float]
+        95-й процентиль времени одной операции в миллисекундах.
+    details : Dict[str, float]
+        Время этапов в секундах.
+    """
+
+    case: str
+    size: int
+    n_ops: int
+    total_seconds: float
+    p50_ms: Optional[float] = None
+    p95_ms: Optional[float] = None
+    details: Dict[str, float] = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Возвращает результат с временем одной операции и пропускной способностью."""
+        result = self._asdict()
+        result["mean_ms"] = self.total_seconds / max(self.n_ops, 1) * 1000
+        result["ops_per_second"] = (
+            self.n_ops / self.total_seconds if self.total_seconds else None
+        )
+        return result
+
+
+def measure_calls(
+    case: str, size: int, func: Callable[[Any], Any], items: Iterable[Any]
+) -> Result:
+    """
+    Замеряет время вызова func для каждого элемента items.
+
+    Parameters
+    ----------
+    case : str
+        Название замера.
+    size : int
+        Размер синтетических данных.
+    func : Callable[[Any], Any]
+        Замеряемая функция одного аргумента.
+    items : Iterable[Any]
+        Аргументы.
+
+    Returns
+    -------
+    Result
+        Общее время, медиана и 95-й процентиль времени вызова.
+    """
+    latencies = []
+    clock = time.perf_counter
+    for item in items:
+        start = clock()
+        func(item)
+        latencies.append(clock() - start)
+    latencies_ms = np.array(latencies) * 1000
+    return Result(
+        case,
+        size,
+        len(latencies),
+        float(latencies_ms.sum() / 1000),
+        float(np.percentile(latencies_ms, 50)) if latencies else None,
+        float(np.percentile(latencies_ms, 95)) if latencies else None,
+    )
+
+
+class BenchmarkData:
+    """
+    Синтетические данные одного размера и созданные по ним ресурсы.
+
+    Parameters
+    ----------
+    size : int
+        Количество референсных школ и вариантов написания.
+    n_queries : int
+        Наибольшее количество запросов.
+    resources_dir : str
+        Директория ресурсов, создаваемых по синтетическим данным.
+    seed : int, optional
+        Начальное значение генератора (default is 0).
+    """
+
+    def __init__(self, size: int, n_queries: int, resources_dir: str, seed: int = 0):
+        self.size = size
+        self.resources_dir = resources_dir
+        generator = SyntheticData(seed)
+        self.schools = generator.schools(size)
+        self.similar_schools = generator.similar_schools(self.schools, size)
+        self.queries = generator.queries(self.schools, min(size, n_queries))
+        self.build_timings: Optional[Dict[str, float]] = None
+        self._matcher = None
+
+    def build(self) -> Dict[str, float]:
+        """Создает ресурсы по синтетическим данным (один раз)."""
+        if self.build_timings is None:
+            from app.services.school_matcher.school_matcher import SchoolMatcher
+
+            matcher = SchoolMatcher(None, load=False, resources_dir=self.resources_dir)
+            timings: Dict[str, float] = {}
+            matcher.process_resource(
+                self.schools, self.similar_schools, timings, n_workers=1
+            )
+            self.build_timings = timings
+        return self.build_timings
+
+    @property
+    def matcher(self):
+        """SchoolMatcher на ресурсах из синтетических данных."""
+        if self._matcher is None:
+            from app.services.school_matcher.school_matcher import SchoolMatcher
+
+            self.build()
+            self._matcher = SchoolMatcher(None, resources_dir=self.resources_dir)
+        return self._matcher
+
+
+def bench_simple_preprocess_text(data: BenchmarkData) -> List[Result]:
+    from app.services.school_matcher.utils.preprocess_functions import (
+        simple_preprocess_text,
+    )
+
+    names = data.similar_schools.name.tolist()
+    return [
+        measure_calls("simple_preprocess_text", data.size, simple_preprocess_text, names)
+    ]
+
+
+def bench_abbr_preprocess_text(data: BenchmarkData) -> List[Result]:
+    from app.services.school_matcher.utils.load_functions import load_resources
+    from app.services.school_matcher.utils.preprocess_functions import (
+        abbr_preprocess_text,
+    )
+
+    abbreviations_dict = load_resources(
+        "abbreviations_dict", "joblib", "app/services/school_matcher/original_resources"
+    )
+    names = data.similar_schools.name.tolist()
+    return [
+        measure_calls(
+            "abbr_preprocess_text",
+            data.size,
+            lambda name: abbr_preprocess_text(
+                name, abbreviations_dict, False, False, False, False
+            ),
+            names,
+        )
+    ]
+
+
+def bench_lemmatize_text(data: BenchmarkData) -> List[Result]:
+    from app.services.school_matcher.utils.preprocess_functions import (
+        lemmatize_text,
+        lemmatizer,
+        simple_preprocess_text,
+    )
+
+    names = [simple_preprocess_text(name) for name in data.similar_schools.name]
+    # Замер с пустым кэшем лемм, как при создании ресурсов
+    lemmatizer.cache_clear()
+    stop_words: frozenset = frozenset()
+    result = measure_calls(
+        "lemmatize_text", data.size, lambda name: lemmatize_text(name, stop_words), names
+    )
+    hit_rate = lemmatizer.cache_info()["hit_rate"]
+    return [result._replace(details={"lemma cache hit rate": hit_rate})]
+
+
+def bench_process_resource(data: BenchmarkData) -> List[Result]:
+    start = time.perf_counter()
+    timings = data.build()
+    total = time.perf_counter() - start
+    return [Result("process_resource", data.size, 1, total, details=dict(timings))]
+
+
+def bench_find_matches(data: BenchmarkData) -> List[Result]:
+    from app.services.school_matcher.school_matcher import (
+        BLOCK_MEMORY_MB,
+        find_matches,
+    )
+
+    snapshot = data.matcher.snapshot
+    processed = snapshot.pipeline.process_many(data.queries)
+    x_vec = snapshot.vectorizer.transform([name for name, _ in processed])
+    x_region = np.array([region for _, region in processed], dtype=object)
+
+    # Косинусная схожесть во всех способах поиска и точный поиск по
+    # расстояниям
+    runs = [("cosine", search_mode) for search_mode in SEARCH_MODES]
+    runs += [("euclidean", "exact"), ("manhattan", "exact")]
+
+    results = []
+    for similarity_method, search_mode in runs:
+        start = time.perf_counter()
+        find_matches(
+            x_vec,
+            x_region,
+            snapshot.reference_id,
+            snapshot.reference_vec,
+            snapshot.reference_region,
+            top_k=5,
+            threshold=0.00000001,
+            filter_by_region=True,
+            empty_region="all",
+            similarity_method=similarity_method,
+            region_index=snapshot.region_index,
+            max_block_bytes=BLOCK_MEMORY_MB * 1024 * 1024,
+            search_mode=search_mode,
+            ann_index=snapshot.ann_index,
+        )
+        total = time.perf_counter() - start
+        name = search_mode if similarity_method == "cosine" else similarity_method
+        results.append(
+            Result(f"find_matches[{name}]", data.size, len(data.queries), total)
+        )
+    return results
+
+
+def bench_find_school_match(data: BenchmarkData) -> List[Result]:
+    matcher = data.matcher
+    # Запросы выполняются без результатов в кэше
+    matcher.raw_cache.bump_version()
+    matcher.normalized_cache.bump_version()
+    return [
+        measure_calls(
+            "SchoolMatcher.find_school_match",
+            data.size,
+            matcher.find_school_match,
+            data.queries,
+        )
+    ]
+
+
+def bench_http(data: BenchmarkData) -> List[Result]:
+    from fastapi.testclient import TestClient
+
+    data.build()
+    # Приложение работает без базы данных и без авторизации
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    disable_auth = os.environ.get("DISABLE_AUTH")
+    os.environ["DISABLE_AUTH"] = "true"
+
+    from app.api.school_matching import endpoints
+    from app.core.startup import startup_report
+    from app.main import app
+
+    try:
+        with TestClient(app) as client:
+            deadline = time.monotonic() + 300
+            while not startup_report.ready and time.monotonic() < deadline:
+                time.sleep(0.05)
+            matcher = endpoints.school_marcher
+            matcher.resources_dir = data.resources_dir
+            matcher.load_resources()
+
+            def request(name: str) -> None:
+                response = client.post(
+                    "/data/get_school_matches/", json={"school_name": name}
+                )
+                response.raise_for_status()
+
+            return [
+                measure_calls(
+                    "POST /data/get_school_matches/", data.size, request, data.queries
+                )
+            ]
+    finally:
+        if disable_auth is None:
+            os.environ.pop("DISABLE_AUTH")
+        else:
+            os.environ["DISABLE_AUTH"] = disable_auth
+
+
+# Замеры в порядке выполнения
+CASES: Dict[str, Callable[[BenchmarkData], List[Result]]] = {
+    "simple_preprocess_text": bench_simple_preprocess_text,
+    "abbr_preprocess_text": bench_abbr_preprocess_text,
+    "lemmatize_text": bench_lemmatize_text,
+    "process_resource": bench_process_resource,
+    "find_matches": bench_find_matches,
+    "find_school_match": bench_find_school_match,
+    "http": bench_http,
+}
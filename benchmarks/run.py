@@ -0,0 +1,260 @@
+"""
+Замеры производительности на синтетических данных.
+
+Запуск из корня репозитория (без сети и без базы данных):
+
+    python -m benchmarks --sizes 1k,10k --output results.json
+    python -m benchmarks --sizes 1k,10k --baseline benchmarks/baseline.json
+
+Размеры 100k и 1m задаются явно: создание ресурсов на них занимает
+минуты. Базовые результаты зависят от машины, поэтому сравнивать
+имеет смысл запуски на одной и той же машине; при изменении машины
+базовые результаты перезаписываются флагом --save-baseline.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.cases import CASES, BenchmarkData
+
+DEFAULT_SIZES = "1k,10k"
+DEFAULT_BASELINE = "benchmarks/baseline.json"
+
+
+def parse_size(value: str) -> int:
+    """
+    Разбирает размер данных вида "1000", "10k" или "1m".
+
+    Parameters
+    ----------
+    value : str
+        Размер.
+
+    Returns
+    -------
+    int
+        Количество записей.
+    """
+    value = value.strip().lower()
+    multipliers = {"k": 1_000, "m": 1_000_000}
+    if value and value[-1] in multipliers:
+        return int(float(value[:-1]) * multipliers[value[-1]])
+    return int(value)
+
+
+def collect_metadata(seed: int) -> Dict[str, Any]:
+    """Собирает сведения о машине и версии кода для результатов."""
+    from app.services.school_matcher.utils.preprocess_functions import lemmatizer
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "seed": seed,
+        "tokenizer": lemmatizer.tokenizer,
+    }
+
+
+def run_benchmarks(
+    sizes: List[int],
+    cases: Optional[List[str]] = None,
+    n_queries: int = 1000,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Выполняет замеры для каждого размера данных.
+
+    Parameters
+    ----------
+    sizes : List[int]
+        Размеры синтетических данных.
+    cases : Optional[List[str]], optional
+        Названия замеров из CASES (default is None - все замеры).
+    n_queries : int, optional
+        Наибольшее количество запросов для поиска (default is 1000).
+    seed : int, optional
+        Начальное значение генератора данных (default is 0).
+
+    Returns
+    -------
+    Dict[str, Any]
+        Сведения о запуске ("metadata") и результаты замеров ("results").
+    """
+    from app.services.school_matcher.utils.preprocess_functions import (
+        ensure_nltk_data,
+        lemmatizer,
+    )
+
+    cases = list(CASES) if cases is None else cases
+    unknown = set(cases) - CASES.keys()
+    if unknown:
+        raise ValueError(f"Unknown benchmark cases: {sorted(unknown)}")
+
+    # Без данных punkt названия токенизируются регулярным выражением
+    if not ensure_nltk_data(download=False):
+        lemmatizer.tokenizer = "regex"
+
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as resources_dir:
+            data = BenchmarkData(size, n_queries, resources_dir, seed)
+            for name in CASES:
+                if name in cases:
+                    for result in CASES[name](data):
+                        print(format_result(result.to_dict()), file=sys.stderr)
+                        results.append(result.to_dict())
+    return {"metadata": collect_metadata(seed), "results": results}
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    """Форматирует результат замера одной строкой."""
+    line = (
+        f"{result['case']:<34} {result['size']:>8} "
+        f"{result['mean_ms']:>10.4f} ms/op"
+    )
+    if result["p95_ms"] is not None:
+        line += f"  p50 {result['p50_ms']:.4f} ms  p95 {result['p95_ms']:.4f} ms"
+    return line
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.2
+) -> List[Dict[str, Any]]:
+    """
+    Сравнивает время одной операции с базовыми результатами.
+
+    Parameters
+    ----------
+    results : Dict[str, Any]
+        Результаты запуска (см. run_benchmarks).
+    baseline : Dict[str, Any]
+        Базовые результаты в том же формате.
+    tolerance : float, optional
+        Допустимое относительное замедление (default is 0.2).
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+        Для каждого замера, который есть в базовых результатах: название,
+        размер, время одной операции до и после, отношение времени и
+        признак замедления сверх допустимого ("regression").
+    """
+    base = {
+        (result["case"], result["size"]): result["mean_ms"]
+        for result in baseline["results"]
+    }
+    comparison = []
+    for result in results["results"]:
+        key = (result["case"], result["size"])
+        if key not in base:
+            continue
+        ratio = result["mean_ms"] / base[key] if base[key] else float("inf")
+        comparison.append(
+            {
+                "case": result["case"],
+                "size": result["size"],
+                "baseline_ms": base[key],
+                "mean_ms": result["mean_ms"],
+                "ratio": ratio,
+                "regression": ratio > 1 + tolerance,
+            }
+        )
+    return comparison
+
+
+def format_comparison(comparison: List[Dict[str, Any]]) -> str:
+    """Форматирует сравнение с базовыми результатами таблицей."""
+    lines = [f"{'case':<34} {'size':>8} {'baseline':>12} {'current':>12} {'ratio':>7}"]
+    for row in comparison:
+        lines.append(
+            f"{row['case']:<34} {row['size']:>8} {row['baseline_ms']:>12.4f} "
+            f"{row['mean_ms']:>12.4f} {row['ratio']:>7.2f}"
+            + ("  REGRESSION" if row["regression"] else "")
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Замеры производительности на синтетических данных",
+    )
+    parser.add_argument(
+        "--sizes",
+        default=DEFAULT_SIZES,
+        help="Размеры данных через запятую, например 1k,10k,100k,1m",
+    )
+    parser.add_argument(
+        "--cases",
+        default=",".join(CASES),
+        help="Замеры через запятую",
+    )
+    parser.add_argument(
+        "--queries", type=int, default=1000, help="Наибольшее количество запросов"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Файл для результатов в формате JSON")
+    parser.add_argument(
+        "--baseline", help="Файл базовых результатов для сравнения"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Допустимое относительное замедление",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help=f"Записать результаты как базовые ({DEFAULT_BASELINE} "
+        "или файл из --baseline)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    results = run_benchmarks(
+        [parse_size(size) for size in args.sizes.split(",")],
+        [case.strip() for case in args.cases.split(",")],
+        args.queries,
+        args.seed,
+    )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+    else:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+
+    if args.save_baseline:
+        with open(args.baseline or DEFAULT_BASELINE, "w", encoding="utf-8") as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+        return 0
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        comparison = compare(results, baseline, args.tolerance)
+        print(format_comparison(comparison), file=sys.stderr)
+        if any(row["regression"] for row in comparison):
+            return 1
+    return 0
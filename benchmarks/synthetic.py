@@ -0,0 +1,255 @@
+import random
+from typing import Dict, List, Optional, Tuple
+
+import joblib
+import pandas as pd
+
+RESOURCES_DIR = "app/services/school_matcher/original_resources"
+
+# Части названий спортивных школ
+KINDS = [
+    "спортивная школа",
+    "спортивная школа олимпийского резерва",
+    "детско юношеская спортивная школа",
+    "школа фигурного катания",
+    "клуб фигурного катания",
+    "центр зимних видов спорта",
+    "академия фигурного катания на коньках",
+    "комплексная спортивная школа",
+    "спортивный клуб",
+    "ледовый дворец",
+]
+SPORTS = [
+    "",
+    "по фигурному катанию на коньках",
+    "по хоккею",
+    "по конькобежному спорту",
+    "ледовых видов спорта",
+    "зимних видов спорта",
+    "синхронного катания",
+]
+ADJECTIVES = [
+    "Звездный",
+    "Северный",
+    "Снежный",
+    "Ледовый",
+    "Золотой",
+    "Серебряный",
+    "Полярный",
+    "Юный",
+    "Красный",
+    "Белый",
+    "Хрустальный",
+    "Быстрый",
+    "Зимний",
+    "Олимпийский",
+    "Уральский",
+    "Сибирский",
+]
+NOUNS = [
+    "лед",
+    "конек",
+    "вихрь",
+    "олимп",
+    "кристалл",
+    "айсберг",
+    "метеор",
+    "факел",
+    "сокол",
+    "барс",
+    "старт",
+    "триумф",
+    "лидер",
+    "рекорд",
+    "союз",
+    "маяк",
+]
+PERSONS = [
+    "Тарасовой",
+    "Родниной",
+    "Плющенко",
+    "Мишина",
+    "Жук",
+    "Бестемьяновой",
+    "Белоусова",
+    "Гордеевой",
+    "Москвиной",
+    "Протопопова",
+]
+
+
+class SyntheticData:
+    """
+    Генератор синтетических данных для замеров производительности:
+    референсные школы (таблица schools), варианты написания их названий
+    (таблица similar_schools) и запросы.
+
+    Названия составляются из типа школы, вида спорта, собственного
+    названия, номера и имени. Регионы и города берутся из словаря
+    регионов, сокращения и ОПФ - из ресурсов приложения, поэтому
+    генератор работает без сети. Варианты написания получаются из
+    названий добавлением ОПФ, заменой слов сокращениями, другой записью
+    номера, кавычками, городом или регионом и сменой регистра.
+
+    Parameters
+    ----------
+    seed : int, optional
+        Начальное значение генератора случайных чисел (default is 0).
+    resources_dir : str, optional
+        Директория исходных ресурсов (default is RESOURCES_DIR).
+    """
+
+    def __init__(self, seed: int = 0, resources_dir: str = RESOURCES_DIR):
+        self.seed = seed
+        self.region_dict: Dict[str, List[str]] = joblib.load(
+            f"{resources_dir}/region_dict.joblib"
+        )
+        abbreviations = joblib.load(f"{resources_dir}/abbreviations_dict.joblib")
+        blacklist_opf = joblib.load(f"{resources_dir}/blacklist_opf.joblib")
+        self.regions = list(self.region_dict)
+        self.opf = list(blacklist_opf)
+
+        # Первое слово расшифровки -> (слова расшифровки, сокращение),
+        # сначала более длинные расшифровки
+        expansions = sorted(
+            (
+                (tuple(value.split()), key)
+                for key, value in abbreviations.items()
+                if isinstance(value, str) and " " in value
+            ),
+            key=lambda item: -len(item[0]),
+        )
+        self.abbreviations: Dict[str, List[Tuple[Tuple[str, ...], str]]] = {}
+        for words, key in expansions:
+            self.abbreviations.setdefault(words[0], []).append((words, key))
+        self.opf_abbreviations = [
+            key for words, key in expansions if " ".join(words) in set(blacklist_opf)
+        ]
+
+    def school_name(self, rng: random.Random) -> str:
+        """Составляет название школы."""
+        parts = [rng.choice(KINDS), rng.choice(SPORTS)]
+        proper = f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+        parts.append(f"«{proper}»" if rng.random() < 0.5 else proper)
+        if rng.random() < 0.4:
+            parts.append(f"№{rng.randint(1, 150)}")
+        if rng.random() < 0.2:
+            parts.append(f"имени {rng.choice(PERSONS)}")
+        name = " ".join(part for part in parts if part)
+        return name[0].upper() + name[1:]
+
+    def schools(self, n: int) -> pd.DataFrame:
+        """
+        Генерирует референсные школы.
+
+        Parameters
+        ----------
+        n : int
+            Количество школ.
+
+        Returns
+        -------
+        pd.DataFrame
+            Школы с полями id, name и region.
+        """
+        rng = random.Random(self.seed)
+        names, regions = [], []
+        for _ in range(n):
+            names.append(self.school_name(rng))
+            region = rng.choice(self.regions)
+            # Часть регионов записана городом региона
+            if rng.random() < 0.1 and self.region_dict[region]:
+                region = rng.choice(self.region_dict[region])
+            regions.append(region.title() if rng.random() < 0.5 else region)
+        return pd.DataFrame({"id": range(1, n + 1), "name": names, "region": regions})
+
+    def variant(self, name: str, region: str, rng: random.Random) -> str:
+        """Составляет вариант написания названия школы."""
+        # Замена расшифровок сокращениями
+        words = name.split()
+        lower = [word.lower() for word in words]
+        parts, i = [], 0
+        while i < len(words):
+            for expansion, key in self.abbreviations.get(lower[i], ()):
+                end = i + len(expansion)
+                if tuple(lower[i:end]) == expansion:
+                    replaced = rng.random() < 0.5
+                    parts.append(key.upper() if replaced else " ".join(words[i:end]))
+                    i = end
+                    break
+            else:
+                parts.append(words[i])
+                i += 1
+        text = " ".join(parts)
+        if rng.random() < 0.5:
+            opf = (
+                rng.choice(self.opf_abbreviations).upper()
+                if self.opf_abbreviations and rng.random() < 0.5
+                else rng.choice(self.opf)
+            )
+            text = f"{opf} {text}"
+        if "№" in text:
+            text = text.replace("№", rng.choice(["№ ", "N", "", "No "]))
+        if rng.random() < 0.3:
+            text = text.replace("«", '"').replace("»", '"')
+        if rng.random() < 0.5:
+            cities = self.region_dict.get(region.lower())
+            text = (
+                f"{text} г. {rng.choice(cities).title()}"
+                if cities and rng.random() < 0.5
+                else f"{text} {region}"
+            )
+        if rng.random() < 0.2:
+            text = text.upper()
+        return text
+
+    def similar_schools(
+        self, schools: pd.DataFrame, n: int, seed: Optional[int] = None
+    ) -> pd.DataFrame:
+        """
+        Генерирует варианты написания названий школ.
+
+        Parameters
+        ----------
+        schools : pd.DataFrame
+            Референсные школы (см. schools).
+        n : int
+            Количество вариантов.
+        seed : Optional[int], optional
+            Начальное значение генератора (default is None - seed + 1).
+
+        Returns
+        -------
+        pd.DataFrame
+            Варианты с полями school_id и name.
+        """
+        rng = random.Random(self.seed + 1 if seed is None else seed)
+        rows = rng.choices(range(len(schools)), k=n)
+        ids = schools["id"].to_numpy()
+        names = schools["name"].to_numpy()
+        regions = schools["region"].to_numpy()
+        return pd.DataFrame(
+            {
+                "school_id": ids[rows],
+                "name": [self.variant(names[i], regions[i], rng) for i in rows],
+            }
+        )
+
+    def queries(self, schools: pd.DataFrame, n: int) -> List[str]:
+        """
+        Генерирует запросы: варианты написания, которых нет в
+        similar_schools.
+
+        Parameters
+        ----------
+        schools : pd.DataFrame
+            Референсные школы (см. schools).
+        n : int
+            Количество запросов.
+
+        Returns
+        -------
+        List[str]
+            Названия школ.
+        """
+        return self.similar_schools(schools, n, seed=self.seed + 2).name.tolist()
@@ -4,13 +4,24 @@ import sys
 # Добавляем путь к корню проекта
 sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
 
+import time
+
+# Тесты подменяют методы поиска в основном процессе, поэтому запросы
+# обрабатываются в его потоках, а не в процессах-обработчиках
+os.environ.setdefault("SCHOOL_MATCHER_WORKERS", "0")
+
 import pytest
 from fastapi.testclient import TestClient
 
+from app.core.startup import startup_report
 from app.main import app
 
 
 @pytest.fixture(scope="module")
 def client():
     with TestClient(app) as client:
+        # Ресурсы загружаются в фоне, ждем готовности приложения
+        deadline = time.monotonic() + 120
+        while not startup_report.ready and time.monotonic() < deadline:
+            time.sleep(0.05)
         yield client
@@ -0,0 +1,110 @@
+import json
+
+import joblib
+import numpy as np
+import pytest
+
+from app.services.school_matcher.utils.ann_index import (
+    RandomProjectionIndex,
+    recall_at_k,
+)
+from app.services.school_matcher.utils.load_functions import (
+    load_resources,
+    save_resource,
+)
+from app.services.school_matcher.utils.name_pipeline import NamePipeline
+from app.services.school_matcher.utils.pattern_matcher import MultiPatternMatcher
+from app.services.school_matcher.utils.preprocess_functions import (
+    NumberWordsTable,
+    lemmatizer,
+)
+from app.services.school_matcher.utils.similarity_functions import cosine_top_k
+
+RESOURCES_DIR = "app/services/school_matcher/original_resources"
+
+
+def load(name):
+    return joblib.load(f"{RESOURCES_DIR}/{name}.joblib")
+
+
+@pytest.fixture(scope="module")
+def references():
+    return load("reference_vec"), load("reference_id")
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    # Названия токенизируются без данных punkt
+    monkeypatch.setattr(lemmatizer, "tokenizer", "regex")
+    pipeline = NamePipeline(
+        NumberWordsTable(1000),
+        load("abbreviations_dict"),
+        MultiPatternMatcher(load("region_dict"), load("blacklist_opf")),
+        frozenset(load("stop_words_list")),
+    )
+    with open("tests/data/preprocess_golden.json", encoding="utf-8") as file:
+        texts = [case["text"] for case in json.load(file)["cases"]]
+    names = [name for name, _ in pipeline.process_many(texts)]
+    return load("vectorizer").transform(names)
+
+
+def test_recall_at_k():
+    """Тест полноты на известном примере."""
+    exact = [
+        [(1, 0.9), (2, 0.5), (3, 0.4)],
+        [(4, 0.8), (5, 0.8), (None, 0.0)],
+        [(None, 0.0), (None, 0.0), (None, 0.0)],
+    ]
+    approximate = [
+        [(1, 0.9), (3, 0.4), (None, 0.0)],
+        # Равный по схожести референс на границе top_k засчитывается
+        [(5, 0.8), (6, 0.8), (None, 0.0)],
+        [(None, 0.0), (None, 0.0), (None, 0.0)],
+    ]
+
+    report = recall_at_k(exact, approximate)
+
+    assert report["n_evaluated"] == 2
+    assert report["recall"] == pytest.approx((2 / 3 + 1) / 2)
+    assert report["top1_agreement"] == 1.0
+
+
+def test_default_recall(references, queries):
+    """Тест полноты приближенного индекса с параметрами по умолчанию."""
+    reference_vec, reference_id = references
+    index = RandomProjectionIndex(reference_vec)
+    rows = np.arange(reference_vec.shape[0])
+
+    exact, approximate, candidates = [], [], []
+    for i in range(queries.shape[0]):
+        top_indices, top_scores, _ = cosine_top_k(queries[i], reference_vec, 5)
+        exact.append(list(zip(reference_id[top_indices[0]], top_scores[0])))
+        found, scores = index.search(queries[i], reference_vec, rows, 5, candidates)
+        matches = list(zip(reference_id[found], scores))
+        approximate.append(matches + [(None, 0.0)] * (5 - len(matches)))
+
+    report = recall_at_k(exact, approximate)
+
+    assert report["n_evaluated"] > 100
+    assert report["recall"] >= 0.85
+    assert report["top1_agreement"] >= 0.95
+    # Оценивается меньшая часть референсов
+    assert np.mean(candidates) < 0.4 * reference_vec.shape[0]
+
+
+def test_memory_mapped_index(references, tmp_path):
+    """Тест поиска по индексу, массивы которого отображены в память."""
+    reference_vec, _ = references
+    index = RandomProjectionIndex(reference_vec)
+    save_resource(index, "ann_index", tmp_path)
+
+    mapped = load_resources("ann_index", "joblib", tmp_path, mmap_mode="r")
+
+    assert isinstance(mapped.planes, np.memmap)
+    assert isinstance(mapped.sorted_codes, np.memmap)
+    rows = np.arange(reference_vec.shape[0])
+    for i in range(0, reference_vec.shape[0], 30):
+        found, scores = mapped.search(reference_vec[i], reference_vec, rows)
+        expected, expected_scores = index.search(reference_vec[i], reference_vec, rows)
+        np.testing.assert_array_equal(found, expected)
+        np.testing.assert_allclose(scores, expected_scores)
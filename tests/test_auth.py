@@ -1,7 +1,12 @@
+import asyncio
 import os
+import time
+from datetime import timedelta
 
 import pytest
 
+from app.core import auth
+
 
 @pytest.fixture
 def setup_environment():
@@ -43,3 +48,61 @@ def test_login_fail(client, setup_auth_enabled):
     )
     assert response.status_code == 401
     assert response.json() == {"detail": "Incorrect username or password"}
+
+
+def test_password_is_hashed_once(monkeypatch):
+    """Тест: пароль пользователя хэшируется один раз для всех входов."""
+    calls = []
+
+    def counting_hash(password):
+        calls.append(password)
+        return hashed(password)
+
+    hashed = auth.get_hashed_password
+    monkeypatch.setattr(auth, "get_hashed_password", counting_hash)
+    auth.get_user_password_hash.cache_clear()
+    try:
+        assert auth.authenticate_user(auth.USER_LOGIN, auth.USER_PASSWORD)
+        assert not auth.authenticate_user(auth.USER_LOGIN, "wrong_password")
+        assert auth.authenticate_user(auth.USER_LOGIN, auth.USER_PASSWORD)
+    finally:
+        auth.get_user_password_hash.cache_clear()
+
+    assert len(calls) == 1
+
+
+def test_token_cache(monkeypatch):
+    """Тест кэша проверенных токенов с учетом срока действия токена."""
+    monkeypatch.setenv("DISABLE_AUTH", "false")
+    dependency = auth.AuthDependency(auth.TokenCache(max_size=2))
+    token = auth.create_access_token({"sub": "@admin"}, timedelta(minutes=5))
+
+    assert asyncio.run(dependency(f"Bearer {token}")) == "@admin"
+
+    # Проверенный токен принимается без повторного декодирования
+    def fail_decode(*args, **kwargs):
+        raise AssertionError("jwt.decode should not be called")
+
+    monkeypatch.setattr(auth.jwt, "decode", fail_decode)
+    assert asyncio.run(dependency(f"Bearer {token}")) == "@admin"
+
+    # Истекший токен удаляется из кэша и проверяется заново
+    username, _ = dependency.token_cache.tokens[token]
+    dependency.token_cache.tokens[token] = (username, time.time() - 1)
+    with pytest.raises(AssertionError):
+        asyncio.run(dependency(f"Bearer {token}"))
+    assert token not in dependency.token_cache.tokens
+
+
+def test_token_cache_is_bounded():
+    """Тест вытеснения давно не использованных токенов."""
+    cache = auth.TokenCache(max_size=2)
+    expires_at = time.time() + 60
+
+    cache.put("a", "user", expires_at)
+    cache.put("b", "user", expires_at)
+    assert cache.get("a") == "user"
+    cache.put("c", "user", expires_at)
+
+    assert list(cache.tokens) == ["a", "c"]
+    assert cache.get("b") is None
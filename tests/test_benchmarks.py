@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+from app.services.school_matcher.utils.preprocess_functions import lemmatizer
+from benchmarks.run import compare, main, parse_size
+from benchmarks.synthetic import SyntheticData
+
+
+def test_synthetic_data():
+    """Тест воспроизводимости и формы синтетических данных."""
+    generator = SyntheticData(seed=1)
+
+    schools = generator.schools(50)
+    similar_schools = generator.similar_schools(schools, 200)
+    queries = generator.queries(schools, 20)
+
+    assert list(schools.columns) == ["id", "name", "region"]
+    assert schools["id"].is_unique
+    assert list(similar_schools.columns) == ["school_id", "name"]
+    assert len(similar_schools) == 200
+    assert similar_schools["school_id"].isin(schools["id"]).all()
+    assert len(queries) == 20
+    assert schools.equals(SyntheticData(seed=1).schools(50))
+    assert similar_schools.equals(generator.similar_schools(schools, 200))
+
+
+def test_parse_size():
+    """Тест разбора размеров данных."""
+    assert parse_size("1k") == 1000
+    assert parse_size("1M") == 1_000_000
+    assert parse_size("2500") == 2500
+
+
+def test_compare():
+    """Тест обнаружения замедления относительно базовых результатов."""
+    baseline = {
+        "results": [
+            {"case": "a", "size": 10, "mean_ms": 1.0},
+            {"case": "b", "size": 10, "mean_ms": 1.0},
+        ]
+    }
+    results = {
+        "results": [
+            {"case": "a", "size": 10, "mean_ms": 1.1},
+            {"case": "b", "size": 10, "mean_ms": 1.5},
+            {"case": "c", "size": 10, "mean_ms": 9.0},
+        ]
+    }
+
+    comparison = compare(results, baseline, tolerance=0.2)
+
+    assert [(row["case"], row["regression"]) for row in comparison] == [
+        ("a", False),
+        ("b", True),
+    ]
+
+
+def test_run(monkeypatch, tmp_path):
+    """Тест запуска замеров с записью результатов и сравнением."""
+    monkeypatch.setattr(lemmatizer, "tokenizer", "regex")
+    output = tmp_path / "results.json"
+    baseline = tmp_path / "baseline.json"
+    args = [
+        "--sizes",
+        "100",
+        "--cases",
+        "simple_preprocess_text,process_resource,find_matches",
+        "--queries",
+        "20",
+    ]
+
+    assert main(args + ["--baseline", str(baseline), "--save-baseline"]) == 0
+    assert main(args + ["--output", str(output)]) == 0
+
+    results = json.loads(output.read_text(encoding="utf-8"))
+    assert results["metadata"]["seed"] == 0
+    assert [result["case"] for result in results["results"]] == [
+        "simple_preprocess_text",
+        "process_resource",
+        "find_matches[exact]",
+        "find_matches[inverted]",
+        "find_matches[taat]",
+        "find_matches[lsh]",
+        "find_matches[euclidean]",
+        "find_matches[manhattan]",
+    ]
+    assert results["results"][0]["n_ops"] == 100
+    assert results["results"][2]["n_ops"] == 20
+    details = results["results"][1]["details"]
+    assert {"fit vectorizer", "save resources"} <= set(details)
+
+    with pytest.raises(ValueError):
+        main(["--sizes", "100", "--cases", "unknown"])
@@ -0,0 +1,160 @@
+import sqlite3
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from app.services.school_matcher import school_matcher
+from app.services.school_matcher.school_matcher import SchoolMatcher
+from app.services.school_matcher.utils.preprocess_functions import lemmatizer
+
+RESOURCES_DIR = "app/services/school_matcher/original_resources"
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """База данных SQLite с частью референсных школ и обучающими названиями."""
+    # Названия без сокращений вроде "cannot" токенизируются без данных punkt
+    monkeypatch.setattr(lemmatizer, "tokenizer", "regex")
+
+    ids = joblib.load(f"{RESOURCES_DIR}/reference_id.joblib")[:60]
+    names = joblib.load(f"{RESOURCES_DIR}/reference_name.joblib")[:60]
+    regions = joblib.load(f"{RESOURCES_DIR}/reference_region.joblib")[:60]
+
+    path = tmp_path / "schools.db"
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE schools (id INTEGER, name TEXT, region TEXT, updated_at INTEGER)"
+    )
+    connection.execute("CREATE TABLE similar_schools (school_id INTEGER, name TEXT)")
+    connection.executemany(
+        "INSERT INTO schools VALUES (?, ?, ?, 1)",
+        [(int(id_), str(name), str(region)) for id_, name, region in zip(ids, names, regions)],
+    )
+    connection.executemany(
+        "INSERT INTO similar_schools VALUES (?, ?)",
+        [(int(id_), f"{name} {region}") for id_, name, region in zip(ids, names, regions)],
+    )
+    connection.commit()
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def matcher(database, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'schools.db'}")
+    matcher = SchoolMatcher(engine, resources_dir=str(tmp_path / "resources"))
+    matcher.create_resources(column="updated_at")
+    matcher.load_resources()
+    return matcher
+
+
+def add_school(database, id_, name, region, updated_at):
+    database.execute(
+        "INSERT INTO schools VALUES (?, ?, ?, ?)", (id_, name, region, updated_at)
+    )
+    database.commit()
+
+
+def test_incremental_update_appends_and_replaces(matcher, database):
+    """Тест добавления и замены референсов без переобучения векторизатора."""
+    snapshot = matcher.snapshot
+    region = str(snapshot.reference_region[0])
+    replaced_id = int(snapshot.reference_id[3])
+    vocabulary = set(snapshot.vectorizer.vocabulary_)
+    words = sorted(vocabulary)[:3]
+
+    add_school(database, 100001, " ".join(words), region, 2)
+    database.execute(
+        "UPDATE schools SET name = ?, updated_at = 2 WHERE id = ?",
+        (" ".join(words[1:]), replaced_id),
+    )
+    database.commit()
+
+    summary = matcher.update_resources(column="updated_at", refit_interval=0)
+    assert summary["mode"] == "incremental"
+    assert (summary["added"], summary["replaced"], summary["watermark"]) == (1, 1, 2)
+    matcher.load_resources()
+
+    updated = matcher.snapshot
+    n_rows = snapshot.reference_vec.shape[0]
+    assert set(updated.vectorizer.vocabulary_) == vocabulary
+    assert updated.reference_vec.shape == (n_rows + 1, snapshot.reference_vec.shape[1])
+    assert list(updated.reference_id[:-1]) == list(snapshot.reference_id)
+    assert updated.reference_id[-1] == 100001
+    assert updated.reference_region[-1] == region
+
+    # Строки референсов совпадают с векторизацией прежним векторизатором
+    for row in (3, n_rows):
+        expected = updated.vectorizer.transform([updated.reference_name[row]])
+        assert np.allclose(updated.reference_vec[row].toarray(), expected.toarray())
+    assert updated.reference_name[3] != snapshot.reference_name[3]
+
+    # Повторное обновление без новых записей ничего не меняет
+    summary = matcher.update_resources(column="updated_at", refit_interval=0)
+    assert (summary["added"], summary["replaced"]) == (0, 0)
+
+
+def test_incremental_update_refits_on_drift(matcher, database):
+    """Тест полного переобучения при доле неизвестных слов выше порога."""
+    region = str(matcher.snapshot.reference_region[0])
+    add_school(database, 100002, "квазарный гиперболоид", region, 2)
+
+    summary = matcher.update_resources(
+        column="updated_at", drift_threshold=0.5, refit_interval=0
+    )
+    assert (summary["mode"], summary["reason"]) == ("full", "drift")
+    matcher.load_resources()
+
+    assert "квазарный" in matcher.snapshot.vectorizer.vocabulary_
+    assert 100002 in matcher.snapshot.reference_id
+
+
+def test_incremental_update_refits_on_schedule(matcher):
+    """Тест полного переобучения по истечении интервала."""
+    summary = matcher.update_resources(column="updated_at", refit_interval=1e-9)
+
+    assert (summary["mode"], summary["reason"]) == ("full", "schedule")
+    assert summary["watermark"] == 1
+
+
+def test_incremental_update_checks_column_name(matcher):
+    """Тест проверки имени столбца отметки."""
+    with pytest.raises(ValueError):
+        matcher.update_resources(column="id; DROP TABLE schools")
+
+
+def test_create_resources_training_rows(database, tmp_path, monkeypatch):
+    """Тест обучающих названий: строки как у соединения со schools."""
+    # Повторяющийся id школы дублирует ее обучающие названия
+    school_id, name, region, _ = database.execute("SELECT * FROM schools").fetchone()
+    add_school(database, school_id, name, region, 1)
+    expected = pd.read_sql(
+        """
+        SELECT ss.school_id, ss.name, s.name AS reference_name, s.region
+        FROM similar_schools AS ss
+        LEFT JOIN schools AS s ON ss.school_id = s.id
+        """,
+        database,
+    )[["school_id", "name"]]
+
+    chunks = []
+    read_sql_chunks = school_matcher.read_sql_chunks
+
+    def recording_read_sql_chunks(*args, **kwargs):
+        for chunk in read_sql_chunks(*args, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+
+    monkeypatch.setattr(school_matcher, "read_sql_chunks", recording_read_sql_chunks)
+    engine = create_engine(f"sqlite:///{tmp_path / 'schools.db'}")
+    matcher = SchoolMatcher(engine, resources_dir=str(tmp_path / "resources"))
+    matcher.create_resources(column="updated_at")
+
+    data_train = pd.concat(chunks, ignore_index=True)
+    assert (data_train["school_id"] == school_id).sum() == 2
+    assert data_train.sort_values(["school_id", "name"], ignore_index=True).equals(
+        expected.sort_values(["school_id", "name"], ignore_index=True)
+    )
@@ -0,0 +1,56 @@
+import os
+
+import joblib
+import numpy as np
+import pytest
+
+from app.services.school_matcher.utils.load_functions import (
+    NPY_RESOURCES,
+    convert_resources,
+    has_npy_resource,
+    load_resources,
+    npy_resource_files,
+)
+
+ORIGINAL_DIR = "app/services/school_matcher/original_resources"
+
+
+def test_convert_and_load_npy(tmp_path):
+    """Тест конвертации ресурсов joblib в .npy и загрузки через mmap."""
+    assert convert_resources(ORIGINAL_DIR, tmp_path) == list(NPY_RESOURCES)
+
+    for resources_type in NPY_RESOURCES:
+        expected = joblib.load(f"{ORIGINAL_DIR}/{resources_type}.joblib")
+        loaded = load_resources(resources_type, "npy", tmp_path)
+        if resources_type == "reference_vec":
+            assert loaded.shape == expected.shape
+            assert (loaded != expected).nnz == 0
+            # Массивы матрицы - представления файла, а не копии
+            for array in (loaded.data, loaded.indices, loaded.indptr):
+                assert not array.flags.owndata
+                assert not array.flags.writeable
+        else:
+            np.testing.assert_array_equal(loaded, expected)
+            assert loaded.dtype == expected.dtype
+
+
+def test_npy_freshness(tmp_path):
+    """Тест отказа от файлов .npy, которые старше файла joblib."""
+    convert_resources(ORIGINAL_DIR, tmp_path)
+    assert has_npy_resource("reference_id", tmp_path)
+    assert not has_npy_resource("vectorizer", tmp_path)
+
+    joblib_path = tmp_path / "reference_id.joblib"
+    joblib.dump(np.arange(3), joblib_path)
+    npy_mtime = npy_resource_files("reference_id", tmp_path)[0].stat().st_mtime
+    os.utime(joblib_path, (npy_mtime + 10, npy_mtime + 10))
+    assert not has_npy_resource("reference_id", tmp_path)
+
+    npy_resource_files("reference_name", tmp_path)[0].unlink()
+    assert not has_npy_resource("reference_name", tmp_path)
+
+
+def test_unsupported_file_type():
+    """Тест ошибки для неподдерживаемого типа файла."""
+    with pytest.raises(ValueError):
+        load_resources("reference_id", "pickle")
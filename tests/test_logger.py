@@ -0,0 +1,81 @@
+import logging
+from logging.handlers import QueueHandler
+
+from app.core import logger as logger_module
+from app.core.logger import LogCounter, SamplingFilter, flush_logs, setup_logger
+from app.services.school_matcher.utils.preprocess_functions import (
+    abbr_preprocess_text,
+    unknown_abbreviations,
+)
+
+
+def test_queue_mode(tmp_path):
+    """Тест записи в файл через очередь."""
+    log_file = tmp_path / "queue" / "logs.log"
+
+    logger = setup_logger("test_queue_mode", str(log_file), mode="queue")
+    logger.info("первое сообщение")
+    logger.debug("второе сообщение %s", 2)
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logger.exception("ошибка")
+    flush_logs()
+
+    lines = log_file.read_text().splitlines()
+    assert "test_queue_mode - INFO - первое сообщение" in lines[0]
+    assert "test_queue_mode - DEBUG - второе сообщение 2" in lines[1]
+    assert "test_queue_mode - ERROR - ошибка" in lines[2]
+    assert "ZeroDivisionError: division by zero" in lines[-1]
+    assert isinstance(logger.handlers[0], QueueHandler)
+
+
+def test_logger_levels(tmp_path, monkeypatch):
+    """Тест уровней отдельных логгеров из LOG_LEVELS."""
+    monkeypatch.setattr(logger_module, "LOG_LEVELS", "test_levels_quiet=WARNING")
+    log_file = tmp_path / "logs.log"
+
+    quiet = setup_logger("test_levels_quiet", str(log_file), mode="sync")
+    verbose = setup_logger("test_levels_verbose", str(log_file), mode="sync")
+
+    assert quiet.level == logging.WARNING
+    assert verbose.level == logging.DEBUG
+    assert not quiet.isEnabledFor(logging.INFO)
+
+
+def test_sampling_filter():
+    """Тест прореживания записей DEBUG и INFO."""
+    sampling = SamplingFilter(0.25)
+
+    def record(level):
+        return logging.LogRecord("test", level, __file__, 0, "message", None, None)
+
+    kept = [sampling.filter(record(logging.INFO)) for _ in range(100)]
+    assert sum(kept) == 25
+    assert all(sampling.filter(record(logging.WARNING)) for _ in range(10))
+    assert not any(SamplingFilter(0).filter(record(logging.INFO)) for _ in range(10))
+
+
+def test_log_counter(caplog):
+    """Тест сводки повторяющихся событий вместо записи каждого события."""
+    logger = logging.getLogger("test_log_counter")
+    counter = LogCounter(logger, "Unknown abbreviations", interval=3600, top=1)
+
+    with caplog.at_level(logging.INFO, logger="test_log_counter"):
+        for value in ["АБВ", "АБВ", "ГДЕ"]:
+            counter.add(value)
+        assert caplog.records == []
+
+        assert counter.flush() == {"АБВ": 2, "ГДЕ": 1}
+        assert len(caplog.records) == 1
+        assert "{'АБВ': 2}, total 3, distinct 2" in caplog.records[0].getMessage()
+        assert counter.flush() == {}
+
+
+def test_unknown_abbreviations_are_counted():
+    """Тест учета неизвестных аббревиатур при предобработке."""
+    unknown_abbreviations.flush()
+
+    abbr_preprocess_text("МБОУ ЪЫЬ школа", {"мбоу": "бюджетное учреждение"})
+
+    assert unknown_abbreviations.flush() == {"ЪЫЬ": 1}
@@ -1,6 +1,14 @@
+import importlib
 import os
+import time
 
 import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.api.school_matching import endpoints
+from app.core.startup import StartupReport
+from app.services.school_matcher.utils import preprocess_functions
 
 
 @pytest.fixture
@@ -58,10 +66,11 @@ def test_status_with_token(client, setup_auth_enabled):
     assert response.status_code == 200  # Ожидаем успешный ответ
 
     # Проверяем корректный ответ сервиса
-    assert response.json() == {
-        "status": "Приложение работает",
-        "detail": "Все системы в норме",
-    }
+    status = response.json()
+    assert status["status"] == "Приложение работает"
+    assert status["detail"] == "Все системы в норме"
+    assert status["ready"] is True
+    assert status["startup"]["stages"]["school matcher"] > 0
 
 
 def test_get_school_matches_requires_auth(client, setup_auth_enabled):
@@ -90,3 +99,52 @@ def test_get_school_matches_requires_auth(client, setup_auth_enabled):
     # Ожидаем 401, так как токен не передан
     assert response.status_code == 401, f"Expected 401, got {response.status_code}"
     assert response.json() == {"detail": "Token missing"}
+
+
+def test_warm_up_without_nltk_data(monkeypatch):
+    """Тест запуска с токенизатором nltk без данных punkt."""
+    monkeypatch.setattr(preprocess_functions.lemmatizer, "tokenizer", "nltk")
+    monkeypatch.setattr(
+        preprocess_functions, "ensure_nltk_data", lambda download=False: False
+    )
+    report = StartupReport()
+
+    with pytest.raises(RuntimeError, match="punkt"):
+        endpoints.warm_up(report)
+
+    # Приложение не сообщает о готовности
+    assert report.ready is False
+    assert "punkt" in report.error
+
+
+@pytest.fixture
+def reload_main(monkeypatch):
+    """Перезагружает app.main с заданным режимом загрузки ресурсов."""
+
+    def reload(mode):
+        monkeypatch.setenv("SCHOOL_MATCHER_WARMUP", mode)
+        return importlib.reload(main)
+
+    yield reload
+    monkeypatch.undo()
+    importlib.reload(main)
+
+
+@pytest.mark.parametrize("mode, loaded", [("blocking", True), ("background", False)])
+def test_warmup_mode(reload_main, monkeypatch, mode, loaded):
+    """Тест режима загрузки ресурсов при запуске (SCHOOL_MATCHER_WARMUP)."""
+    calls = []
+
+    def warm_up():
+        time.sleep(0.5)
+        calls.append("warm_up")
+
+    monkeypatch.setattr(endpoints, "warm_up", warm_up)
+    monkeypatch.setattr(endpoints, "shut_down", lambda: calls.append("shut_down"))
+    module = reload_main(mode)
+    assert module.WARMUP_MODE == mode
+
+    with TestClient(module.app):
+        # В режиме "blocking" запуск завершается после загрузки ресурсов
+        assert (calls == ["warm_up"]) is loaded
+    assert calls == ["warm_up", "shut_down"]
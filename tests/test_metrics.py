@@ -0,0 +1,89 @@
+import numpy as np
+from scipy.sparse import random as sparse_random
+
+from app.core.metrics import MetricsRegistry
+from app.services.school_matcher.school_matcher import build_ann_index, find_matches
+from app.services.school_matcher.utils.reference_index import RegionIndex
+
+
+def test_render():
+    """Тест текстового формата Prometheus для счетчика и гистограммы."""
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Вызовы", ("method",))
+    seconds = registry.histogram("seconds", "Время", ("stage",), buckets=(0.1, 1.0))
+
+    requests.inc("single")
+    requests.inc("single", amount=2)
+    seconds.observe(0.05, "search")
+    seconds.observe(0.1, "search")
+    seconds.observe(5.0, "search")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{method="single"} 3.0' in lines
+    assert "# TYPE seconds histogram" in lines
+    assert 'seconds_bucket{stage="search",le="0.1"} 2' in lines
+    assert 'seconds_bucket{stage="search",le="1.0"} 2' in lines
+    assert 'seconds_bucket{stage="search",le="+Inf"} 3' in lines
+    assert 'seconds_sum{stage="search"} 5.15' in lines
+    assert 'seconds_count{stage="search"} 3' in lines
+
+
+def test_drain_and_merge():
+    """Тест передачи приращений метрик из процесса-обработчика."""
+    worker, main = MetricsRegistry(), MetricsRegistry()
+    for registry in (worker, main):
+        registry.counter("requests_total", "Вызовы")
+        registry.histogram("seconds", "Время", buckets=(1.0,))
+
+    main.metrics["requests_total"].inc()
+    worker.metrics["requests_total"].inc()
+    worker.metrics["seconds"].observe(0.5)
+    main.merge(worker.drain())
+    main.merge(worker.drain())
+
+    lines = main.render().splitlines()
+    assert "requests_total 2.0" in lines
+    assert "seconds_count 1" in lines
+    assert worker.drain() == {}
+
+
+def test_find_matches_stats():
+    """Тест статистики кандидатов и перехода к поиску по всем школам."""
+    reference_vec = sparse_random(60, 40, density=0.2, format="csr", random_state=0)
+    reference_id = np.arange(60)
+    reference_region = np.array(["a"] * 30 + ["b"] * 30, dtype=object)
+    region_index = RegionIndex(reference_vec, reference_id, reference_region)
+    ann_index = build_ann_index(region_index.all.vec)
+    x_vec = sparse_random(4, 40, density=0.3, format="csr", random_state=1)
+    x_region = np.array(["a", "b", "unknown", None], dtype=object)
+
+    for search_mode, similarity_method in (
+        ("exact", "cosine"),
+        ("inverted", "cosine"),
+        ("taat", "cosine"),
+        ("lsh", "cosine"),
+        ("exact", "euclidean"),
+        ("exact", "manhattan"),
+    ):
+        stats = {}
+        find_matches(
+            x_vec,
+            x_region,
+            reference_id,
+            reference_vec,
+            reference_region,
+            threshold=0.00000001 if similarity_method == "cosine" else -100,
+            similarity_method=similarity_method,
+            region_index=region_index,
+            search_mode=search_mode,
+            ann_index=ann_index,
+            stats=stats,
+        )
+        assert stats["region_fallback"] == 2
+        assert len(stats["candidates"]) == 4
+        # При полном переборе кандидаты - все школы блока региона
+        if search_mode == "exact":
+            assert sorted(stats["candidates"]) == [30, 30, 60, 60]
+        else:
+            assert all(0 <= n <= 60 for n in stats["candidates"])
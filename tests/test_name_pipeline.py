@@ -0,0 +1,116 @@
+import json
+import pickle
+
+import joblib
+import pytest
+
+from app.services.school_matcher.utils.name_pipeline import NamePipeline
+from app.services.school_matcher.utils.pattern_matcher import MultiPatternMatcher
+from app.services.school_matcher.utils.preprocess_functions import (
+    NumberWordsTable,
+    abbr_preprocess_text,
+    lemmatize_text,
+    lemmatizer,
+    process_region,
+    remove_short_words,
+    remove_substrings,
+    replace_numbers_with_text,
+    simple_preprocess_text,
+)
+
+RESOURCES_DIR = "app/services/school_matcher/original_resources"
+
+
+@pytest.fixture(scope="module")
+def resources():
+    region_dict = joblib.load(f"{RESOURCES_DIR}/region_dict.joblib")
+    blacklist_opf = joblib.load(f"{RESOURCES_DIR}/blacklist_opf.joblib")
+    return {
+        "number_words": NumberWordsTable(1000),
+        "abbreviations_dict": joblib.load(
+            f"{RESOURCES_DIR}/abbreviations_dict.joblib"
+        ),
+        "region_dict": region_dict,
+        "blacklist_opf": blacklist_opf,
+        "pattern_matcher": MultiPatternMatcher(region_dict, blacklist_opf),
+        "stop_words": frozenset(joblib.load(f"{RESOURCES_DIR}/stop_words_list.joblib")),
+    }
+
+
+@pytest.fixture
+def texts(monkeypatch):
+    # Названия токенизируются без данных punkt
+    monkeypatch.setattr(lemmatizer, "tokenizer", "regex")
+    with open("tests/data/preprocess_golden.json", encoding="utf-8") as file:
+        return [case["text"] for case in json.load(file)["cases"]] + [
+            "МБОУ СОШ №5 г. Казань Республика Татарстан",
+            "Спортивная школа 12 Московская область",
+        ]
+
+
+def preprocess_with_functions(text, resources):
+    """Цепочка предобработки из исходных функций модуля."""
+    x = simple_preprocess_text(text)
+    x = replace_numbers_with_text(x, resources["number_words"])
+    x = abbr_preprocess_text(
+        x, resources["abbreviations_dict"], False, False, False, False
+    )
+    region = process_region(x, list(resources["region_dict"]), True)
+    x = process_region(x, list(resources["region_dict"]))
+    x = remove_substrings(x, resources["blacklist_opf"])
+    x = simple_preprocess_text(x)
+    x = lemmatize_text(x, resources["stop_words"])
+    return remove_short_words(x), region
+
+
+def test_matches_original_functions(resources, texts):
+    """Тест совпадения названия и региона с цепочкой исходных функций."""
+    pipeline = NamePipeline(
+        resources["number_words"],
+        resources["abbreviations_dict"],
+        resources["pattern_matcher"],
+        resources["stop_words"],
+    )
+
+    expected = [preprocess_with_functions(text, resources) for text in texts]
+
+    assert [pipeline.process(text) for text in texts] == expected
+    assert pipeline.process_many(texts) == expected
+    assert any(region is not None for _, region in expected)
+
+
+def test_serialization(resources, texts):
+    """Тест передачи предобработки в другой процесс."""
+    pipeline = NamePipeline(
+        resources["number_words"],
+        resources["abbreviations_dict"],
+        resources["pattern_matcher"],
+        resources["stop_words"],
+    )
+
+    restored = pickle.loads(pickle.dumps(pipeline))
+
+    assert restored.process_many(texts) == pipeline.process_many(texts)
+
+
+def test_process_variants(resources, monkeypatch):
+    """Тест вариантов предобработки для неоднозначных сокращений."""
+    monkeypatch.setattr(lemmatizer, "tokenizer", "regex")
+    abbreviations_dict = dict(resources["abbreviations_dict"])
+    abbreviations_dict["сош"] = ["средняя школа", "спортивная школа"]
+    pipeline = NamePipeline(
+        resources["number_words"],
+        abbreviations_dict,
+        resources["pattern_matcher"],
+        resources["stop_words"],
+    )
+    text = "МБОУ СОШ №5 г. Казань Республика Татарстан"
+
+    variants = pipeline.process_variants(text)
+
+    assert variants[0] == pipeline.process(text)
+    assert len(variants) == 3
+    assert len(set(variants)) == 3
+    assert {region for _, region in variants} == {variants[0][1]}
+    assert "спортивный" in variants[2][0]
+    assert pipeline.process_variants(text, max_variants=2) == variants[:2]
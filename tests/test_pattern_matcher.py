@@ -0,0 +1,89 @@
+import json
+import pickle
+
+import joblib
+import pytest
+
+from app.services.school_matcher.utils.pattern_matcher import MultiPatternMatcher
+from app.services.school_matcher.utils.preprocess_functions import (
+    abbr_preprocess_text,
+    process_cities,
+    process_region,
+    remove_substrings,
+)
+
+RESOURCES_DIR = "app/services/school_matcher/original_resources"
+
+
+@pytest.fixture(scope="module")
+def region_dict():
+    return joblib.load(f"{RESOURCES_DIR}/region_dict.joblib")
+
+
+@pytest.fixture(scope="module")
+def blacklist_opf():
+    return joblib.load(f"{RESOURCES_DIR}/blacklist_opf.joblib")
+
+
+@pytest.fixture(scope="module")
+def texts(region_dict, blacklist_opf):
+    """Названия из эталонного набора и названия со вставленными регионами,
+    городами и ОПФ в разных регистрах."""
+    abbreviations_dict = joblib.load(f"{RESOURCES_DIR}/abbreviations_dict.joblib")
+    with open("tests/data/preprocess_golden.json", encoding="utf-8") as file:
+        golden = [case["text"] for case in json.load(file)["cases"]]
+
+    texts = golden[::4] + [
+        abbr_preprocess_text(text, abbreviations_dict, False, False, False, False)
+        for text in golden[1::4]
+    ]
+    regions = list(region_dict)
+    cities = [city for region_cities in region_dict.values() for city in region_cities]
+    for i in range(0, len(regions), 9):
+        city = cities[(i * 7) % len(cities)]
+        texts.extend(
+            [
+                f"{blacklist_opf[i % len(blacklist_opf)]} школа {regions[i]}",
+                f"спортивная школа г {city}а {regions[-i - 1]}".upper(),
+                f"{city}ский лед {regions[i]}ская",
+                f"{regions[i]}-{city} _{city} {city}1".title(),
+            ]
+        )
+    return texts
+
+
+def test_matches_original_functions(region_dict, blacklist_opf, texts):
+    """Тест совпадения результатов с исходными функциями поиска."""
+    matcher = MultiPatternMatcher(region_dict, blacklist_opf)
+
+    for text in texts:
+        region = process_region(text, list(region_dict), True)
+        cleaned = process_region(text, list(region_dict))
+        assert matcher.process_region(text, True) == region
+        assert matcher.process_region(text) == cleaned
+        city = process_cities(text, region_dict, True)
+        assert matcher.process_cities(text, True) == city
+        assert matcher.process_cities(text) == process_cities(text, region_dict)
+        assert matcher.remove_substrings(text) == remove_substrings(
+            text, blacklist_opf
+        )
+        assert matcher.scan(text) == (
+            region,
+            city,
+            remove_substrings(cleaned, blacklist_opf),
+        )
+        assert matcher.split_region(text) == (region, cleaned)
+
+
+def test_serialization(region_dict, blacklist_opf, texts):
+    """Тест сериализации индекса без скомпилированных шаблонов."""
+    matcher = MultiPatternMatcher(region_dict, blacklist_opf)
+    expected = [matcher.scan(text) for text in texts]
+
+    restored = pickle.loads(pickle.dumps(matcher))
+
+    assert restored.fingerprint == MultiPatternMatcher.make_fingerprint(
+        region_dict, blacklist_opf
+    )
+    assert restored._region_patterns == {}
+    assert [restored.scan(text) for text in texts] == expected
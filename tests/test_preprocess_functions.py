@@ -0,0 +1,151 @@
+import json
+import pickle
+
+import joblib
+import nltk.tokenize
+import pytest
+from nltk.tokenize import NLTKWordTokenizer
+from num2words import num2words
+
+from app.services.school_matcher.utils.preprocess_functions import (
+    Lemmatizer,
+    NumberWordsTable,
+    TextPreprocessor,
+    abbr_preprocess_text,
+    get_morph,
+    replace_numbers_with_text,
+    simple_preprocess_text,
+)
+
+# Эталонные результаты исходных функций предобработки
+with open("tests/data/preprocess_golden.json", encoding="utf-8") as file:
+    GOLDEN = json.load(file)
+
+
+@pytest.fixture(scope="module")
+def abbreviations_dict():
+    return joblib.load(
+        "app/services/school_matcher/original_resources/abbreviations_dict.joblib"
+    )
+
+
+@pytest.mark.parametrize("case", GOLDEN["cases"], ids=lambda case: case["text"])
+def test_simple_preprocess_golden(case):
+    """Тест побайтного совпадения simple_preprocess_text с эталоном."""
+    assert simple_preprocess_text(case["text"]) == case["simple"]
+
+
+@pytest.mark.parametrize("case", GOLDEN["cases"], ids=lambda case: case["text"])
+def test_abbr_preprocess_golden(case, abbreviations_dict):
+    """Тест побайтного совпадения abbr_preprocess_text с эталоном."""
+    for flags, expected in zip(GOLDEN["abbr_flags"], case["abbr"]):
+        result = abbr_preprocess_text(case["text"], abbreviations_dict, *flags)
+        # Список неизвестных аббревиатур возвращается без порядка
+        if flags[1]:
+            result = sorted(result)
+        assert result == expected
+
+
+def test_process_many(abbreviations_dict):
+    """Тест пакетной предобработки движком."""
+    preprocessor = TextPreprocessor()
+    texts = [case["text"] for case in GOLDEN["cases"]]
+
+    assert preprocessor.process_many(texts) == [
+        case["simple"] for case in GOLDEN["cases"]
+    ]
+    assert preprocessor.process_many(texts, abbreviations_dict) == [
+        case["abbr"][0] for case in GOLDEN["cases"]
+    ]
+
+
+def test_regex_tokenizer_matches_nltk():
+    """Тест совпадения токенизатора "regex" с токенизатором nltk."""
+    lemmatizer = Lemmatizer(tokenizer="regex")
+    tokenizer = NLTKWordTokenizer()
+    texts = [case["abbr"][0] for case in GOLDEN["cases"]] + ["ёлка_2 спорт"]
+
+    for text in texts:
+        assert lemmatizer.tokenize(text.lower()) == tokenizer.tokenize(text.lower())
+
+
+def test_regex_tokenizer_without_punkt(monkeypatch):
+    """Тест токенизатора "regex" для текста, который он передает nltk."""
+    # Разбиение на предложения требует данных punkt
+    def sent_tokenize(text, language="english"):
+        raise LookupError("punkt")
+
+    monkeypatch.setattr(nltk.tokenize, "sent_tokenize", sent_tokenize)
+    lemmatizer = Lemmatizer(tokenizer="regex")
+    tokenizer = NLTKWordTokenizer()
+
+    for text in ("школа cannot спорт", "школа (спорт) №5"):
+        assert lemmatizer.tokenize(text) == tokenizer.tokenize(text)
+
+
+def test_lemmatizer_cache():
+    """Тест лемматизации с кэшем лемм и стоп-словами во frozenset."""
+    lemmatizer = Lemmatizer(cache_size=2, tokenizer="regex")
+    stop_words = frozenset(["по"])
+    text = "Спортивные школы по плаванию"
+
+    expected = " ".join(
+        lemma
+        for lemma in (
+            get_morph().parse(word)[0].normal_form for word in text.lower().split()
+        )
+        if lemma not in stop_words
+    )
+    assert lemmatizer.lemmatize(text, stop_words) == expected
+    assert lemmatizer.lemmatize(text, list(stop_words)) == expected
+
+    info = lemmatizer.cache_info()
+    assert info["max_size"] == 2
+    assert info["size"] == 2
+    assert info["hits"] + info["misses"] == 8
+
+    lemmatizer.cache_clear()
+    assert lemmatizer.cache_info()["hits"] == 0
+
+    with pytest.raises(ValueError):
+        Lemmatizer(tokenizer="spacy")
+
+
+def test_number_words_table():
+    """Тест таблицы текстовых представлений чисел и замены чисел по ней."""
+    table = pickle.loads(pickle.dumps(NumberWordsTable(max_number=100)))
+
+    for number in (0, 7, 100, 101, 2024):
+        assert table.to_words(number) == num2words(number, lang="ru")
+
+    texts = [case["simple"] for case in GOLDEN["cases"]] + [
+        "ДЮСШ 007 и 100500",
+        "школа 21",
+    ]
+    for text in texts:
+        assert replace_numbers_with_text(text, table) == replace_numbers_with_text(
+            text
+        )
+
+
+def test_abbr_variants_are_capped():
+    """Тест ограничения количества вариантов расшифровки сокращений."""
+    abbreviations_dict = {
+        "аа": ["альфа", "бета", "гамма"],
+        "бб": ["дельта", "эпсилон", "дзета"],
+        "вв": ["эта", "тета", "йота"],
+        "мбоу": "бюджетное учреждение",
+    }
+    name = "МБОУ АА ББ ВВ школа"
+
+    variants = abbr_preprocess_text(name, abbreviations_dict, output_list=True)
+    capped = abbr_preprocess_text(
+        name, abbreviations_dict, output_list=True, max_variants=4
+    )
+
+    assert len(variants) == 16
+    assert variants[0] == "бюджетное учреждение альфа дельта эта школа"
+    assert capped == variants[:4]
+    assert abbr_preprocess_text(name, abbreviations_dict, max_variants=1) == (
+        "бюджетное учреждение    школа"
+    )
@@ -0,0 +1,153 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.services.school_matcher.rebuild_jobs import RebuildJobs
+from app.services.school_matcher.school_matcher import (
+    ResourceSnapshot,
+    SchoolMatcher,
+    build_stage,
+)
+
+
+class FakeMatcher:
+    """Объект поиска, который считает опубликованные наборы ресурсов."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.release = threading.Event()
+        self.release.set()
+        self.published = []
+
+    def create_resources(self, timings, progress):
+        with build_stage("read data", timings, progress):
+            self.release.wait(5)
+        if self.error:
+            raise RuntimeError(self.error)
+        with build_stage("fit vectorizer", timings, progress):
+            pass
+        return timings
+
+    def update_resources(self, timings, progress):
+        with build_stage("read data", timings, progress):
+            pass
+        return {"mode": "incremental", "added": 0, "replaced": 0}
+
+    def load_snapshot(self):
+        return "snapshot"
+
+    def publish_snapshot(self, snapshot):
+        self.published.append(snapshot)
+        return SimpleNamespace(version=len(self.published))
+
+
+def wait_for(job):
+    deadline = time.monotonic() + 5
+    while job.active and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return job.to_dict()
+
+
+def test_rebuild_job_publishes_snapshot():
+    """Тест публикации ресурсов и отчета о ходе обновления."""
+    matcher = FakeMatcher()
+    published = []
+    jobs = RebuildJobs(
+        matcher, mode="thread", on_published=lambda: published.append(True)
+    )
+
+    job = jobs.submit()
+    status = wait_for(job)
+
+    assert status["status"] == "succeeded"
+    assert status["version"] == 1
+    assert status["error"] is None
+    assert list(status["stages"]) == [
+        "read data",
+        "fit vectorizer",
+        "load snapshot",
+        "publish",
+    ]
+    assert matcher.published == ["snapshot"]
+    assert published == [True]
+    assert jobs.get(job.job_id) is job
+    assert jobs.get("unknown") is None
+
+
+def test_rebuild_job_is_not_duplicated():
+    """Тест: пока обновление выполняется, новая задача не создается."""
+    matcher = FakeMatcher()
+    matcher.release.clear()
+    jobs = RebuildJobs(matcher, mode="thread")
+
+    job = jobs.submit()
+    assert jobs.submit() is job
+    matcher.release.set()
+    assert wait_for(job)["status"] == "succeeded"
+
+    assert jobs.submit() is not job
+
+
+def test_incremental_job_without_changes_is_not_published():
+    """Тест: если новых записей нет, ресурсы не публикуются заново."""
+    matcher = FakeMatcher()
+    jobs = RebuildJobs(matcher, mode="thread")
+
+    status = wait_for(jobs.submit(incremental=True))
+
+    assert status["status"] == "succeeded"
+    assert status["incremental"] is True
+    assert status["result"]["added"] == 0
+    assert status["version"] is None
+    assert matcher.published == []
+
+
+def test_rebuild_job_failure_keeps_resources():
+    """Тест: при ошибке создания ресурсов прежние ресурсы не меняются."""
+    matcher = FakeMatcher(error="no such table: schools")
+    jobs = RebuildJobs(matcher, mode="thread")
+
+    status = wait_for(jobs.submit())
+
+    assert status["status"] == "failed"
+    assert status["error"] == "no such table: schools"
+    assert matcher.published == []
+
+
+def test_rebuild_jobs_history():
+    """Тест ограничения количества хранимых задач."""
+    jobs = RebuildJobs(FakeMatcher(), mode="thread", history=2)
+    submitted = []
+    for _ in range(3):
+        submitted.append(jobs.submit())
+        wait_for(submitted[-1])
+
+    assert list(jobs.jobs) == [job.job_id for job in submitted[1:]]
+
+
+def test_rebuild_jobs_process_mode_requires_database_url():
+    """Тест проверки параметров режима process."""
+    with pytest.raises(ValueError):
+        RebuildJobs(FakeMatcher(), mode="process")
+
+
+def test_publish_snapshot_is_atomic():
+    """Тест замены набора ресурсов целиком с новой версией кэшей."""
+    matcher = SchoolMatcher(create_engine("sqlite://"))
+    previous = matcher.snapshot
+    assert isinstance(previous, ResourceSnapshot)
+    assert matcher.vectorizer is previous.vectorizer
+
+    published = matcher.publish_snapshot(matcher.load_snapshot())
+
+    assert matcher.snapshot is published
+    assert published.version == previous.version + 1
+    assert matcher.raw_cache.version == published.version
+    assert matcher.normalized_cache.version == published.version
+    assert matcher.vectorizer is published.vectorizer
+    # Результат, вычисленный на прежних ресурсах, не попадает в кэш
+    matcher.raw_cache.put(("школа", "exact"), [], previous.version)
+    assert matcher.raw_cache.get(("школа", "exact")) is None
@@ -0,0 +1,152 @@
+import joblib
+import numpy as np
+import pytest
+from scipy.sparse import vstack
+from sklearn.preprocessing import normalize
+
+from app.services.school_matcher.school_matcher import find_matches
+from app.services.school_matcher.utils.reference_index import RegionIndex
+from app.services.school_matcher.utils.similarity_functions import cosine_top_k
+
+RESOURCES_DIR = "app/services/school_matcher/original_resources"
+
+
+@pytest.fixture(scope="module")
+def references():
+    return (
+        joblib.load(f"{RESOURCES_DIR}/reference_vec.joblib"),
+        joblib.load(f"{RESOURCES_DIR}/reference_id.joblib"),
+        joblib.load(f"{RESOURCES_DIR}/reference_region.joblib"),
+    )
+
+
+@pytest.fixture(scope="module")
+def queries(references):
+    reference_vec = references[0]
+    rng = np.random.default_rng(0)
+    first = rng.integers(0, reference_vec.shape[0], 100)
+    second = rng.integers(0, reference_vec.shape[0], 100)
+    # Сами референсы и смеси пар референсов
+    mixed = normalize(reference_vec[first] + 0.5 * reference_vec[second])
+    return [reference_vec[i] for i in range(30)] + [mixed[i] for i in range(100)]
+
+
+@pytest.mark.parametrize("max_df", [1.0, 0.1])
+@pytest.mark.parametrize("early_termination", [False, True])
+def test_inverted_search_matches_exact(references, queries, max_df, early_termination):
+    """Тест совпадения поиска по инвертированному индексу с полным перебором."""
+    reference_vec, reference_id, reference_region = references
+    region_index = RegionIndex(reference_vec, reference_id, reference_region, max_df)
+    shard = region_index.all
+    if max_df < 1:
+        assert shard.inverted.pruned.any()
+
+    for x in queries:
+        rows, scores = shard.inverted.search(
+            x, top_k=5, early_termination=early_termination
+        )
+        expected_rows, expected_scores, _ = cosine_top_k(x, shard.vec, top_k=5)
+
+        np.testing.assert_allclose(scores, expected_scores[0][: rows.size])
+        # Схожести накапливаются в другом порядке, поэтому референсы с
+        # равными схожестями могут идти в другом порядке; остальные
+        # совпадают, а схожести найденных референсов точные
+        all_scores = (shard.vec @ x.T).toarray().ravel()
+        np.testing.assert_allclose(all_scores[rows], scores)
+        tied = np.isclose(scores[:, None], all_scores[None, :]).sum(axis=1) > 1
+        np.testing.assert_array_equal(
+            rows[~tied], expected_rows[0][: rows.size][~tied]
+        )
+        # Пропущены только референсы без общих терминов с запросом
+        assert np.all(expected_scores[0][rows.size :] == 0)
+
+
+@pytest.mark.parametrize("use_codes", [False, True])
+def test_region_shards_match_mask(references, use_codes):
+    """Тест совпадения блоков регионов с фильтрацией по маске."""
+    reference_vec, reference_id, reference_region = references
+    region_codes = None
+    if use_codes:
+        # Коды регионов, как у RegionCanonicalizer.encode
+        _, region_codes = np.unique(reference_region, return_inverse=True)
+    region_index = RegionIndex(
+        reference_vec, reference_id, reference_region, region_codes=region_codes
+    )
+
+    regions = set(reference_region)
+    assert len(region_index) == len(regions)
+    for region in regions:
+        mask = reference_region == region
+        shard = region_index.get(region)
+        np.testing.assert_array_equal(shard.ids, reference_id[mask])
+        np.testing.assert_array_equal(shard.rows, np.flatnonzero(mask))
+        assert (shard.vec != reference_vec[mask]).nnz == 0
+
+    assert region_index.get("нет такого региона") is None
+    assert region_index.get(None) is None
+    np.testing.assert_array_equal(region_index.all.ids, reference_id)
+    assert region_index.empty.vec.shape == (0, reference_vec.shape[1])
+
+
+@pytest.mark.parametrize("empty_region", ["all", "manual"])
+def test_find_matches_region_index(references, queries, empty_region):
+    """Тест совпадения поиска по блокам регионов с поиском по маске."""
+    reference_vec, reference_id, reference_region = references
+    region_index = RegionIndex(reference_vec, reference_id, reference_region)
+    x_vec = vstack(queries)
+    # Запросы из регионов со школами, из региона без школ и без региона
+    regions = list(set(reference_region))
+    x_region = np.array(
+        [
+            [regions[i % len(regions)], "нет такого региона", None][i % 3]
+            for i in range(x_vec.shape[0])
+        ],
+        dtype=object,
+    )
+
+    results = [
+        find_matches(
+            x_vec,
+            x_region,
+            reference_id,
+            reference_vec,
+            reference_region,
+            threshold=0.00000001,
+            empty_region=empty_region,
+            region_index=index,
+        )
+        for index in (region_index, None)
+    ]
+
+    (indexed, indexed_review), (masked, masked_review) = results
+    assert indexed == masked
+    assert len(indexed_review) == len(masked_review)
+    if empty_region == "manual":
+        # Запросы без школ в регионе отправлены на ручную обработку
+        assert all(
+            matches == [(None, 0.0)] * 5
+            for matches, region in zip(indexed, x_region)
+            if region not in regions
+        )
+
+
+def test_shards_are_views_and_lazy(references):
+    """Тест блоков без копий данных и отложенного построения индексов."""
+    reference_vec, reference_id, reference_region = references
+    region_index = RegionIndex(reference_vec, reference_id, reference_region)
+    shards = list(region_index.shards.values())
+
+    # Блоки регионов - срезы одной упорядоченной копии матрицы
+    assert len({id(shard.vec.data.base) for shard in shards}) == 1
+    assert np.shares_memory(region_index.all.vec.data, reference_vec.data)
+
+    x_vec = reference_vec[:5]
+    x_region = reference_region[:5]
+    arguments = (x_vec, x_region, reference_id, reference_vec, reference_region)
+    find_matches(*arguments, region_index=region_index, search_mode="exact")
+    for shard in shards + [region_index.all]:
+        assert not {"inverted", "squared_norms", "l1_norms"} & set(shard.__dict__)
+
+    find_matches(*arguments, region_index=region_index, search_mode="inverted")
+    assert "inverted" in region_index.get(x_region[0]).__dict__
+    assert "squared_norms" not in region_index.get(x_region[0]).__dict__
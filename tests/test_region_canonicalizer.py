@@ -0,0 +1,84 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.sparse import random as sparse_random
+
+from app.services.school_matcher.utils.reference_index import RegionIndex
+from app.services.school_matcher.utils.region_canonicalizer import RegionCanonicalizer
+
+RESOURCES_DIR = "app/services/school_matcher/original_resources"
+
+
+@pytest.fixture(scope="module")
+def canonicalizer():
+    return RegionCanonicalizer(
+        joblib.load(f"{RESOURCES_DIR}/region_dict.joblib"),
+        joblib.load(f"{RESOURCES_DIR}/region_aliases.joblib"),
+    )
+
+
+def test_canonicalize(canonicalizer):
+    """Тест приведения регионов, городов и написаний к словарю регионов."""
+    regions = pd.Series(
+        [
+            "Иркутская Область.",
+            "ЕМАНЖЕЛИНСК",
+            "Воронежская обл.",
+            "воронежская область",
+            "Республика Саха (Якутия)",
+            "ХМАО-Югра",
+            "Неизвестный край",
+            "Иркутская Область.",
+        ]
+    )
+
+    canonical = canonicalizer.canonicalize(regions)
+
+    assert list(canonical) == [
+        "иркутская область",
+        "челябинская область",
+        "воронежская область",
+        "воронежская область",
+        "республика саха якутия",
+        "ханты мансийский автономный округ",
+        "неизвестный край",
+        "иркутская область",
+    ]
+    assert canonicalizer.unknown(canonical) == {"неизвестный край": 1}
+
+
+def test_encode(canonicalizer):
+    """Тест кодов регионов: коды словаря и отдельные коды неизвестных регионов."""
+    regions = ["иркутская область", "неизвестный край", "другой край", "москва"]
+
+    codes = canonicalizer.encode(regions)
+
+    assert codes.dtype == np.int32
+    assert codes[0] == canonicalizer.codes["иркутская область"]
+    assert codes[3] == canonicalizer.codes["москва"]
+    n_regions = len(canonicalizer.regions)
+    assert sorted(codes[1:3]) == [n_regions, n_regions + 1]
+
+
+def test_region_index_by_codes(canonicalizer):
+    """Тест: индекс, построенный по кодам, совпадает с индексом по строкам."""
+    rng = np.random.default_rng(0)
+    regions = np.array(
+        rng.choice(canonicalizer.regions[:5] + ["неизвестный край"], size=200)
+    )
+    reference_vec = sparse_random(200, 30, density=0.2, format="csr", random_state=0)
+    reference_id = np.arange(200)
+
+    expected = RegionIndex(reference_vec, reference_id, regions)
+    index = RegionIndex(
+        reference_vec,
+        reference_id,
+        regions,
+        region_codes=canonicalizer.encode(regions),
+    )
+
+    assert set(index.shards) == set(expected.shards)
+    for region, shard in expected.shards.items():
+        assert list(index.get(region).ids) == list(shard.ids)
+        assert (index.get(region).vec != shard.vec).nnz == 0
@@ -0,0 +1,136 @@
+import os
+
+import joblib
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from app.services.school_matcher import resource_builder
+from app.services.school_matcher.resource_builder import (
+    main,
+    preprocess_names,
+    read_sql_chunks,
+    read_sql_frame,
+)
+from app.services.school_matcher.school_matcher import SchoolMatcher
+from app.services.school_matcher.utils.preprocess_functions import lemmatizer
+
+RESOURCES_DIR = "app/services/school_matcher/original_resources"
+
+
+@pytest.fixture
+def regex_tokenizer(monkeypatch):
+    # Названия токенизируются без данных punkt, в том числе в процессах
+    # предобработки
+    monkeypatch.setattr(lemmatizer, "tokenizer", "regex")
+    monkeypatch.setenv("SCHOOL_MATCHER_TOKENIZER", "regex")
+
+
+@pytest.fixture
+def tables(tmp_path):
+    """Выгрузки таблиц schools и similar_schools в формате CSV."""
+    ids = joblib.load(f"{RESOURCES_DIR}/reference_id.joblib")[:40]
+    names = joblib.load(f"{RESOURCES_DIR}/reference_name.joblib")[:40]
+    regions = joblib.load(f"{RESOURCES_DIR}/reference_region.joblib")[:40]
+    schools = pd.DataFrame({"id": ids, "name": names, "region": regions})
+    similar_schools = pd.DataFrame(
+        {
+            "school_id": ids,
+            "name": [f"{name} {region}" for name, region in zip(names, regions)],
+        }
+    )
+    return schools, similar_schools
+
+
+def test_preprocess_names_in_processes(regex_tokenizer, tables, tmp_path):
+    """Тест: предобработка частями в процессах совпадает с обработкой в текущем процессе."""
+    matcher = SchoolMatcher(None, resources_dir=str(tmp_path / "resources"))
+    pipeline = matcher.snapshot.pipeline
+    names = tables[1].name.tolist()
+
+    expected = preprocess_names(names, pipeline, n_workers=1)
+    processed = preprocess_names(names, pipeline, n_workers=2, chunk_size=7)
+
+    assert processed == expected
+    assert len(processed) == len(names)
+
+
+def test_build_from_csv(regex_tokenizer, tables, tmp_path):
+    """Тест создания ресурсов по выгрузкам CSV с отчетом о времени этапов."""
+    schools, similar_schools = tables
+    schools.to_csv(tmp_path / "schools.csv", index=False)
+    similar_schools.to_csv(tmp_path / "similar_schools.csv", index=False)
+    output = tmp_path / "resources"
+
+    timings, report = main(
+        [
+            "--schools",
+            str(tmp_path / "schools.csv"),
+            "--similar-schools",
+            str(tmp_path / "similar_schools.csv"),
+            "--output",
+            str(output),
+            "--workers",
+            "1",
+        ]
+    )
+
+    assert list(timings) == [
+        "read data",
+        "load dictionaries",
+        "preprocess reference",
+        "preprocess train",
+        "fit vectorizer",
+        "save resources",
+    ]
+    assert report.splitlines()[-1].startswith("total")
+    for name in ("vectorizer", "reference_vec", "reference_id", "reference_name"):
+        assert (output / f"{name}.joblib").exists()
+
+    matcher = SchoolMatcher(None, resources_dir=str(output))
+    assert list(matcher.reference_id) == list(schools.id)
+
+
+def test_workers_default():
+    """Тест одинакового количества процессов по умолчанию в CLI и в коде."""
+    parsed = resource_builder.parse_args(["--database-url", "sqlite://"])
+
+    assert parsed.workers == resource_builder.BUILD_WORKERS
+    if "SCHOOL_MATCHER_BUILD_WORKERS" not in os.environ:
+        # По умолчанию используются все ядра
+        assert resource_builder.BUILD_WORKERS == (os.cpu_count() or 1)
+
+
+def test_read_table_formats(tables, tmp_path):
+    """Тест проверки формата файла и чтения выгрузок в формате Parquet."""
+    with pytest.raises(ValueError):
+        resource_builder.read_table(str(tmp_path / "schools.json"))
+
+    pytest.importorskip("pyarrow")
+    schools = tables[0]
+    schools.to_parquet(tmp_path / "schools.parquet")
+    assert resource_builder.read_table(str(tmp_path / "schools.parquet")).equals(
+        schools
+    )
+
+
+def test_read_sql_chunks(tables, tmp_path):
+    """Тест чтения результата запроса частями с ограничением памяти."""
+    similar_schools = pd.concat([tables[1]] * 50, ignore_index=True)
+    engine = create_engine(f"sqlite:///{tmp_path / 'schools.db'}")
+    similar_schools.to_sql("similar_schools", engine, index=False)
+    query = "SELECT school_id, name FROM similar_schools"
+
+    with engine.connect() as connection:
+        chunks = list(read_sql_chunks(connection, query, chunk_size=300))
+        assert [len(chunk) for chunk in chunks] == [300] * 6 + [200]
+
+        chunks = list(read_sql_chunks(connection, query, memory_mb=0.05))
+        row_bytes = chunks[0].memory_usage(deep=True).sum() / len(chunks[0])
+        assert len(chunks[0]) == 1000
+        assert all(len(chunk) <= 0.05 * 2**20 / row_bytes for chunk in chunks[1:])
+        assert pd.concat(chunks, ignore_index=True).equals(similar_schools)
+
+        empty = read_sql_frame(connection, query + " WHERE school_id < :id", {"id": 0})
+        assert empty.empty
+        assert list(empty.columns) == ["school_id", "name"]
@@ -0,0 +1,130 @@
+import os
+import threading
+
+from app.services.school_matcher.school_matcher import SchoolMatcher
+from app.services.school_matcher.utils.preprocess_functions import lemmatizer
+from app.services.school_matcher.utils.result_cache import ResultCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_hottest():
+    """Тест вытеснения давно не использованных записей и выбора
+    самых востребованных запросов."""
+    cache = ResultCache(max_size=2, ttl=0)
+    cache.put("a", 1, cache.version)
+    cache.put("b", 2, cache.version)
+    assert cache.get("a") == 1
+    assert cache.get("a") == 1
+    cache.put("c", 3, cache.version)
+
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.hottest(2) == ["a", "c"]
+
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.75
+
+
+def test_ttl_expiration():
+    """Тест устаревания записей по времени жизни."""
+    clock = FakeClock()
+    cache = ResultCache(max_size=10, ttl=60, clock=clock)
+    cache.put("a", 1, cache.version)
+
+    clock.now = 59
+    assert cache.get("a") == 1
+    clock.now = 60
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_version_bump():
+    """Тест сброса кэша при обновлении ресурсов: результат, вычисленный
+    на прежней версии ресурсов, не сохраняется."""
+    cache = ResultCache(max_size=10, ttl=0)
+    old_version = cache.version
+    cache.put("a", 1, old_version)
+
+    cache.bump_version()
+    assert cache.get("a") is None
+
+    cache.put("b", 2, old_version)
+    assert cache.get("b") is None
+    cache.put("b", 2, cache.version)
+    assert cache.get("b") == 2
+
+
+def test_disabled_cache():
+    """Тест отключенного кэша."""
+    cache = ResultCache(max_size=0, ttl=0)
+    cache.put("a", 1, cache.version)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_cache_persistence(tmp_path, monkeypatch):
+    """Тест сохранения и прогрева кэша и его отключения для обработчиков."""
+    # Названия токенизируются без данных punkt
+    monkeypatch.setattr(lemmatizer, "tokenizer", "regex")
+    resources_dir = str(tmp_path / "resources")
+    cache_path = os.path.join(resources_dir, "result_cache.joblib")
+
+    worker = SchoolMatcher(None, resources_dir=resources_dir, persist_cache=False)
+    worker.find_school_match("Звездный лед")
+    worker.save_result_cache()
+    assert not os.path.exists(cache_path)
+
+    matcher = SchoolMatcher(None, resources_dir=resources_dir)
+    matcher.find_school_match("Звездный лед")
+    matcher.save_result_cache()
+    assert os.path.exists(cache_path)
+
+    prewarmed = SchoolMatcher(None, resources_dir=resources_dir)
+    assert prewarmed.wait_prewarm(timeout=60)
+    assert prewarmed.raw_cache.hottest(10) == [("Звездный лед", "exact")]
+    worker = SchoolMatcher(None, resources_dir=resources_dir, persist_cache=False)
+    assert worker.raw_cache.hottest(10) == []
+
+
+def test_background_prewarm(tmp_path, monkeypatch):
+    """Тест прогрева кэша в фоне после публикации набора ресурсов."""
+    # Названия токенизируются без данных punkt
+    monkeypatch.setattr(lemmatizer, "tokenizer", "regex")
+    matcher = SchoolMatcher(None, resources_dir=str(tmp_path / "resources"))
+    for school_name in ("Звездный лед", "СШОР №1, Москва"):
+        matcher.find_school_match(school_name)
+
+    entered, released = threading.Event(), threading.Event()
+    find_school_match = matcher.find_school_match
+    warmed = []
+
+    def blocking_find_school_match(school_name, search_mode=None):
+        entered.set()
+        released.wait(60)
+        warmed.append(threading.current_thread().name)
+        return find_school_match(school_name, search_mode)
+
+    monkeypatch.setattr(matcher, "find_school_match", blocking_find_school_match)
+    # Публикация не ждет прогрева
+    matcher.load_resources()
+    assert entered.wait(60)
+    assert not matcher.wait_prewarm(timeout=0.1)
+
+    # Прогрев прекращается, если опубликован более новый набор
+    stale_thread = matcher._prewarm_thread
+    matcher.publish_snapshot(matcher.snapshot)
+    released.set()
+    stale_thread.join(60)
+    assert matcher.wait_prewarm(timeout=60)
+    assert warmed.count(stale_thread.name) == 1
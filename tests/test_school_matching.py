@@ -1,3 +1,19 @@
+from typing import get_args
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from app.api.school_matching import endpoints
+from app.services.school_matcher.school_matcher import (
+    SEARCH_MODES,
+    VARIANTS_MODE,
+    find_variant_matches,
+)
+from app.services.school_matcher.utils.name_pipeline import NamePipeline
+from app.services.school_matcher.utils.preprocess_functions import lemmatizer
+from app.services.school_matcher.utils.reference_index import RegionIndex
+
+
 def test_find_school_match(client):
     # Сначала сделаем авторизацию
     auth_response = client.post(
@@ -26,3 +42,253 @@ def test_find_school_match(client):
 
     # Проверка, что количество элементов совпадает
     assert len(matches) == len(expected_matches)
+
+
+def test_find_school_matches_batch(client):
+    auth_response = client.post(
+        "/auth/token", data={"username": "@alekfil", "password": "111111"}
+    )
+    token = auth_response.json().get("access_token")
+
+    headers = {"Authorization": f"Bearer {token}"}
+    school_names = ["Звездный лед", "СШОР Москва", "Звездный лед"]
+    response = client.post(
+        "/data/get_school_matches_batch",
+        json={"school_names": school_names},
+        headers=headers,
+    )
+
+    assert response.status_code == 200
+    results = response.json()
+
+    # Результаты возвращаются в порядке входных названий
+    assert [result["school_name"] for result in results] == school_names
+    for result in results:
+        assert result["error"] is None
+        assert len(result["matches"]) == 5
+
+    # Одинаковые названия дают одинаковые совпадения
+    assert results[0]["matches"] == results[2]["matches"]
+
+
+def test_find_school_matches_batch_item_error(client, monkeypatch):
+    """Тест ошибки обработки одного названия в пакете."""
+    # Названия токенизируются без данных punkt
+    monkeypatch.setattr(lemmatizer, "tokenizer", "regex")
+    process = NamePipeline.process
+
+    def failing_process(self, text, timings=None):
+        if text == "ошибка":
+            raise ValueError("broken name")
+        return process(self, text, timings)
+
+    monkeypatch.setattr(NamePipeline, "process", failing_process)
+    auth_response = client.post(
+        "/auth/token", data={"username": "@alekfil", "password": "111111"}
+    )
+    token = auth_response.json().get("access_token")
+    headers = {"Authorization": f"Bearer {token}"}
+    school_names = ["Звездный лед", "ошибка", "СШОР №1, Москва"]
+
+    response = client.post(
+        "/data/get_school_matches_batch",
+        json={"school_names": school_names},
+        headers=headers,
+    )
+
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["school_name"] for result in results] == school_names
+    assert results[1]["error"] == "broken name"
+    assert results[1]["matches"] == []
+    for result in (results[0], results[2]):
+        assert result["error"] is None
+        assert len(result["matches"]) == 5
+
+
+def test_find_school_matches_batch_too_large(client, monkeypatch):
+    """Тест отказа для пакета больше MAX_BATCH_SIZE названий."""
+    monkeypatch.setattr(endpoints, "MAX_BATCH_SIZE", 2)
+    auth_response = client.post(
+        "/auth/token", data={"username": "@alekfil", "password": "111111"}
+    )
+    token = auth_response.json().get("access_token")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.post(
+        "/data/get_school_matches_batch",
+        json={"school_names": ["Звездный лед"] * 3},
+        headers=headers,
+    )
+
+    assert response.status_code == 413
+
+    response = client.post(
+        "/data/get_school_matches_batch",
+        json={"school_names": ["Звездный лед"] * 2},
+        headers=headers,
+    )
+    assert response.status_code != 413
+
+
+def test_cache_stats(client):
+    auth_response = client.post(
+        "/auth/token", data={"username": "@alekfil", "password": "111111"}
+    )
+    token = auth_response.json().get("access_token")
+
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.get("/data/cache_stats", headers=headers)
+
+    assert response.status_code == 200
+    stats = response.json()
+    for cache in ("raw", "normalized"):
+        assert {"size", "hits", "misses", "hit_rate", "evictions"} <= set(
+            stats[cache]
+        )
+
+
+def test_reload_resources_unknown_job(client):
+    auth_response = client.post(
+        "/auth/token", data={"username": "@alekfil", "password": "111111"}
+    )
+    token = auth_response.json().get("access_token")
+
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.get("/data/reload_resources/unknown", headers=headers)
+
+    assert response.status_code == 404
+
+
+def test_metrics(client, monkeypatch):
+    """Тест метрик этапов поиска в текстовом формате Prometheus."""
+    # Названия токенизируются без данных punkt
+    monkeypatch.setattr(lemmatizer, "tokenizer", "regex")
+    auth_response = client.post(
+        "/auth/token", data={"username": "@alekfil", "password": "111111"}
+    )
+    token = auth_response.json().get("access_token")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.post(
+        "/data/get_school_matches",
+        json={"school_name": "СШОР Полярный метеор Москва"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+
+    response = client.get("/main/metrics", headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert "# TYPE school_matcher_stage_seconds histogram" in text
+    for stage in ("simple", "abbreviations", "region", "lemmatize", "search"):
+        assert (
+            f'school_matcher_stage_seconds_count{{method="find_school_match",'
+            f'stage="{stage}"}}' in text
+        )
+    assert 'school_matcher_requests_total{method="find_school_match"}' in text
+    assert "school_matcher_candidates_bucket" in text
+
+
+def test_find_variant_matches():
+    """Тест выбора наибольшей схожести среди вариантов названия."""
+    reference_vec = csr_matrix(np.eye(4))
+    reference_id = np.array([10, 11, 12, 13])
+    reference_region = np.array(["a", "a", "a", "b"], dtype=object)
+    region_index = RegionIndex(reference_vec, reference_id, reference_region)
+    x_vec = csr_matrix([[0.8, 0.6, 0.0, 0.0], [0.0, 0.0, 0.9, 0.1]])
+
+    stats = {}
+    matches = find_variant_matches(
+        x_vec, "a", region_index, top_k=4, threshold=0.5, stats=stats
+    )
+
+    assert [id_ for id_, _ in matches] == [12, 10, 11, None]
+    np.testing.assert_allclose([score for _, score in matches], [0.9, 0.8, 0.6, 0])
+    assert stats == {"region_fallback": 0, "manual_review": 0, "candidates": [3]}
+
+    stats = {}
+    matches = find_variant_matches(
+        x_vec, "unknown", region_index, top_k=2, threshold=0.95, stats=stats
+    )
+    assert matches == [(None, 0.0), (None, 0.0)]
+    assert stats == {"region_fallback": 1, "manual_review": 1, "candidates": [4]}
+
+
+def test_search_modes():
+    """Тест совпадения способов поиска API с поддерживаемыми поиском."""
+    assert get_args(endpoints.SearchMode) == SEARCH_MODES
+    assert get_args(endpoints.MatchMode) == SEARCH_MODES + (VARIANTS_MODE,)
+
+
+def test_variants_mode(client, monkeypatch):
+    """Тест поиска по вариантам расшифровки сокращений."""
+    # Названия токенизируются без данных punkt
+    monkeypatch.setattr(lemmatizer, "tokenizer", "regex")
+    auth_response = client.post(
+        "/auth/token", data={"username": "@alekfil", "password": "111111"}
+    )
+    token = auth_response.json().get("access_token")
+    headers = {"Authorization": f"Bearer {token}"}
+    school_names = ["СШОР Полярный метеор Москва", "МБОУ СОШ №5 г. Казань"]
+
+    results = {}
+    for search_mode in ("exact", "variants"):
+        response = client.post(
+            "/data/get_school_matches_batch",
+            json={"school_names": school_names, "search_mode": search_mode},
+            headers=headers,
+        )
+        assert response.status_code == 200
+        results[search_mode] = response.json()
+
+    # В словаре сокращений нет неоднозначных, поэтому у каждого названия
+    # один вариант и результаты совпадают с точным поиском
+    for exact, variants in zip(results["exact"], results["variants"]):
+        assert variants["school_name"] == exact["school_name"]
+        np.testing.assert_allclose(
+            [match["score"] for match in variants["matches"]],
+            [match["score"] for match in exact["matches"]],
+        )
+
+    response = client.post(
+        "/data/get_school_matches",
+        json={"school_name": school_names[0], "search_mode": "variants"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert response.json() == results["variants"][0]["matches"]
+
+
+def test_search_recall(client, monkeypatch):
+    """Тест оценки полноты с названием, которое не удалось предобработать."""
+    # Названия токенизируются без данных punkt
+    monkeypatch.setattr(lemmatizer, "tokenizer", "regex")
+    process = NamePipeline.process
+
+    def failing_process(self, text, timings=None):
+        if text == "ошибка":
+            raise ValueError("broken name")
+        return process(self, text, timings)
+
+    monkeypatch.setattr(NamePipeline, "process", failing_process)
+    auth_response = client.post(
+        "/auth/token", data={"username": "@alekfil", "password": "111111"}
+    )
+    token = auth_response.json().get("access_token")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.post(
+        "/data/search_recall",
+        json={"school_names": ["Звездный лед", "ошибка", "СШОР №1, Москва"]},
+        headers=headers,
+    )
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report["n_queries"] == 3
+    assert report["n_errors"] == 1
+    assert report["n_evaluated"] <= 2
+    assert 0 <= report["recall"] <= 1
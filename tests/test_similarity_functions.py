@@ -0,0 +1,161 @@
+import numpy as np
+import pytest
+from scipy.sparse import csr_matrix
+from scipy.sparse import random as sparse_random
+from sklearn.metrics.pairwise import (
+    cosine_similarity,
+    euclidean_distances,
+    manhattan_distances,
+)
+
+from app.services.school_matcher.school_matcher import find_matches
+from app.services.school_matcher.utils.reference_index import RegionIndex
+from app.services.school_matcher.utils.similarity_functions import (
+    cosine_top_k,
+    euclidean_top_k,
+    manhattan_top_k,
+    top_k_from_dense,
+)
+
+DISTANCES = {"euclidean": euclidean_distances, "manhattan": manhattan_distances}
+
+
+def argsort_top_k(x_vec, reference_vec, top_k):
+    """Прежний поиск: полная матрица схожестей и сортировка строк."""
+    similarities = cosine_similarity(x_vec, reference_vec)
+    top_indices = similarities.argsort(axis=1)[:, -top_k:][:, ::-1]
+    top_scores = np.take_along_axis(similarities, top_indices, axis=1)
+    return top_indices, top_scores, similarities.max(axis=1)
+
+
+@pytest.mark.parametrize("top_k", [1, 5, 120])
+@pytest.mark.parametrize("max_block_bytes", [8 * 80 * 3, 64 * 1024 * 1024])
+def test_cosine_top_k(top_k, max_block_bytes):
+    """Тест совпадения с сортировкой полной матрицы, в том числе по блокам."""
+    x_vec = sparse_random(37, 50, density=0.1, format="csr", random_state=1)
+    reference_vec = sparse_random(80, 50, density=0.1, format="csr", random_state=2)
+
+    top_indices, top_scores, max_scores = cosine_top_k(
+        x_vec,
+        reference_vec,
+        top_k=top_k,
+        max_block_bytes=max_block_bytes,
+        assume_normalized=False,
+    )
+    expected_indices, expected_scores, expected_max = argsort_top_k(
+        x_vec, reference_vec, top_k
+    )
+
+    assert top_indices.shape == (37, min(top_k, 80))
+    np.testing.assert_allclose(top_scores, expected_scores, atol=1e-12)
+    np.testing.assert_allclose(max_scores, expected_max, atol=1e-12)
+    # Порядок совпадает везде, кроме равных схожестей (в том числе нулевых)
+    tied = np.isclose(top_scores[:, :, None], top_scores[:, None, :]).sum(axis=2) > 1
+    np.testing.assert_array_equal(top_indices[~tied], expected_indices[~tied])
+
+
+def test_cosine_top_k_ties():
+    """Тест порядка равных схожестей: первым идет меньший индекс."""
+    reference_vec = csr_matrix([[1.0, 0.0], [0.0, 1.0], [1.0, 0.0], [1.0, 0.0]])
+    x_vec = csr_matrix([[1.0, 0.0]])
+
+    top_indices, top_scores, _ = cosine_top_k(x_vec, reference_vec, top_k=3)
+    expected_indices, expected_scores, _ = argsort_top_k(x_vec, reference_vec, 3)
+
+    np.testing.assert_array_equal(top_indices, [[0, 2, 3]])
+    np.testing.assert_allclose(top_scores, expected_scores)
+    assert set(top_indices[0]) == set(expected_indices[0])
+
+
+def test_cosine_top_k_empty_reference():
+    """Тест поиска по пустому набору референсов."""
+    x_vec = csr_matrix([[1.0, 0.0], [0.0, 1.0]])
+
+    top_indices, top_scores, max_scores = cosine_top_k(x_vec, x_vec[:0], top_k=5)
+
+    assert top_indices.shape == (2, 0)
+    assert top_scores.shape == (2, 0)
+    assert np.all(max_scores == -np.inf)
+
+
+@pytest.mark.parametrize(
+    "kernel, distances",
+    [(euclidean_top_k, euclidean_distances), (manhattan_top_k, manhattan_distances)],
+)
+def test_distance_top_k(kernel, distances):
+    """Тест совпадения разреженных расстояний с sklearn, в том числе по блокам."""
+    x_vec = sparse_random(37, 50, density=0.1, format="csr", random_state=1)
+    x_vec.data -= 0.5
+    reference_vec = sparse_random(80, 50, density=0.1, format="csr", random_state=2)
+    expected = distances(x_vec, reference_vec)
+    expected_indices, expected_scores = top_k_from_dense(-expected, 5)
+
+    for max_block_bytes in (8 * 80 * 7, 64 * 1024 * 1024):
+        top_indices, top_distances, min_distances = kernel(
+            x_vec, reference_vec, top_k=5, max_block_bytes=max_block_bytes
+        )
+        np.testing.assert_array_equal(top_indices, expected_indices)
+        np.testing.assert_allclose(top_distances, -expected_scores, atol=1e-12)
+        np.testing.assert_allclose(min_distances, expected.min(axis=1), atol=1e-12)
+
+    # Совпадающий вектор находится на нулевом расстоянии
+    _, top_distances, _ = kernel(reference_vec[3], reference_vec, top_k=1)
+    assert top_distances[0, 0] == 0
+
+
+@pytest.mark.parametrize("similarity_method", ["euclidean", "manhattan"])
+def test_find_matches_distances(similarity_method):
+    """Тест совпадения поиска по расстояниям с вычислением через sklearn."""
+    reference_vec = sparse_random(60, 40, density=0.2, format="csr", random_state=0)
+    reference_id = np.arange(100, 160)
+    reference_region = np.array(["a"] * 30 + ["b"] * 30, dtype=object)
+    region_index = RegionIndex(reference_vec, reference_id, reference_region)
+    x_vec = sparse_random(4, 40, density=0.3, format="csr", random_state=1)
+    x_region = np.array(["a", "b", "unknown", None], dtype=object)
+    threshold = 0.9
+
+    expected = []
+    for i, region in enumerate(x_region):
+        mask = reference_region == region
+        if not mask.any():
+            mask = np.ones(60, dtype=bool)
+        similarities = -DISTANCES[similarity_method](x_vec[i], reference_vec[mask])
+        indices, scores = top_k_from_dense(similarities, 5)
+        if similarities.max() <= -threshold:
+            expected.append(list(zip(reference_id[mask][indices[0]], -scores[0])))
+        else:
+            expected.append([(None, 0.0)] * 5)
+
+    for index in (region_index, None):
+        y_pred, _ = find_matches(
+            x_vec,
+            x_region,
+            reference_id,
+            reference_vec,
+            reference_region,
+            threshold=threshold,
+            similarity_method=similarity_method,
+            region_index=index,
+        )
+        for matches, expected_matches in zip(y_pred, expected):
+            assert [id_ for id_, _ in matches] == [id_ for id_, _ in expected_matches]
+            np.testing.assert_allclose(
+                [score for _, score in matches],
+                [score for _, score in expected_matches],
+            )
+
+
+def test_find_matches_unknown_method():
+    """Тест ошибки для неизвестного метода схожести."""
+    reference_vec = sparse_random(10, 20, density=0.3, format="csr", random_state=0)
+    reference_region = np.array(["a"] * 10, dtype=object)
+
+    with pytest.raises(ValueError, match="Unknown similarity method"):
+        find_matches(
+            reference_vec[:1],
+            np.array(["a"], dtype=object),
+            np.arange(10),
+            reference_vec,
+            reference_region,
+            similarity_method="chebyshev",
+        )
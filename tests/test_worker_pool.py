@@ -0,0 +1,133 @@
+import asyncio
+import os
+import signal
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.services.school_matcher.worker_pool import (
+    MatcherOverloadedError,
+    MatcherPool,
+)
+
+
+class SlowMatcher:
+    """Объект поиска, возвращающий название и идентификатор процесса."""
+
+    def find_school_match(self, school_name, search_mode=None, delay=0.0):
+        time.sleep(delay)
+        return {"school_name": school_name, "pid": os.getpid()}
+
+    def crash(self):
+        os.kill(os.getpid(), signal.SIGKILL)
+
+
+def make_slow_matcher():
+    return SlowMatcher()
+
+
+def test_thread_pool_call():
+    """Тест вызова метода в потоках основного процесса."""
+    pool = MatcherPool(SlowMatcher(), n_workers=0)
+
+    async def run():
+        return await asyncio.gather(
+            *(pool.call("find_school_match", f"школа {i}") for i in range(5))
+        )
+
+    results = asyncio.run(run())
+    pool.shutdown()
+
+    assert [result["school_name"] for result in results] == [
+        f"школа {i}" for i in range(5)
+    ]
+    assert {result["pid"] for result in results} == {os.getpid()}
+    assert pool.pending == 0
+
+
+def test_bounded_queue_and_timeout():
+    """Тест ограничения очереди и времени ожидания."""
+    pool = MatcherPool(SlowMatcher(), n_workers=0, max_pending=1, timeout=0.2)
+
+    async def run():
+        slow = asyncio.ensure_future(
+            pool.call("find_school_match", "школа", None, 0.5)
+        )
+        await asyncio.sleep(0.05)
+        with pytest.raises(MatcherOverloadedError):
+            await pool.call("find_school_match", "школа")
+        with pytest.raises(TimeoutError):
+            await slow
+
+    asyncio.run(run())
+    pool.shutdown()
+    assert pool.pending == 0
+
+
+def test_process_pool_call():
+    """Тест вызова метода в процессах-обработчиках."""
+    pool = MatcherPool(n_workers=2, timeout=60, factory=make_slow_matcher)
+
+    async def run():
+        return await asyncio.gather(
+            *(pool.call("find_school_match", f"школа {i}") for i in range(4))
+        )
+
+    results = asyncio.run(run())
+    pool.restart()
+    restarted = asyncio.run(run())
+    pool.shutdown()
+
+    assert [result["school_name"] for result in results + restarted] == [
+        f"школа {i}" for i in range(4)
+    ] * 2
+    assert os.getpid() not in {result["pid"] for result in results + restarted}
+
+
+def test_process_pool_recovers_after_worker_crash():
+    """Тест пересоздания пула после аварийного завершения процесса."""
+    pool = MatcherPool(n_workers=1, timeout=60, factory=make_slow_matcher)
+
+    async def run():
+        first = await pool.call("find_school_match", "школа")
+        with pytest.raises(BrokenProcessPool):
+            await pool.call("crash")
+        second = await pool.call("find_school_match", "школа")
+        return first, second
+
+    first, second = asyncio.run(run())
+    pool.shutdown()
+
+    assert second["school_name"] == "школа"
+    assert second["pid"] != first["pid"]
+    assert pool.pending == 0
+
+
+def test_process_pool_bounded_queue_and_timeout():
+    """Тест ограничения очереди и времени ожидания в процессах-обработчиках."""
+    pool = MatcherPool(
+        n_workers=1, max_pending=1, timeout=0.5, factory=make_slow_matcher
+    )
+
+    async def run():
+        slow = asyncio.ensure_future(
+            pool.call("find_school_match", "школа", None, 2.0)
+        )
+        await asyncio.sleep(0.05)
+        with pytest.raises(MatcherOverloadedError):
+            await pool.call("find_school_match", "школа")
+        with pytest.raises(TimeoutError):
+            await slow
+        assert pool.pending == 0
+
+        # Процесс завершает начатую обработку и принимает новые запросы
+        pool.timeout = 60
+        return await pool.call("find_school_match", "школа")
+
+    result = asyncio.run(run())
+    pool.shutdown()
+
+    assert result["school_name"] == "школа"
+    assert result["pid"] != os.getpid()
+    assert pool.pending == 0